@@ -1,8 +1,18 @@
 from django.contrib import admin
-from .models import MonitoredSite
+from .models import Incident, MaintenanceWindow, MonitoredSite
 
 @admin.register(MonitoredSite)
 class MonitoredSiteAdmin(admin.ModelAdmin):
-    list_display = ('name', 'url', 'check_frequency', 'user')
-    list_filter = ('user',)
-    search_fields = ('name', 'url')
\ No newline at end of file
+    list_display = ('name', 'url', 'check_frequency', 'user', 'circuit_state', 'consecutive_failures')
+    list_filter = ('user', 'circuit_state')
+    search_fields = ('name', 'url')
+
+@admin.register(Incident)
+class IncidentAdmin(admin.ModelAdmin):
+    list_display = ('site', 'started_at', 'ended_at', 'failed_checks', 'status_code')
+    list_filter = ('site',)
+
+@admin.register(MaintenanceWindow)
+class MaintenanceWindowAdmin(admin.ModelAdmin):
+    list_display = ('site', 'reason', 'starts_at', 'ends_at', 'recurrence', 'repeat_until')
+    list_filter = ('recurrence',)
@@ -7,6 +7,7 @@ class StatusMonitorConfig(AppConfig):
     name = 'status_monitor'
 
     def ready(self):
+       from . import broker, counters, incidents, maintenance, rollups, summary_cache  # noqa: F401 - register the signal receivers
        from .tasks import start_scheduler
        try:
            start_scheduler()
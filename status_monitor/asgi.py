@@ -3,6 +3,10 @@ ASGI config for status_monitor project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn status_monitor.asgi:application``)
+so the dashboards' live event streams (/api/status/events/) wait on the event
+loop instead of each holding a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -0,0 +1,195 @@
+"""
+Offline benchmarks for the monitor: probe cycle throughput against the
+local stub server, and latency, query count and peak memory of the
+dashboard and history pages over a generated dataset.
+
+    manage.py seed_benchmark_data --sites 2000 --results-per-site 500
+    manage.py run_benchmarks --output after.json --compare before.json
+"""
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .history import HISTORY_RANGES
+from .models import MonitoredSite, SiteCheckResult
+from .pipeline import run_pipeline
+from .probes import ProbeResult
+from .stub_server import start_stub_server
+from .writers import ResultWriter
+
+BENCH_USERNAME = 'benchmark'
+DEFAULT_BASE_URL = 'http://127.0.0.1:8765'
+# How a change in each metric reads: up is worse for times, counts and
+# memory, down is worse for throughput
+LOWER_IS_BETTER = ('_ms', '_seconds', 'queries', '_kb')
+HIGHER_IS_BETTER = ('per_second',)
+
+
+def clear_fixtures():
+    """Delete the benchmark user and, by cascade, its sites and results."""
+    return User.objects.filter(username=BENCH_USERNAME).delete()[0]
+
+
+def generate_fixtures(sites=1000, results_per_site=1000, base_url=DEFAULT_BASE_URL,
+                      check_frequency=1, up_ratio=0.98, seed=0, batch_size=10000, progress=None):
+    """
+    Create ``sites`` monitored sites owned by the benchmark user, each with
+    ``results_per_site`` check results ending now, ``check_frequency``
+    minutes apart. Results go through ResultWriter, so rollups and uptime
+    counters are built the same way live probes build them.
+    """
+    rng = random.Random(seed)
+    user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+    start_index = MonitoredSite.objects.filter(user=user).count()
+    new_sites = MonitoredSite.objects.bulk_create([
+        MonitoredSite(user=user, name=f"Bench {i}", url=f"{base_url}/site/{i}", check_frequency=check_frequency)
+        for i in range(start_index, start_index + sites)
+    ])
+
+    now = timezone.now().replace(second=0, microsecond=0)
+    step = timedelta(minutes=check_frequency)
+    written = 0
+    with ResultWriter(batch_size=batch_size, flush_interval=math.inf) as writer:
+        # One site at a time, oldest first, as the counters expect
+        for site in new_sites:
+            for n in range(results_per_site, 0, -1):
+                is_up = rng.random() < up_ratio
+                writer.add(ProbeResult(
+                    site=site,
+                    timestamp=now - n * step,
+                    status_code=200 if is_up else rng.choice([None, 500, 503]),
+                    response_time=rng.lognormvariate(math.log(0.2), 0.5),
+                    is_up=is_up,
+                ))
+            written += results_per_site
+            if progress:
+                progress(site, written)
+    return new_sites
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1]
+
+
+def bench_probe_cycle(sites, concurrency=None, timeout=None, **behavior):
+    """
+    Probe ``sites`` once against a fresh stub server, saving nothing. All
+    sites share the stub's host, so the per-host limit is lifted.
+    """
+    server = start_stub_server(**behavior)
+    try:
+        for site in sites:
+            # In-memory only; the saved URL is never used
+            site.url = f"{server.url}/site/{site.pk}"
+        stats = run_pipeline(sites, concurrency=concurrency, timeout=timeout, dry_run=True, max_per_host=0)
+    finally:
+        server.shutdown()
+        server.server_close()
+    p95 = stats.percentile(95)
+    return {
+        'sites': stats.checked,
+        'cycle_seconds': round(stats.elapsed, 3),
+        'sites_per_second': round(stats.sites_per_second, 1),
+        'p95_probe_ms': None if p95 is None else round(p95 * 1000, 1),
+        'down': stats.down,
+    }
+
+
+def bench_view(client, url, repeat=5):
+    """Latency percentiles, query count and peak Python memory of GET ``url``."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    # Read now: the next request's request_started resets the query log
+    query_count = len(queries)
+
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'p95_ms': round(_percentile(timings, 95) * 1000, 1),
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024),
+    }
+
+
+def run_benchmarks(repeat=5, probe_sites=None, concurrency=None, timeout=None, **behavior):
+    """Run every benchmark over the generated dataset and return the report."""
+    user = User.objects.filter(username=BENCH_USERNAME).first()
+    sites = list(MonitoredSite.objects.filter(user=user).order_by('pk')) if user else []
+    if not sites:
+        raise ValueError("No benchmark data; run `manage.py seed_benchmark_data` first.")
+
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(user)
+    history_site = sites[0]
+
+    results = {
+        'probe_cycle': bench_probe_cycle(
+            sites[:probe_sites] if probe_sites else sites,
+            concurrency=concurrency, timeout=timeout, **behavior
+        ),
+        'status_page': bench_view(client, reverse('status_page'), repeat),
+    }
+    for name in HISTORY_RANGES:
+        url = f"{reverse('site_history', args=[history_site.pk])}?range={name}"
+        results[f'site_history_{name}'] = bench_view(client, url, repeat)
+
+    return {
+        'meta': {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'sites': len(sites),
+            'results': SiteCheckResult.objects.filter(site__user=user).count(),
+            'repeat': repeat,
+            'stub': behavior,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Regressions of ``current`` against ``baseline`` (two run_benchmarks
+    reports): every metric that moved more than ``threshold`` (a fraction)
+    in its worse direction, as (benchmark, metric, baseline, current).
+    """
+    regressions = []
+    for bench, metrics in current['results'].items():
+        before = baseline['results'].get(bench, {})
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            if metric.endswith(LOWER_IS_BETTER) and value > old * (1 + threshold):
+                regressions.append((bench, metric, old, value))
+            elif metric.endswith(HIGHER_IS_BETTER) and value < old * (1 - threshold):
+                regressions.append((bench, metric, old, value))
+    return regressions
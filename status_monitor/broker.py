@@ -0,0 +1,244 @@
+"""
+Fan-out of new check results to the dashboards of the users who own the
+sites. Event streams (views.status_events) subscribe per user; the
+results_recorded receiver below publishes once per user per saved batch.
+
+LocalBroker delivers within the current process. PostgresBroker sends
+events through NOTIFY and LISTENs on one connection per process, so
+results saved by a run_checker worker reach streams served elsewhere.
+Select one with the STATUS_BROKER setting.
+"""
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import MonitoredSite, SiteCheckResult
+from .signals import results_recorded
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay under 8000 bytes
+RESULTS_PER_EVENT = 40
+
+
+class Subscription:
+    """One subscriber's queue, fed from any thread. Blocking ``get`` for
+    consumers on an ordinary thread."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queue = queue.Queue(settings.SSE_QUEUE_SIZE)
+
+    def put(self, event):
+        # A stalled client loses its oldest events rather than growing the queue
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        """The next event, or None after ``timeout`` seconds without one."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """One event stream's queue, bound to the event loop that serves it, so
+    an idle ASGI stream is a suspended coroutine and holds no thread."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.SSE_QUEUE_SIZE)
+
+    def put(self, event):
+        """Queue ``event`` from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The stream's loop is gone; it is about to unsubscribe
+
+    def _put(self, event):
+        # A stalled client loses its oldest events rather than growing the queue
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """The next event, or None after ``timeout`` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, asynchronous=False):
+        subscription = (AsyncSubscription if asynchronous else Subscription)(user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+class PostgresBroker(LocalBroker):
+    channel = 'status_monitor_events'
+    # Seconds the listener waits on its socket before checking for close()
+    poll_interval = 5
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        self._closed = threading.Event()
+
+    def publish(self, user_id, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, json.dumps({'user': user_id, 'event': event})])
+
+    def subscribe(self, user_id, asynchronous=False):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='status-broker', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id, asynchronous)
+
+    def close(self):
+        """Stop the listener thread and close its connection."""
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.join()
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Status event listener failed; reconnecting")
+                self._closed.wait(5)
+
+    def _listen_once(self):
+        wrapper = connections['default']
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            while not self._closed.is_set():
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    message = json.loads(conn.notifies.pop(0).payload)
+                    self.deliver(message['user'], message['event'])
+        finally:
+            conn.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker named by STATUS_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.STATUS_BROKER)()
+    return _broker
+
+
+def _sse(event):
+    if event is None:
+        return ': keep-alive\n\n'
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def async_event_stream(user_id):
+    """Server-sent events for ``user_id``, served on the ASGI event loop."""
+    broker = get_broker()
+    subscription = broker.subscribe(user_id, asynchronous=True)
+    deadline = time.monotonic() + settings.SSE_MAX_STREAM_SECONDS
+    try:
+        yield 'retry: 5000\n\n'
+        while (remaining := deadline - time.monotonic()) > 0:
+            yield _sse(await subscription.get(min(settings.SSE_HEARTBEAT_SECONDS, remaining)))
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def check_event(results):
+    return {
+        'type': 'checks',
+        'results': [
+            {
+                'site': result.site_id,
+                'timestamp': result.timestamp.isoformat(),
+                'status_code': result.status_code,
+                'response_time': result.response_time,
+                'is_up': result.is_up,
+            }
+            for result in results
+        ],
+    }
+
+
+@receiver(results_recorded)
+def publish_results(sender, results, **kwargs):
+    uncached = {r.site_id for r in results if not SiteCheckResult.site.is_cached(r)}
+    owners = dict(MonitoredSite.objects.filter(pk__in=uncached).values_list('pk', 'user_id')) if uncached else {}
+    by_user = defaultdict(list)
+    for result in results:
+        user_id = result.site.user_id if SiteCheckResult.site.is_cached(result) else owners.get(result.site_id)
+        by_user[user_id].append(result)
+
+    events = [
+        (user_id, check_event(user_results[i:i + RESULTS_PER_EVENT]))
+        for user_id, user_results in by_user.items() if user_id is not None
+        for i in range(0, len(user_results), RESULTS_PER_EVENT)
+    ]
+
+    def publish():
+        broker = get_broker()
+        for user_id, event in events:
+            broker.publish(user_id, event)
+
+    # Streams should only hear about results that other readers can see
+    transaction.on_commit(publish)
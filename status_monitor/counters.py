@@ -0,0 +1,76 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CheckRollup, UptimeCounter
+from .retention import retention_cutoff
+from .signals import results_recorded
+
+COUNTER_FIELDS = [
+    'total_all', 'up_all', 'total_24h', 'up_24h', 'total_7d', 'up_7d',
+    'total_30d', 'up_30d', 'hourly', 'current_hour',
+]
+
+
+@receiver(results_recorded)
+def update_uptime_counters(sender, results, **kwargs):
+    by_site = defaultdict(list)
+    for result in results:
+        by_site[result.site_id].append(result)
+
+    with transaction.atomic():
+        UptimeCounter.objects.bulk_create(
+            [UptimeCounter(site_id=site_id) for site_id in by_site],
+            ignore_conflicts=True,
+        )
+        # Ordered so concurrent writers lock counters in the same order
+        counters = UptimeCounter.objects.select_for_update().filter(site_id__in=by_site).order_by('site_id')
+        for counter in counters:
+            for result in sorted(by_site[counter.site_id], key=lambda r: r.timestamp):
+                counter.add(result)
+        UptimeCounter.objects.bulk_update(counters, COUNTER_FIELDS)
+
+
+def rebuild_uptime_counter(site, now=None):
+    """
+    Recompute ``site``'s counter: one aggregate for all time and one grouped
+    by hour for the last 30 days. Raw results before the site's retention
+    cutoff may have been pruned, so that part of history is read from the
+    rollups instead (hour rollups for the ring, day rollups for all time).
+    """
+    now = now or timezone.now()
+    cutoff = retention_cutoff(site, now)
+    with transaction.atomic():
+        counter, _ = UptimeCounter.objects.select_for_update().get_or_create(site=site)
+        counter.reset(UptimeCounter.hour_of(now))
+        up = Count('id', filter=Q(is_up=True))
+
+        since = (now - timedelta(hours=UptimeCounter.RING_HOURS - 1)).replace(minute=0, second=0, microsecond=0)
+        rolled_hours = site.rollups.filter(
+            granularity=CheckRollup.HOUR, bucket_start__gte=since, bucket_start__lt=cutoff,
+        ).values_list('bucket_start', 'check_count', 'up_count')
+        for hour, total, up_count in rolled_hours:
+            counter.add_counts(UptimeCounter.hour_of(hour), total, up_count)
+        hours = (
+            site.check_results
+            .filter(timestamp__gte=max(since, cutoff))
+            .annotate(hour=TruncHour('timestamp'))
+            .values('hour')
+            .annotate(total=Count('id'), up=up)
+        )
+        for row in hours:
+            counter.add_counts(UptimeCounter.hour_of(row['hour']), row['total'], row['up'])
+
+        totals = site.check_results.filter(timestamp__gte=cutoff).aggregate(total=Count('id'), up=up)
+        older = site.rollups.filter(granularity=CheckRollup.DAY, bucket_start__lt=cutoff).aggregate(
+            total=Sum('check_count'), up=Sum('up_count'),
+        )
+        counter.total_all = totals['total'] + (older['total'] or 0)
+        counter.up_all = totals['up'] + (older['up'] or 0)
+        counter.save()
+    return counter
@@ -0,0 +1,40 @@
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of ``points``, a list of
+    (x, y, ...) tuples sorted by x, to at most ``threshold`` points. Any
+    items after y ride along with their point.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves spikes and dips that plain
+    averaging would flatten. Points with a y of None are dropped.
+    """
+    points = [p for p in points if p[1] is not None]
+    if threshold >= len(points) or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[a][:2]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j][:2]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
@@ -0,0 +1,111 @@
+"""
+Streaming exports of raw check results as CSV or NDJSON, for SLA reports.
+
+Rows come off a server-side cursor (QuerySet.iterator) ``chunk_size`` at a
+time and are encoded and yielded chunk by chunk, optionally through gzip,
+so memory stays flat however many rows an export covers. Used by the
+export_results view and management command.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import SiteCheckResult
+
+COLUMNS = (
+    'site_id', 'site_name', 'timestamp', 'status_code', 'response_time', 'is_up', 'connection_reused',
+) + tuple(f'{phase}_time' for phase in SiteCheckResult.PHASES)
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_bound(value):
+    """An ISO date or datetime as an aware datetime (dates are midnight in
+    the current time zone). Raises ValueError if it is neither."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Not an ISO date or datetime: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(sites, start=None, end=None):
+    """Results of ``sites`` in [start, end), in (site, timestamp) order so the
+    scan follows the composite index."""
+    results = SiteCheckResult.objects.filter(site__in=sites)
+    if start is not None:
+        results = results.filter(timestamp__gte=start)
+    if end is not None:
+        results = results.filter(timestamp__lt=end)
+    return results.order_by('site_id', 'timestamp')
+
+
+def _rows(results, chunk_size):
+    fields = ['site_id', 'site__name'] + list(COLUMNS[2:])
+    return results.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_csv(results, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the results as CSV, header first, one bytes chunk per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue().encode()
+    for batch in _batched(_rows(results, chunk_size), chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            row[:2] + (row[2].isoformat(),) + row[3:]
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+
+
+def render_ndjson(results, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the results as one JSON object per line, a bytes chunk per chunk of rows."""
+    for batch in _batched(_rows(results, chunk_size), chunk_size):
+        lines = []
+        for row in batch:
+            record = dict(zip(COLUMNS, row))
+            record['timestamp'] = record['timestamp'].isoformat()
+            lines.append(json.dumps(record))
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of bytes chunks into one gzip stream."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(results, fmt, compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Bytes chunks of ``results`` rendered as ``fmt`` ('csv' or 'ndjson')."""
+    chunks = RENDERERS[fmt](results, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
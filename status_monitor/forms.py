@@ -1,11 +1,11 @@
 from django import forms
-from .models import MonitoredSite
+from .models import MaintenanceWindow, MonitoredSite
 
 
 class MonitoredSiteForm(forms.ModelForm):
     class Meta:
         model = MonitoredSite
-        fields = ['name', 'url', 'check_frequency']
+        fields = ['name', 'url', 'check_frequency', 'retention_days']
         
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
@@ -23,3 +23,34 @@ class MonitoredSiteForm(forms.ModelForm):
     def clean_name(self):
         name= self.cleaned_data.get('name', '')
         return name.title()
+
+
+class SiteImportRowForm(MonitoredSiteForm):
+    """One row of a bulk import. Duplicates are checked for all rows at once
+    by site_import.import_sites, so this skips the per-row queries."""
+
+    def clean_url(self):
+        return self.cleaned_data['url']
+
+    def validate_unique(self):
+        pass
+
+
+class SiteImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row, or a JSON list of objects, with name, url and optionally check_frequency and retention_days")
+    dry_run = forms.BooleanField(required=False, label="Only validate, don't create sites")
+
+
+class MaintenanceWindowForm(forms.ModelForm):
+    class Meta:
+        model = MaintenanceWindow
+        fields = ['site', 'reason', 'starts_at', 'ends_at', 'recurrence', 'repeat_until']
+        widgets = {
+            field: forms.DateTimeInput(attrs={'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M')
+            for field in ('starts_at', 'ends_at', 'repeat_until')
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        self.fields['site'].queryset = MonitoredSite.objects.filter(user=self.user).order_by('name')
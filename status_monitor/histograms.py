@@ -0,0 +1,63 @@
+import math
+
+# Latency histograms use fixed logarithmic buckets: bucket i holds values in
+# (GAMMA ** (i - 1), GAMMA ** i] seconds, so every value is within 10% of its
+# bucket bound. Histograms are sparse {str(index): count} dicts so they can be
+# stored as JSON and merged by adding counts.
+GAMMA = 1.1
+MIN_VALUE = 0.001
+
+
+def bucket_index(value):
+    return math.ceil(math.log(max(value, MIN_VALUE)) / math.log(GAMMA))
+
+
+def bucket_bound(index):
+    return GAMMA ** int(index)
+
+
+def add(histogram, value, count=1):
+    key = str(bucket_index(value))
+    histogram[key] = histogram.get(key, 0) + count
+    return histogram
+
+
+def merge(histogram, other):
+    for key, count in other.items():
+        histogram[key] = histogram.get(key, 0) + count
+    return histogram
+
+
+def quantile(histogram, q):
+    """
+    The ``q`` quantile (0 < q <= 1) of the values counted in ``histogram``,
+    as the upper bound of the bucket holding it (so at most 10% high), or
+    None if it is empty. Costs a sort of the bucket keys, not the values.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = max(math.ceil(q * total), 1)
+    seen = 0
+    for index in sorted(histogram, key=int):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_bound(index)
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(histogram, lo=None, hi=None):
+    """
+    {'p50': ..., 'p95': ..., 'p99': ...} of ``histogram``, clamped to
+    [lo, hi] (the exact min and max, where known) so a bucket bound never
+    reports more than the slowest value seen.
+    """
+    result = {}
+    for pct in PERCENTILES:
+        value = quantile(histogram, pct / 100)
+        if value is not None:
+            value = min(max(value, lo if lo is not None else value), hi if hi is not None else value)
+        result[f'p{pct}'] = value
+    return result
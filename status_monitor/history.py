@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+
+from .downsample import lttb
+from .models import CheckRollup, SiteCheckResult
+from .retention import retention_cutoff, rollup_cutoff
+from .rollups import BUCKET_SIZES, bucket_floor, window_stats
+
+# Selectable site_history ranges; None means everything the site has
+HISTORY_RANGES = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '90d': timedelta(days=90),
+    'all': None,
+}
+DEFAULT_HISTORY_RANGE = '24h'
+PHASE_FIELDS = [f'{phase}_time' for phase in SiteCheckResult.PHASES]
+
+
+def _series(site, start, end, expected_checks):
+    """
+    Yield (timestamp, response_time, total, up, phases) rows covering
+    [start, end), where phases holds each SiteCheckResult.PHASES time (raw
+    results only; rollups don't keep them, so None).
+
+    Raw results are used while the window holds at most HISTORY_RAW_LIMIT of
+    them and has not been pruned; otherwise the finest retained rollup
+    granularity with no more than that many buckets stands in, so the row
+    count is bounded either way. A rollup row is timestamped at the middle
+    of the part of its bucket inside the window, so a bucket still filling
+    up (or cut off at ``start``) lands where its checks are.
+    """
+    limit = settings.HISTORY_RAW_LIMIT
+    if expected_checks <= limit and start >= retention_cutoff(site, end):
+        rows = (
+            site.check_results
+            .filter(timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp')
+            .values_list('timestamp', 'response_time', 'is_up', *PHASE_FIELDS)
+        )
+        for timestamp, response_time, is_up, *phases in rows[:limit]:
+            yield timestamp, response_time, 1, int(is_up), phases
+        return
+
+    for granularity in (CheckRollup.MINUTE, CheckRollup.HOUR, CheckRollup.DAY):
+        cutoff = rollup_cutoff(granularity, end)
+        if (end - start) / BUCKET_SIZES[granularity] <= limit and (cutoff is None or start >= cutoff):
+            break
+    rows = (
+        site.rollups
+        .filter(granularity=granularity, bucket_start__gte=bucket_floor(start, granularity), bucket_start__lt=end)
+        .order_by('bucket_start')
+        .values_list('bucket_start', 'latency_sum', 'check_count', 'up_count')
+    )
+    size = BUCKET_SIZES[granularity]
+    for bucket_start, latency_sum, check_count, up_count in rows[:limit]:
+        if check_count:
+            lo, hi = max(bucket_start, start), min(bucket_start + size, end)
+            yield lo + (hi - lo) / 2, latency_sum / check_count, check_count, up_count, None
+
+
+def load_history(site, span, end):
+    """
+    Chart data for ``site`` over the ``span`` ending at ``end`` (or all of
+    its history when ``span`` is None): at most HISTORY_MAX_POINTS
+    LTTB-downsampled response times, with the phase breakdown of each
+    point where raw results back it, plus HISTORY_UPTIME_BARS uptime
+    buckets.
+    """
+    if span is None:
+        first_day = (
+            site.rollups.filter(granularity=CheckRollup.DAY)
+            .order_by('bucket_start')
+            .values_list('bucket_start', flat=True)
+            .first()
+        )
+        start = first_day or end - HISTORY_RANGES[DEFAULT_HISTORY_RANGE]
+    else:
+        start = end - span
+    stats = window_stats([site.pk], start, end)[site.pk]
+
+    bar_count = settings.HISTORY_UPTIME_BARS
+    bar_width = (end - start) / bar_count
+    bars = [{'start': start + bar_width * i, 'total': 0, 'up': 0} for i in range(bar_count)]
+    points = []
+    for timestamp, response_time, total, up, phases in _series(site, start, end, stats.check_count):
+        bar = bars[min(max(int((timestamp - start) / bar_width), 0), bar_count - 1)]
+        bar['total'] += total
+        bar['up'] += up
+        points.append((timestamp.timestamp(), response_time, phases))
+
+    for bar in bars:
+        if not bar['total']:
+            bar['state'] = 'empty'
+        elif bar['up'] == bar['total']:
+            bar['state'] = 'up'
+        elif bar['up']:
+            bar['state'] = 'partial'
+        else:
+            bar['state'] = 'down'
+        bar['uptime'] = round(bar['up'] / bar['total'] * 100, 2) if bar['total'] else None
+
+    points = lttb(points, settings.HISTORY_MAX_POINTS)
+    return {
+        'stats': stats,
+        'start': start,
+        'timestamps': [datetime.fromtimestamp(x, dt_timezone.utc).isoformat() for x, _, _ in points],
+        'response_times': [float(y) for _, y, _ in points],
+        'phase_times': {
+            phase: [phases[i] if phases else None for _, _, phases in points]
+            for i, phase in enumerate(SiteCheckResult.PHASES)
+        },
+        'uptime_bars': bars,
+    }
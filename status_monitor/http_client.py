@@ -0,0 +1,236 @@
+import socket
+import sys
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import _set_socket_options, allowed_gai_family
+
+from . import metrics
+
+
+class DNSCache:
+    """
+    getaddrinfo results per (host, port, family), kept for ``ttl`` seconds
+    and shared by every probe thread, so sites on the same hostname or
+    load balancer resolve once per TTL instead of once per probe.
+
+    getaddrinfo doesn't expose the records' own TTLs, so one configured TTL
+    (PROBE_DNS_TTL) applies to every name; 0 turns caching off. Failed
+    lookups aren't cached. Past ``max_entries`` the oldest entry goes.
+    """
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        key = (host, port, family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        addresses = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries.pop(key, None)
+                self._entries[key] = (now + self.ttl, addresses)
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+        return addresses
+
+    def counts(self):
+        """``(hits, misses)`` so far."""
+        with self._lock:
+            return self.hits, self.misses
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ProbeConnectionMixin:
+    """
+    Count the requests sent over a connection so a probe can tell whether
+    it paid for a fresh TCP/TLS handshake or reused a kept-alive socket, and
+    time the phases of each request on the monotonic clock.
+
+    After a request, ``phase_timings`` holds the seconds spent resolving
+    the host (dns), opening the TCP connection (connect), in the TLS
+    handshake (tls, None for plain HTTP) and from sending the request to
+    receiving the response headers (ttfb). The first three are 0 on a
+    reused connection.
+    """
+    requests_sent = 0
+    phase_timings = None
+    _connect_timings = None
+    # What the tls phase reads when no handshake happened: None for plain HTTP
+    _tls_default = None
+
+    def _resolve(self):
+        try:
+            return get_dns_cache().resolve(self._dns_host, self.port, allowed_gai_family())
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+
+    def _new_conn(self):
+        # urllib3's create_connection, split so name resolution is timed
+        # apart from the TCP handshake. Tracks urllib3 2.x's
+        # urllib3.connection.HTTPConnection._new_conn (and the private
+        # helpers imported above); recheck it when upgrading urllib3.
+        started = time.monotonic()
+        addresses = self._resolve()
+        resolved = time.monotonic()
+        err = None
+        for af, socktype, proto, _, address in addresses:
+            sock = None
+            try:
+                sock = socket.socket(af, socktype, proto)
+                _set_socket_options(sock, self.socket_options)
+                sock.settimeout(self.timeout)
+                if self.source_address:
+                    sock.bind(self.source_address)
+                sock.connect(address)
+                break
+            except socket.timeout as e:
+                sock.close()
+                raise ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                ) from e
+            except OSError as e:
+                err = e
+                if sock is not None:
+                    sock.close()
+        else:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {err or 'no addresses'}")
+
+        sys.audit("http.client.connect", self, self.host, self.port)
+        self._connect_timings = {'dns': resolved - started, 'connect': time.monotonic() - resolved, 'tls': self._tls_default}
+        return sock
+
+    def request(self, *args, **kwargs):
+        self.requests_sent += 1
+        # Plain HTTP connects lazily inside request(); HTTPS before it
+        super().request(*args, **kwargs)
+        self._request_sent_at = time.monotonic()
+        timings, self._connect_timings = self._connect_timings, None
+        self.phase_timings = timings or {'dns': 0.0, 'connect': 0.0, 'tls': self._tls_default}
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        if self.phase_timings is not None:
+            self.phase_timings['ttfb'] = time.monotonic() - self._request_sent_at
+        return response
+
+
+class ProbeHTTPConnection(ProbeConnectionMixin, HTTPConnection):
+    pass
+
+
+class ProbeHTTPSConnection(ProbeConnectionMixin, HTTPSConnection):
+    _tls_default = 0.0
+
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        timings = self._connect_timings
+        if timings is not None:
+            timings['tls'] = max(time.monotonic() - started - timings['dns'] - timings['connect'], 0.0)
+
+
+class ProbeHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = ProbeHTTPConnection
+
+
+class ProbeHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = ProbeHTTPSConnection
+
+
+class ProbeAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': ProbeHTTPConnectionPool,
+            'https': ProbeHTTPSConnectionPool,
+        }
+
+
+def reused_connection(response):
+    """True if ``response`` (fetched with stream=True, body not yet read)
+    came over a connection that had already served an earlier request."""
+    connection = getattr(response.raw, 'connection', None)
+    if connection is None:
+        return None
+    return connection.requests_sent > 1
+
+
+def phase_timings(response):
+    """A copy of the dns/connect/tls/ttfb timings of ``response`` (fetched
+    with stream=True, body not yet read), or None if unknown."""
+    connection = getattr(response.raw, 'connection', None)
+    timings = getattr(connection, 'phase_timings', None)
+    return dict(timings) if timings is not None else None
+
+
+def build_session():
+    adapter = ProbeAdapter(
+        pool_connections=settings.PROBE_POOL_HOSTS,
+        pool_maxsize=settings.PROBE_POOL_SIZE_PER_HOST,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # The session is shared by every probe thread; cookies set by one site
+    # must not leak into probes of another.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide pooled session used by all probes."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+_dns_cache = None
+
+
+def get_dns_cache():
+    """The process-wide DNS cache used by all probe connections."""
+    global _dns_cache
+    if _dns_cache is None:
+        with _session_lock:
+            if _dns_cache is None:
+                _dns_cache = DNSCache(settings.PROBE_DNS_TTL)
+    return _dns_cache
+
+
+@metrics.REGISTRY.collector
+def dns_metrics():
+    lookups = metrics.Counter('status_monitor_dns_cache_lookups_total', 'Probe DNS lookups, by cache result.', ['result'])
+    if _dns_cache is not None:
+        hits, misses = _dns_cache.counts()
+        lookups.inc(hits, result='hit')
+        lookups.inc(misses, result='miss')
+    return [lookups]
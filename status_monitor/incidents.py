@@ -0,0 +1,143 @@
+"""
+Incident detection on ingest.
+
+Each process keeps the last known state of every site it has written
+results for (SiteState: the current down streak), and each batch loads
+the open incidents of its sites with one query on the open-incident
+index, so a result costs O(1) however long the site's history is.
+An incident opens once INCIDENT_CONFIRM_CHECKS down checks in a row have
+been seen (probes already retry before recording down) and closes on the
+first up check. The open incident itself lives only in the database, so
+checker workers taking turns on a site agree on it; the down streak is
+per process, so with several writers and INCIDENT_CONFIRM_CHECKS above 1
+a streak split between them takes longer to confirm.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Incident
+from .retention import retention_cutoff
+from .signals import results_recorded
+
+
+class SiteState:
+    __slots__ = ('streak', 'down_since', 'status_code')
+
+    def __init__(self):
+        self.streak = 0
+        self.down_since = None
+        self.status_code = None
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def track(site_id, state, incident, results, confirm=None):
+    """
+    Feed one site's ``results`` (oldest first) through ``state``, starting
+    from its open ``incident`` (or None). Returns the incident still open
+    afterwards and every incident opened, extended or closed on the way,
+    none of them saved.
+    """
+    confirm = confirm or settings.INCIDENT_CONFIRM_CHECKS
+    touched = {}
+    for result in results:
+        if result.is_up:
+            state.streak = 0
+            if incident is not None:
+                incident.ended_at = result.timestamp
+                touched[id(incident)] = incident
+                incident = None
+            continue
+        if incident is not None:
+            incident.failed_checks += 1
+        else:
+            if not state.streak:
+                state.down_since, state.status_code = result.timestamp, result.status_code
+            state.streak += 1
+            if state.streak < confirm:
+                continue
+            incident = Incident(
+                site_id=site_id, started_at=state.down_since,
+                failed_checks=state.streak, status_code=state.status_code,
+            )
+        touched[id(incident)] = incident
+    return incident, list(touched.values())
+
+
+def save_incidents(incidents, ignore_conflicts=False):
+    # Closes go first: an incident opened in the same batch as its
+    # predecessor closed would otherwise hit the one-open-per-site
+    # constraint. With ignore_conflicts a duplicate open incident (another
+    # writer got there first) is dropped, but the new rows get no pk.
+    Incident.objects.bulk_update([i for i in incidents if i.pk is not None], ['ended_at', 'failed_checks'])
+    Incident.objects.bulk_create([i for i in incidents if i.pk is None], ignore_conflicts=ignore_conflicts)
+
+
+@receiver(results_recorded)
+def detect_incidents(sender, results, **kwargs):
+    by_site = {}
+    for result in results:
+        by_site.setdefault(result.site_id, []).append(result)
+
+    touched = []
+    with transaction.atomic():
+        open_incidents = {
+            incident.site_id: incident
+            for incident in Incident.objects.select_for_update().filter(site_id__in=by_site, ended_at__isnull=True)
+        }
+        for site_id, site_results in by_site.items():
+            with _states_lock:
+                state = _states.setdefault(site_id, SiteState())
+            site_results.sort(key=lambda result: result.timestamp)
+            touched += track(site_id, state, open_incidents.get(site_id), site_results)[1]
+        save_incidents(touched, ignore_conflicts=True)
+
+
+def rebuild_incidents(site, chunk_size=2000, now=None):
+    """
+    Replace ``site``'s incidents with ones detected from its raw history,
+    read oldest first in chunks. Returns the number of incidents created.
+
+    Only the raw history still kept (from the site's retention cutoff on)
+    is replayed. Incidents that started before the cutoff are kept; one
+    still going at the cutoff is carried into the replay with the failed
+    checks it had before it.
+    """
+    cutoff = retention_cutoff(site, now or timezone.now())
+    state, count = SiteState(), 0
+    with transaction.atomic():
+        incidents = Incident.objects.select_for_update().filter(site=site)
+        incidents.filter(started_at__gte=cutoff).delete()
+        incident = (
+            incidents.filter(started_at__lt=cutoff)
+            .filter(Q(ended_at__isnull=True) | Q(ended_at__gte=cutoff))
+            .first()
+        )
+        rows = site.check_results.filter(timestamp__gte=cutoff).order_by('timestamp').only('timestamp', 'is_up', 'status_code')
+        if incident is not None:
+            # The down checks up to the first up one are counted again below
+            recovered = rows.filter(is_up=True).values_list('timestamp', flat=True).first()
+            replayed = rows.filter(timestamp__lt=recovered) if recovered else rows
+            incident.failed_checks = max(incident.failed_checks - replayed.count(), 0)
+            incident.ended_at = None
+        chunk = []
+        for result in rows.iterator(chunk_size=chunk_size):
+            chunk.append(result)
+            if len(chunk) >= chunk_size:
+                incident, touched = track(site.pk, state, incident, chunk)
+                count += sum(1 for i in touched if i.pk is None)
+                save_incidents(touched)
+                chunk = []
+        incident, touched = track(site.pk, state, incident, chunk)
+        count += sum(1 for i in touched if i.pk is None)
+        save_incidents(touched)
+    with _states_lock:
+        _states[site.pk] = state
+    return count
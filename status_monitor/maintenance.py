@@ -0,0 +1,80 @@
+"""
+The maintenance index: which sites are in a maintenance window right now.
+
+Claiming asks this for every due site on every dispatch, so instead of a
+query per site the windows are expanded once into per-site sorted,
+merged intervals covering the next MAINTENANCE_INDEX_HOURS, and each
+lookup is a bisect. The index is rebuilt when that horizon runs out or
+the windows change; a change made in any process shows up in the one
+aggregate query (count and newest updated_at) run per lookup round.
+"""
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import MaintenanceWindow, MonitoredSite
+
+
+class MaintenanceIndex:
+    """Maintenance intervals per site id over [start, valid_until)."""
+
+    def __init__(self, windows, start, horizon):
+        self.start = start
+        self.valid_until = start + horizon
+        by_site = defaultdict(list)
+        for window in windows:
+            by_site[window.site_id].extend(window.occurrences(start, self.valid_until))
+
+        self._starts, self._ends = {}, {}
+        for site_id, intervals in by_site.items():
+            merged = []
+            for lo, hi in sorted(intervals):
+                if merged and lo <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], hi)
+                else:
+                    merged.append([lo, hi])
+            if merged:
+                self._starts[site_id] = [lo for lo, _ in merged]
+                self._ends[site_id] = [hi for _, hi in merged]
+
+    def window_end(self, site_id, at):
+        """When the maintenance ``site_id`` is in at ``at`` ends, or None if it isn't in one."""
+        starts = self._starts.get(site_id)
+        if not starts:
+            return None
+        i = bisect_right(starts, at) - 1
+        if i >= 0 and self._ends[site_id][i] > at:
+            return self._ends[site_id][i]
+        return None
+
+
+_index = None
+_fingerprint = None
+_lock = threading.Lock()
+
+
+def get_index(now=None):
+    """The current MaintenanceIndex, rebuilt if stale. One query when fresh."""
+    global _index, _fingerprint
+    now = now or timezone.now()
+    fingerprint = tuple(MaintenanceWindow.objects.aggregate(count=Count('id'), changed=Max('updated_at')).values())
+    with _lock:
+        if _index is None or fingerprint != _fingerprint or not _index.start <= now < _index.valid_until:
+            windows = MaintenanceWindow.objects.exclude(recurrence=MaintenanceWindow.ONCE, ends_at__lte=now)
+            _index = MaintenanceIndex(windows, now, timedelta(hours=settings.MAINTENANCE_INDEX_HOURS))
+            _fingerprint = fingerprint
+        return _index
+
+
+@receiver([post_save, post_delete], sender=MaintenanceWindow)
+def recheck_site(sender, instance, **kwargs):
+    # A site put off until a window's end is due again when the window is
+    # edited or removed, so it isn't left waiting for a window that moved
+    MonitoredSite.objects.filter(pk=instance.site_id).update(next_check_at=timezone.now())
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from status_monitor.incidents import rebuild_incidents
+from status_monitor.models import MonitoredSite
+
+class Command(BaseCommand):
+    help = ('Rebuild incidents from the raw SiteCheckResult history still kept, replacing the existing ones '
+            'from each site\'s retention cutoff on.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='Only rebuild the site with this id.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Results read per query.')
+
+    def handle(self, *args, **options):
+        sites = MonitoredSite.objects.all()
+        if options['site']:
+            sites = sites.filter(pk=options['site'])
+
+        for site in sites:
+            count = rebuild_incidents(site, chunk_size=options['chunk_size'])
+            self.stdout.write(f"Rebuilt incidents for {site.name}: {count}")
@@ -1,31 +1,89 @@
-from django.core.management.base import BaseCommand
-from status_monitor.models import MonitoredSite, SiteCheckResult
+import signal
+import threading
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
 from django.utils import timezone
-import requests, time
+from status_monitor import maintenance
+from status_monitor.pipeline import parse_shard, run_pipeline, select_sites
+from status_monitor.worker import default_worker_id, run_worker
 
 class Command(BaseCommand):
-    help = 'Check the status of monitored sites and log the results.'
-
-    def handle(self, *args, **kwargs):
-        monitored_sites = MonitoredSite.objects.all()
-        for site in monitored_sites:
-            start_time = time.time()
-            try:
-                response = requests.get(site.url, timeout=10)
-                response_time = time.time() - start_time
-                is_up = response.status_code == 200
-                status_code = response.status_code
-            except requests.RequestException:
-                response_time = time.time() - start_time
-                is_up = False
-                status_code = None
-
-            SiteCheckResult.objects.create(
-                site=site,
-                timestamp=timezone.now(),
-                status_code=status_code,
-                response_time=response_time,
-                is_up=is_up
+    help = (
+        'Check monitored sites through the probe pipeline and log the results. '
+        'By default every site (or every site in --shard) is checked once, skipping '
+        'sites in a maintenance window or leased by a checker worker; --loop keeps '
+        'checking sites as they fall due, like run_checker.'
+    )
+
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument('--once', action='store_true', help=(
+            'Check each selected site once and exit (default). Ad-hoc: results are saved, but no '
+            'leases are taken and schedules and circuit breakers are left as they are, so a worker '
+            'may still probe a site at the same time.'
+        ))
+        mode.add_argument('--loop', action='store_true', help='Keep checking due sites until interrupted.')
+        parser.add_argument('--concurrency', type=int, help='Parallel probes (default: PROBE_CONCURRENCY).')
+        parser.add_argument('--shard', help='Only check shard i of n, e.g. 0/4 (site id modulo n).')
+        parser.add_argument('--timeout', type=float, help='Per-request timeout in seconds (default: PROBE_TIMEOUT).')
+        parser.add_argument('--max-per-host', type=int, help='Concurrent probes per hostname, 0 for no limit (default: PROBE_MAX_PER_HOST).')
+        parser.add_argument('--dry-run', action='store_true', help='Probe but do not save any results.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            shard = parse_shard(options['shard']) if options['shard'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['loop'] and options['dry_run']:
+            raise CommandError("--dry-run only applies to --once runs; --loop advances the schedule.")
+
+        if options['loop']:
+            self.loop(shard, options)
+            return
+
+        stats = run_pipeline(
+            self.idle_sites(shard),
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+            dry_run=options['dry_run'],
+            on_result=self.log_result,
+            max_per_host=options['max_per_host'],
+        )
+        self.log_summary(stats)
+        if options['dry_run']:
+            self.stdout.write("Dry run: no results saved.")
+
+    def idle_sites(self, shard):
+        """Selected sites that aren't in maintenance or leased by a worker right now."""
+        now = timezone.now()
+        index = maintenance.get_index(now)
+        sites = select_sites(shard).filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+        return [site for site in sites if index.window_end(site.pk, now) is None]
+
+    def loop(self, shard, options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        self.stdout.write("Checking due sites; Ctrl+C to stop")
+        run_worker(
+            worker_id=default_worker_id(),
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+            max_per_host=options['max_per_host'],
+            shard=shard,
+            stop=stop,
+            on_batch=self.log_summary,
+            on_result=self.log_result,
+        )
+
+    def log_result(self, result):
+        if self.verbosity >= 2:
+            site = result.site
+            self.stdout.write(
+                f"Checked {site.name} ({site.url}): {'UP' if result.is_up else 'DOWN'}, "
+                f"Response Time: {result.response_time:.2f}s"
             )
 
-            self.stdout.write(f"Checked {site.name} ({site.url}): {'UP' if is_up else 'DOWN'}, Response Time: {response_time:.2f}s")
\ No newline at end of file
+    def log_summary(self, stats):
+        self.stdout.write(stats.summary())
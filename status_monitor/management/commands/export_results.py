@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from status_monitor.export import DEFAULT_CHUNK_SIZE, FORMATS, export_queryset, parse_bound, stream_export
+from status_monitor.models import MonitoredSite
+
+class Command(BaseCommand):
+    help = 'Stream raw check results as CSV or NDJSON, in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', help='Only export the site with this id (repeatable).')
+        parser.add_argument('--user', help='Only export the sites of the user with this username.')
+        parser.add_argument('--start', help='Export results at or after this ISO date or datetime.')
+        parser.add_argument('--end', help='Export results before this ISO date or datetime.')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+        parser.add_argument('--output', '-o', help='File to write; defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Results read per round trip.')
+
+    def handle(self, *args, **options):
+        sites = MonitoredSite.objects.all()
+        if options['site']:
+            sites = sites.filter(pk__in=options['site'])
+        if options['user']:
+            sites = sites.filter(user__username=options['user'])
+        try:
+            start = options['start'] and parse_bound(options['start'])
+            end = options['end'] and parse_bound(options['end'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        results = export_queryset(sites, start or None, end or None)
+        chunks = stream_export(results, options['format'], options['gzip'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+        else:
+            # Binary when stdout is a real stream; text (no gzip) otherwise
+            out = getattr(self.stdout, 'buffer', None)
+            if out is None and options['gzip']:
+                raise CommandError('--gzip needs --output when stdout is not a binary stream.')
+            for chunk in chunks:
+                if out is None:
+                    self.stdout.write(chunk.decode(), ending='')
+                else:
+                    out.write(chunk)
+            if out is not None:
+                out.flush()
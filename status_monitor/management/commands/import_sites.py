@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from status_monitor.site_import import format_of, import_sites, parse_rows
+
+class Command(BaseCommand):
+    help = 'Create sites for a user from a CSV or JSON file, reporting rows that fail validation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or JSON list of site objects.')
+        parser.add_argument('--user', required=True, help='Username that will own the sites.')
+        parser.add_argument('--format', choices=['csv', 'json'], help='File format; defaults to the file extension.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without creating sites.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                rows = parse_rows(f, options['format'] or format_of(options['path']))
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            raise CommandError(e)
+
+        report = import_sites(user, rows, dry_run=options['dry_run'])
+        for number, url, messages in report.errors:
+            self.stdout.write(f"Row {number} ({url or 'no url'}): {' '.join(messages)}")
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(f"{verb} {len(report.created)} of {report.rows} sites; {len(report.errors)} rows failed.")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from status_monitor.models import MonitoredSite
+from status_monitor.retention import prune_rollups, prune_site
+
+class Command(BaseCommand):
+    help = 'Delete raw check results and fine-grained rollups past their retention.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='Only prune the site with this id.')
+        parser.add_argument('--batch-size', type=int, help='Rows deleted per statement.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        sites = MonitoredSite.objects.all()
+        if options['site']:
+            sites = sites.filter(pk=options['site'])
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        for site in sites:
+            deleted, refolded = prune_site(site, now, options['batch_size'], options['dry_run'])
+            if deleted or refolded:
+                self.stdout.write(f"{verb} {deleted} results for {site.name} (refolded {refolded} days into rollups)")
+
+        if not options['site']:
+            for granularity, deleted in prune_rollups(now, options['batch_size'], options['dry_run']).items():
+                self.stdout.write(f"{verb} {deleted} {granularity} rollups")
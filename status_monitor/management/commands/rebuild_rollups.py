@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from status_monitor.models import MonitoredSite
+from status_monitor.retention import rebuild_rollups
+
+CHUNK_SIZE = 5000
+
+class Command(BaseCommand):
+    help = ('Rebuild minute/hour/day check rollups from the raw SiteCheckResult history still kept '
+            '(from each site\'s retention cutoff on); older rollups are kept.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='Only rebuild the site with this id.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        sites = MonitoredSite.objects.all()
+        if options['site']:
+            sites = sites.filter(pk=options['site'])
+
+        for site in sites:
+            folded = rebuild_rollups(site, now, CHUNK_SIZE)
+            self.stdout.write(f"Rebuilt rollups for {site.name} from {folded} results")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from status_monitor.counters import rebuild_uptime_counter
+from status_monitor.models import MonitoredSite
+
+class Command(BaseCommand):
+    help = 'Rebuild per-site uptime counters from raw SiteCheckResult history, and rollups where it was pruned.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, help='Only rebuild the site with this id.')
+
+    def handle(self, *args, **options):
+        sites = MonitoredSite.objects.all()
+        if options['site']:
+            sites = sites.filter(pk=options['site'])
+
+        for site in sites:
+            counter = rebuild_uptime_counter(site)
+            self.stdout.write(
+                f"Rebuilt uptime counter for {site.name}: "
+                f"{counter.uptime('24h'):.2f}% (24h), {counter.uptime('all'):.2f}% (all time)"
+            )
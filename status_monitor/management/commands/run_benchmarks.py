@@ -0,0 +1,53 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from status_monitor.benchmarks import compare, run_benchmarks
+
+class Command(BaseCommand):
+    help = 'Benchmark probe throughput and page cost over the seed_benchmark_data dataset; fully offline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark.json', help='Where to write the JSON report.')
+        parser.add_argument('--compare', help='Earlier report to check for regressions against.')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown as a fraction (default 0.2).')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per page benchmark.')
+        parser.add_argument('--probe-sites', type=int, help='Probe only the first N benchmark sites.')
+        parser.add_argument('--concurrency', type=int, help='Parallel probes (default: PROBE_CONCURRENCY).')
+        parser.add_argument('--timeout', type=float, help='Probe timeout in seconds (default: PROBE_TIMEOUT).')
+        parser.add_argument('--latency', type=float, default=0.05, help='Stub server response latency in seconds.')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Stub server latency jitter in seconds.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of stub responses that are 500s.')
+        parser.add_argument('--hang-rate', type=float, default=0.0, help='Fraction of stub requests that hang.')
+        parser.add_argument('--seed', type=int, default=0, help='Stub server random seed.')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmarks(
+                repeat=options['repeat'],
+                probe_sites=options['probe_sites'],
+                concurrency=options['concurrency'],
+                timeout=options['timeout'],
+                latency=options['latency'],
+                jitter=options['jitter'],
+                error_rate=options['error_rate'],
+                hang_rate=options['hang_rate'],
+                seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for bench, metrics in report['results'].items():
+            self.stdout.write(f"{bench}: " + ", ".join(f"{k}={v}" for k, v in metrics.items()))
+        self.stdout.write(f"Report written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare(report, baseline, options['threshold'])
+            for bench, metric, old, new in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {bench}.{metric}: {old} -> {new}"))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
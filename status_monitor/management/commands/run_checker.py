@@ -0,0 +1,33 @@
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from status_monitor.metrics import serve_metrics
+from status_monitor.worker import default_worker_id, run_worker
+
+class Command(BaseCommand):
+    help = 'Run a checker worker that claims and probes due sites until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', help='Lease owner name (default: hostname:pid).')
+        parser.add_argument('--batch-size', type=int, help='Sites claimed per lease.')
+        parser.add_argument('--concurrency', type=int, help='Parallel probes per batch.')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to wait when nothing is due.')
+        parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on this port.')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        worker_id = options['worker_id'] or default_worker_id()
+        self.stdout.write(f"Checker worker {worker_id} running; Ctrl+C to stop")
+        if options['metrics_port'] is not None:
+            server = serve_metrics(options['metrics_port'])
+            self.stdout.write(f"Metrics on port {server.server_address[1]}")
+        run_worker(
+            worker_id=worker_id,
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            stop=stop,
+        )
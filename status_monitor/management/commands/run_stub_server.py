@@ -0,0 +1,36 @@
+import signal
+import threading
+from django.core.management.base import BaseCommand
+from status_monitor.stub_server import start_stub_server
+
+class Command(BaseCommand):
+    help = 'Serve the local stub site for offline load tests (point benchmark sites at it).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.05, help='Response latency in seconds.')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Latency jitter in seconds.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of responses that are 500s.')
+        parser.add_argument('--hang-rate', type=float, default=0.0, help='Fraction of requests that hang.')
+        parser.add_argument('--hang-seconds', type=float, default=60.0, help='How long a hung request stalls.')
+        parser.add_argument('--seed', type=int, help='Random seed.')
+
+    def handle(self, *args, **options):
+        server = start_stub_server(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            hang_rate=options['hang_rate'],
+            hang_seconds=options['hang_seconds'],
+            seed=options['seed'],
+        )
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        self.stdout.write(f"Stub server on {server.url}; Ctrl+C to stop")
+        stop.wait()
+        server.shutdown()
+        server.server_close()
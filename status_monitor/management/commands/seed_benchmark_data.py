@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from status_monitor.benchmarks import DEFAULT_BASE_URL, clear_fixtures, generate_fixtures
+
+class Command(BaseCommand):
+    help = 'Generate benchmark sites and check history, owned by the "benchmark" user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=1000, help='Sites to create.')
+        parser.add_argument('--results-per-site', type=int, default=1000, help='Check results per site.')
+        parser.add_argument('--check-frequency', type=int, default=1, help='Minutes between generated checks.')
+        parser.add_argument('--up-ratio', type=float, default=0.98, help='Fraction of checks that are up.')
+        parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help='Site URLs are <base-url>/site/<n>.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data.')
+        parser.add_argument('--clear', action='store_true', help='Delete existing benchmark data first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_fixtures()
+            self.stdout.write(f"Deleted {deleted} existing benchmark rows")
+
+        total = options['sites'] * options['results_per_site']
+
+        def progress(site, written):
+            if written % 100000 < options['results_per_site']:
+                self.stdout.write(f"  {written}/{total} results")
+
+        sites = generate_fixtures(
+            sites=options['sites'],
+            results_per_site=options['results_per_site'],
+            base_url=options['base_url'],
+            check_frequency=options['check_frequency'],
+            up_ratio=options['up_ratio'],
+            seed=options['seed'],
+            progress=progress,
+        )
+        self.stdout.write(f"Created {len(sites)} sites with {total} check results")
@@ -0,0 +1,246 @@
+"""
+In-process counters, gauges and histograms exported in the Prometheus text
+format at /metrics (and by `run_checker --metrics-port` for workers).
+
+Each metric is a dict of label values to numbers behind a lock, so
+recording costs a dict update and, for histograms, a bisect; cheap enough
+to leave on in production. Every process keeps its own values, as
+Prometheus expects of a scrape target.
+"""
+import hmac
+import math
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+CYCLE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 240, 600)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+    def render(self):
+        return self.header() + self.samples()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """(cumulative bucket counts, sum, count) for one label set."""
+        with self._lock:
+            counts, total, count = self._values.get(self._key(labels), [[0] * len(self.buckets), 0.0, 0])
+            counts = list(counts)
+        cumulative, running = [], 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {running}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def collector(self, func):
+        """Register ``func``, called at scrape time and returning metrics
+        whose values are read from elsewhere (e.g. cache stats)."""
+        with self._lock:
+            self._collectors.append(func)
+        return func
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for collect in collectors:
+            for metric in collect():
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def authorized(header):
+    """Whether an Authorization header may scrape, given METRICS_TOKEN."""
+    token = settings.METRICS_TOKEN
+    return not token or hmac.compare_digest(header or '', f'Bearer {token}')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not authorized(self.headers.get('Authorization')):
+            self.send_error(403)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port, host=''):
+    """
+    Serve REGISTRY on ``host:port`` from a daemon thread, for processes
+    without a web server (run_checker). Returns the server.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Checker: probes, cycles, schedule and result writes
+PROBES = counter('status_monitor_probes_total', 'Probes completed, by outcome.', ['result'])
+PROBE_SECONDS = histogram('status_monitor_probe_seconds', 'Probe response time in seconds.')
+PROBE_PHASE_SECONDS = histogram('status_monitor_probe_phase_seconds', 'Probe time per phase in seconds.', ['phase'])
+PROBES_QUEUED = gauge('status_monitor_probes_queued', 'Probes submitted and waiting for a probe thread.')
+PROBES_IN_FLIGHT = gauge('status_monitor_probes_in_flight', 'Probes currently running.')
+HOST_QUEUE_WAIT_SECONDS = histogram('status_monitor_host_queue_wait_seconds', 'Time probes waited for a per-host slot, in seconds.')
+CYCLE_SECONDS = histogram('status_monitor_probe_cycle_seconds', 'Duration of one probe pipeline run in seconds.', buckets=CYCLE_BUCKETS)
+CYCLE_SITES = counter('status_monitor_probe_cycle_sites_total', 'Sites checked by probe pipeline runs.')
+MAINTENANCE_DEFERRALS = counter('status_monitor_maintenance_deferrals_total', 'Due sites put off until their maintenance window ends.')
+SCHEDULE_LAG_SECONDS = histogram('status_monitor_schedule_lag_seconds', 'How late sites were claimed after falling due, in seconds.', buckets=LAG_BUCKETS)
+PROBE_RETRIES = counter('status_monitor_probe_retries_total', 'Extra probe attempts made to confirm a failure.')
+CIRCUIT_TRANSITIONS = counter('status_monitor_circuit_transitions_total', 'Site circuit breaker state changes, by new state.', ['state'])
+RESULTS_BUFFERED = gauge('status_monitor_results_buffered', 'Probe results waiting in a ResultWriter buffer.')
+RESULTS_WRITTEN = counter('status_monitor_results_written_total', 'Check results written to the database.')
+RESULT_WRITE_SECONDS = histogram('status_monitor_result_write_seconds', 'Time to write one batch of results, including receivers, in seconds.')
+
+# Web: per view
+HTTP_REQUESTS = counter('status_monitor_http_requests_total', 'HTTP requests, by view, method and status.', ['view', 'method', 'status'])
+HTTP_REQUEST_SECONDS = histogram('status_monitor_http_request_seconds', 'Time to produce a response, by view, in seconds.', ['view'])
+DB_QUERIES = histogram('status_monitor_db_queries_per_request', 'Database queries per request, by view.', ['view'], buckets=QUERY_COUNT_BUCKETS)
+DB_QUERY_SECONDS = histogram('status_monitor_db_query_seconds', 'Total database time per request, by view, in seconds.', ['view'])
@@ -0,0 +1,48 @@
+import time
+
+from django.db import connection
+
+from . import metrics
+
+
+class QueryTimer:
+    """execute_wrapper that counts and times the queries it wraps."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.monotonic() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Record latency, query count and query time per view for /metrics.
+    Views are labelled by URL name, so the label set stays bounded.
+    Streamed bodies (the event stream) are timed up to the response
+    headers only.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.monotonic()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = time.monotonic() - started
+
+        match = request.resolver_match
+        view = (match.view_name or 'unnamed') if match else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, view=view)
+        metrics.DB_QUERIES.observe(timer.count, view=view)
+        metrics.DB_QUERY_SECONDS.observe(timer.seconds, view=view)
+        return response
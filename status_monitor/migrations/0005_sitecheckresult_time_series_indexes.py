@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-17 09:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building the
+    # indexes concurrently keeps the results table writable while they build.
+    atomic = False
+
+    dependencies = [
+        ('status_monitor', '0004_rename_response_ime_site_response_time_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='sitecheckresult',
+            index=models.Index(fields=['site', 'timestamp'], name='checkresult_site_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sitecheckresult',
+            index=django.contrib.postgres.indexes.BrinIndex(autosummarize=True, fields=['timestamp'], name='checkresult_ts_brin'),
+        ),
+        migrations.AlterField(
+            model_name='sitecheckresult',
+            name='site',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='check_results', to='status_monitor.monitoredsite'),
+        ),
+    ]
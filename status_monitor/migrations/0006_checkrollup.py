@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-17 10:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0005_sitecheckresult_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=6)),
+                ('bucket_start', models.DateTimeField()),
+                ('check_count', models.IntegerField(default=0)),
+                ('up_count', models.IntegerField(default=0)),
+                ('latency_min', models.FloatField(blank=True, null=True)),
+                ('latency_max', models.FloatField(blank=True, null=True)),
+                ('latency_sum', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=dict, help_text='Sparse log-bucket histogram, see histograms.py')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='status_monitor.monitoredsite')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='checkrollup',
+            constraint=models.UniqueConstraint(fields=('site', 'granularity', 'bucket_start'), name='rollup_site_bucket_uniq'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.25 on 2026-10-17 11:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0006_checkrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UptimeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_all', models.BigIntegerField(default=0)),
+                ('up_all', models.BigIntegerField(default=0)),
+                ('total_24h', models.IntegerField(default=0)),
+                ('up_24h', models.IntegerField(default=0)),
+                ('total_7d', models.IntegerField(default=0)),
+                ('up_7d', models.IntegerField(default=0)),
+                ('total_30d', models.IntegerField(default=0)),
+                ('up_30d', models.IntegerField(default=0)),
+                ('hourly', models.JSONField(default=list, help_text='[total, up] per hour for the last 30 days')),
+                ('current_hour', models.BigIntegerField(default=0, help_text='Hours since the epoch of the newest ring slot')),
+                ('site', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='uptime_counter', to='status_monitor.monitoredsite')),
+            ],
+        ),
+    ]
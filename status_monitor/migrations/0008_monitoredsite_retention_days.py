@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-17 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0007_uptimecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Days of raw check results to keep; blank uses the global default', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-17 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0008_monitoredsite_retention_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='connection_reused',
+            field=models.BooleanField(blank=True, help_text='Whether the probe reused a kept-alive connection', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-17 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0009_sitecheckresult_connection_reused'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='lease_owner',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
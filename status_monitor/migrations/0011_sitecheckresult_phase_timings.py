@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0010_monitoredsite_checker_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='body_time',
+            field=models.FloatField(blank=True, help_text='Seconds downloading the response body', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='connect_time',
+            field=models.FloatField(blank=True, help_text='Seconds opening the TCP connection', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='dns_time',
+            field=models.FloatField(blank=True, help_text='Seconds resolving the host name', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='tls_time',
+            field=models.FloatField(blank=True, help_text='Seconds in the TLS handshake', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitecheckresult',
+            name='ttfb_time',
+            field=models.FloatField(blank=True, help_text='Seconds from sending the request to the response headers', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0011_sitecheckresult_phase_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='circuit_state',
+            field=models.CharField(choices=[('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half-open')], default='closed', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='monitoredsite',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
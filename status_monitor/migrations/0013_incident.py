@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-17 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status_monitor', '0012_monitoredsite_circuit_breaker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Incident',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('failed_checks', models.PositiveIntegerField(default=0)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incidents', to='status_monitor.monitoredsite')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', '-started_at'], name='incident_site_started_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='incident',
+            constraint=models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('site',), name='incident_one_open_per_site'),
+        ),
+    ]
@@ -1,9 +1,21 @@
+import hashlib
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.contrib.postgres.indexes import BrinIndex
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from . import histograms
+from .signals import results_recorded
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='userprofile')
@@ -16,7 +28,24 @@ class MonitoredSite(models.Model):
     name = models.CharField(max_length = 100)
     url = models.URLField(unique = True)
     check_frequency = models.IntegerField(default = 5,help_text="Frequency (in minutes) to check site status")
+    retention_days = models.PositiveIntegerField(null=True, blank=True, help_text="Days of raw check results to keep; blank uses the global default")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'monitored_sites')
+    # Checker scheduling: when the site is next due, and which worker holds it until when
+    next_check_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    lease_owner = models.CharField(max_length=100, blank=True, default='')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    # Circuit breaker: checks recorded down in a row, and whether the site
+    # is being checked normally, backed off, or on a recovery probe
+    CIRCUIT_CLOSED = 'closed'
+    CIRCUIT_OPEN = 'open'
+    CIRCUIT_HALF_OPEN = 'half_open'
+    CIRCUIT_STATES = [
+        (CIRCUIT_CLOSED, 'Closed'),
+        (CIRCUIT_OPEN, 'Open'),
+        (CIRCUIT_HALF_OPEN, 'Half-open'),
+    ]
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    circuit_state = models.CharField(max_length=10, choices=CIRCUIT_STATES, default=CIRCUIT_CLOSED)
 
     class Meta:
         unique_together = ('user', 'url')
@@ -24,6 +53,55 @@ class MonitoredSite(models.Model):
     def __str__(self):
         return self.name
     
+    def reschedule(self, now=None):
+        """Bring the next check forward after a frequency change."""
+        soonest = (now or timezone.now()) + timedelta(minutes=max(self.check_frequency, 1))
+        if self.next_check_at is None or self.next_check_at > soonest:
+            self.next_check_at = soonest
+
+    def reset_circuit(self):
+        """Forget past failures (e.g. after a URL change) and check the site next."""
+        self.consecutive_failures = 0
+        self.circuit_state = self.CIRCUIT_CLOSED
+        self.next_check_at = None
+
+    @property
+    def probe_retries(self):
+        """
+        Extra attempts a failing probe gets before it is recorded as down.
+        Only a site that was up needs its failure confirmed; one already
+        down, or on a half-open recovery probe, gets a single attempt.
+        """
+        if self.consecutive_failures or self.circuit_state != self.CIRCUIT_CLOSED:
+            return 0
+        return settings.PROBE_MAX_RETRIES
+
+    def record_check(self, is_up, now=None):
+        """
+        Move the circuit on after a scheduled check and set next_check_at.
+
+        Up closes the circuit and keeps the site's cadence. After
+        CIRCUIT_FAILURE_THRESHOLD down checks in a row the circuit opens
+        and the next check backs off, doubling from CIRCUIT_BACKOFF_BASE
+        to CIRCUIT_BACKOFF_MAX seconds with each further failure; that
+        check is the half-open recovery probe.
+        """
+        now = now or timezone.now()
+        interval = timedelta(minutes=max(self.check_frequency, 1))
+        if is_up:
+            self.consecutive_failures = 0
+            self.circuit_state = self.CIRCUIT_CLOSED
+        else:
+            self.consecutive_failures += 1
+            excess = self.consecutive_failures - settings.CIRCUIT_FAILURE_THRESHOLD
+            if excess >= 0:
+                self.circuit_state = self.CIRCUIT_OPEN
+                backoff = min(settings.CIRCUIT_BACKOFF_BASE * 2 ** min(excess, 32), settings.CIRCUIT_BACKOFF_MAX)
+                self.next_check_at = now + max(interval, timedelta(seconds=backoff))
+                return
+        next_check_at = (self.next_check_at or now) + interval
+        self.next_check_at = next_check_at if next_check_at > now else now + interval
+
     def get_recent_checks(self,limit=20):
         return self.check_results.order_by('-timestamp')[:limit][::-1]
     
@@ -36,32 +114,369 @@ class MonitoredSite(models.Model):
     
 
     def get_status_summary(self, limit=20):
-        checks = self.get_recent_checks(limit)
-
-        return {
-            "site": self,
-            "latest_check": checks[-1] if checks else None,
-            "history": list(checks),
-            "timestamps": [c.timestamp.isoformat() for c in checks],
-            "response_times": [
-                float(c.response_time) if c.response_time is not None else None
-                for c in checks
-            ],
-            "status_points": ["Up" if c.is_up else "Down" for c in checks],
-            "uptime": self.calculate_uptime(checks),
-        }
-    
+        return build_status_summary(self, self.get_recent_checks(limit))
+
+
+def build_status_summary(site, checks):
+    """Dashboard summary for ``site`` from its recent checks, oldest first."""
+    return {
+        "site": site,
+        "latest_check": checks[-1] if checks else None,
+        "history": list(checks),
+        "timestamps": [c.timestamp.isoformat() for c in checks],
+        "response_times": [
+            float(c.response_time) if c.response_time is not None else None
+            for c in checks
+        ],
+        "status_points": ["Up" if c.is_up else "Down" for c in checks],
+        "phase_times": {
+            phase: [getattr(c, f"{phase}_time") for c in checks] for phase in SiteCheckResult.PHASES
+        },
+        "uptime": site.calculate_uptime(checks),
+    }
+
+
+# The latency histograms of the counter's site's hour rollups since %s,
+# merged into one (see histograms.py)
+_MERGED_HOURLY_HISTOGRAM_SQL = """
+    SELECT COALESCE(jsonb_object_agg(merged.key, merged.count), '{{}}'::jsonb) FROM (
+        SELECT e.key, SUM(e.value::int) AS count
+        FROM {rollups} r CROSS JOIN LATERAL jsonb_each_text(r.latency_histogram) e
+        WHERE r.site_id = {counters}.site_id AND r.granularity = 'hour' AND r.bucket_start >= %s
+        GROUP BY e.key
+    ) merged
+"""
+
+
+def get_status_summaries(sites, limit=20):
+    """
+    Status summaries for many sites with one query for their recent checks
+    and one for their uptime counters. The second also merges each site's
+    last 24 hour rollup histograms (current hour included, as for the 24h
+    uptime) into its p50/p95/p99 latency.
+
+    A LATERAL join takes the newest ``limit`` rows per site straight off the
+    (site, timestamp) index, so the cost tracks sites * limit rather than the
+    size of each site's history.
+    """
+    sites = list(sites)
+    if not sites:
+        return []
+
+    recent = SiteCheckResult.objects.raw(
+        f"""
+        SELECT c.* FROM {MonitoredSite._meta.db_table} s
+        CROSS JOIN LATERAL (
+            SELECT * FROM {SiteCheckResult._meta.db_table} r
+            WHERE r.site_id = s.id
+            ORDER BY r.timestamp DESC
+            LIMIT %s
+        ) c
+        WHERE s.id = ANY(%s)
+        ORDER BY c.site_id, c.timestamp
+        """,
+        [limit, [site.pk for site in sites]],
+    )
+
+    sites_by_pk = {site.pk: site for site in sites}
+    checks_by_site = {site.pk: [] for site in sites}
+    for check in recent:
+        check.site = sites_by_pk[check.site_id]
+        checks_by_site[check.site_id].append(check)
+
+    now = timezone.now()
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+    merged_histogram = RawSQL(
+        _MERGED_HOURLY_HISTOGRAM_SQL.format(
+            rollups=CheckRollup._meta.db_table, counters=UptimeCounter._meta.db_table,
+        ),
+        [since],
+        output_field=models.JSONField(),
+    )
+    counters = {
+        c.site_id: c
+        for c in UptimeCounter.objects.filter(site_id__in=sites_by_pk).annotate(latency_histogram_24h=merged_histogram)
+    }
+
+    summaries = []
+    for site in sites:
+        summary = build_status_summary(site, checks_by_site[site.pk])
+        counter = counters.get(site.pk)
+        summary["checks_24h"] = counter.counts('24h', now)[0] if counter else 0
+        summary["uptime_24h"] = counter.uptime('24h', now) if counter else 0.0
+        summary["latency_24h"] = histograms.percentiles(counter.latency_histogram_24h if counter else {})
+        summaries.append(summary)
+    return summaries
+
+
+def with_newest_check(sites):
+    """Annotate ``sites`` with the id of each one's newest check, read with
+    one index probe per site."""
+    newest = SiteCheckResult.objects.filter(site=OuterRef('pk')).order_by('-timestamp').values('pk')[:1]
+    return sites.annotate(newest_check=Subquery(newest))
+
+
+def status_token(site):
+    """What a site's status summary depends on, for a site from
+    with_newest_check: its own fields and its newest check."""
+    return (site.pk, site.name, site.url, site.check_frequency, site.newest_check)
+
+
+def status_fingerprint(sites, now=None):
+    """
+    A fingerprint of everything get_status_summaries(sites) depends on: each
+    site's status_token and the current hour, which moves the 24h uptime
+    window. ``sites`` may be a queryset (one query) or sites already loaded
+    through with_newest_check. It changes whenever a check lands or a site
+    is added, edited or removed.
+    """
+    if isinstance(sites, models.QuerySet):
+        sites = with_newest_check(sites)
+    hour = UptimeCounter.hour_of(now or timezone.now())
+    return hashlib.sha1(repr((hour, [status_token(site) for site in sites])).encode()).hexdigest()
+
 class SiteCheckResult(models.Model):
-    site = models.ForeignKey(MonitoredSite, on_delete=models.CASCADE, related_name='check_results')
+    # Probe phases timed into <phase>_time; null when unknown (failed probes
+    # and results from before phase timing), tls is null for plain HTTP
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body')
+
+    # Indexed through the (site, timestamp) composite below
+    site = models.ForeignKey(MonitoredSite, on_delete=models.CASCADE, related_name='check_results', db_index=False)
     timestamp= models.DateTimeField(default=timezone.now)
     status_code = models.IntegerField(null=True, blank= True)
     response_time = models.FloatField(help_text="Response time in seconds")
     is_up = models.BooleanField(default= False)
+    connection_reused = models.BooleanField(null=True, blank=True, help_text="Whether the probe reused a kept-alive connection")
+    dns_time = models.FloatField(null=True, blank=True, help_text="Seconds resolving the host name")
+    connect_time = models.FloatField(null=True, blank=True, help_text="Seconds opening the TCP connection")
+    tls_time = models.FloatField(null=True, blank=True, help_text="Seconds in the TLS handshake")
+    ttfb_time = models.FloatField(null=True, blank=True, help_text="Seconds from sending the request to the response headers")
+    body_time = models.FloatField(null=True, blank=True, help_text="Seconds downloading the response body")
+
+    class Meta:
+        indexes = [
+            # Per-site history in time order, newest-first via a backward scan
+            models.Index(fields=['site', 'timestamp'], name='checkresult_site_ts_idx'),
+            # Rows arrive in timestamp order, so a BRIN index covers time-range
+            # scans across all sites for a few pages instead of a full B-tree
+            BrinIndex(fields=['timestamp'], name='checkresult_ts_brin', autosummarize=True),
+        ]
     
     def __str__(self):
         return f"{self.site.name} - {self.timestamp} - {self.status_code}"
 
 
+class CheckRollup(models.Model):
+    """Per-site aggregate of the check results that fall in one time bucket."""
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(MINUTE, 'Minute'), (HOUR, 'Hour'), (DAY, 'Day')]
+
+    site = models.ForeignKey(MonitoredSite, on_delete=models.CASCADE, related_name='rollups')
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    check_count = models.IntegerField(default=0)
+    up_count = models.IntegerField(default=0)
+    latency_min = models.FloatField(null=True, blank=True)
+    latency_max = models.FloatField(null=True, blank=True)
+    latency_sum = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=dict, help_text="Sparse log-bucket histogram, see histograms.py")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['site', 'granularity', 'bucket_start'], name='rollup_site_bucket_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.site.name} - {self.granularity} - {self.bucket_start}"
+
+
+class UptimeCounter(models.Model):
+    """
+    Running check totals for one site over sliding 24h, 7d and 30d windows and
+    all time, so uptime is read without touching SiteCheckResult.
+
+    ``hourly`` is a ring of [total, up] pairs, one per hour for the last 30
+    days, indexed by hour % RING_HOURS. As the newest hour moves forward the
+    hours falling out of each window are subtracted from its totals.
+    """
+    RING_HOURS = 720
+    WINDOWS = {'24h': 24, '7d': 168, '30d': 720, 'all': None}
+
+    site = models.OneToOneField(MonitoredSite, on_delete=models.CASCADE, related_name='uptime_counter')
+    total_all = models.BigIntegerField(default=0)
+    up_all = models.BigIntegerField(default=0)
+    total_24h = models.IntegerField(default=0)
+    up_24h = models.IntegerField(default=0)
+    total_7d = models.IntegerField(default=0)
+    up_7d = models.IntegerField(default=0)
+    total_30d = models.IntegerField(default=0)
+    up_30d = models.IntegerField(default=0)
+    hourly = models.JSONField(default=list, help_text="[total, up] per hour for the last 30 days")
+    current_hour = models.BigIntegerField(default=0, help_text="Hours since the epoch of the newest ring slot")
+
+    def __str__(self):
+        return f"{self.site.name} uptime counter"
+
+    @staticmethod
+    def hour_of(ts):
+        return int(ts.timestamp() // 3600)
+
+    def _windows(self):
+        return [(hours, window) for window, hours in self.WINDOWS.items() if hours]
+
+    def reset(self, hour):
+        self.hourly = [[0, 0] for _ in range(self.RING_HOURS)]
+        self.current_hour = hour
+        for _, window in self._windows():
+            setattr(self, f'total_{window}', 0)
+            setattr(self, f'up_{window}', 0)
+
+    def advance(self, hour):
+        """Move the newest slot forward to ``hour``, expiring old hours."""
+        if not self.hourly or hour - self.current_hour >= self.RING_HOURS:
+            self.reset(hour)
+            return
+        for h in range(self.current_hour + 1, hour + 1):
+            for hours, window in self._windows():
+                total, up = self.hourly[(h - hours) % self.RING_HOURS]
+                setattr(self, f'total_{window}', getattr(self, f'total_{window}') - total)
+                setattr(self, f'up_{window}', getattr(self, f'up_{window}') - up)
+            self.hourly[h % self.RING_HOURS] = [0, 0]
+        self.current_hour = max(self.current_hour, hour)
+
+    def add_counts(self, hour, total, up):
+        self.advance(hour)
+        self.total_all += total
+        self.up_all += up
+        age = self.current_hour - hour
+        if age >= self.RING_HOURS:
+            return
+        slot = self.hourly[hour % self.RING_HOURS]
+        slot[0] += total
+        slot[1] += up
+        for hours, window in self._windows():
+            if age < hours:
+                setattr(self, f'total_{window}', getattr(self, f'total_{window}') + total)
+                setattr(self, f'up_{window}', getattr(self, f'up_{window}') + up)
+
+    def add(self, result):
+        self.add_counts(self.hour_of(result.timestamp), 1, 1 if result.is_up else 0)
+
+    def counts(self, window, now=None):
+        """(total, up) for ``window`` as of ``now`` without modifying the counter."""
+        hours = self.WINDOWS[window]
+        if hours is None:
+            return self.total_all, self.up_all
+        total, up = getattr(self, f'total_{window}'), getattr(self, f'up_{window}')
+        lag = self.hour_of(now or timezone.now()) - self.current_hour
+        if lag >= hours:
+            return 0, 0
+        for h in range(self.current_hour - hours + 1, self.current_hour - hours + 1 + max(lag, 0)):
+            expired_total, expired_up = self.hourly[h % self.RING_HOURS]
+            total -= expired_total
+            up -= expired_up
+        return total, up
+
+    def uptime(self, window, now=None):
+        total, up = self.counts(window, now)
+        return round(up / total * 100, 2) if total else 0.0
+
+
+class Incident(models.Model):
+    """
+    A run of down checks for one site, from the first down check to the
+    check that came back up (``ended_at`` is null while it is ongoing).
+    Opened and closed by incidents.py as results are written.
+    """
+    site = models.ForeignKey(MonitoredSite, on_delete=models.CASCADE, related_name='incidents')
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+    failed_checks = models.PositiveIntegerField(default=0)
+    # Of the first down check; null when no response came back at all
+    status_code = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', '-started_at'], name='incident_site_started_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['site'], condition=models.Q(ended_at__isnull=True), name='incident_one_open_per_site',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.site.name} down since {self.started_at}"
+
+    @property
+    def is_open(self):
+        return self.ended_at is None
+
+
+class MaintenanceWindow(models.Model):
+    """
+    Planned downtime for one site over [starts_at, ends_at), once or
+    repeating every day or week (fixed UTC periods) until repeat_until.
+    Checker workers don't probe a site during its windows; see
+    maintenance.py.
+    """
+    ONCE = 'once'
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    RECURRENCE_CHOICES = [(ONCE, 'Once'), (DAILY, 'Daily'), (WEEKLY, 'Weekly')]
+    PERIODS = {DAILY: timedelta(days=1), WEEKLY: timedelta(weeks=1)}
+
+    site = models.ForeignKey(MonitoredSite, on_delete=models.CASCADE, related_name='maintenance_windows')
+    reason = models.CharField(max_length=200, blank=True)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    recurrence = models.CharField(max_length=6, choices=RECURRENCE_CHOICES, default=ONCE)
+    repeat_until = models.DateTimeField(null=True, blank=True, help_text="Last day a recurring window starts; blank repeats forever")
+    # Lets workers notice edits made by other processes, see maintenance.py
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.site.name} maintenance from {self.starts_at}"
+
+    def clean(self):
+        if self.starts_at and self.ends_at:
+            if self.ends_at <= self.starts_at:
+                raise ValidationError("A maintenance window must end after it starts.")
+            period = self.PERIODS.get(self.recurrence)
+            if period and self.ends_at - self.starts_at >= period:
+                raise ValidationError(f"A {self.recurrence} window must be shorter than its period.")
+
+    def occurrences(self, start, end):
+        """Yield the (start, end) of each occurrence overlapping [start, end)."""
+        period = self.PERIODS.get(self.recurrence)
+        if period is None:
+            if self.starts_at < end and self.ends_at > start:
+                yield self.starts_at, self.ends_at
+            return
+        duration = self.ends_at - self.starts_at
+        # Skip straight to the first occurrence that can still overlap
+        occurrence = self.starts_at + max(math.ceil((start - self.ends_at) / period), 0) * period
+        while occurrence < end and (self.repeat_until is None or occurrence <= self.repeat_until):
+            if occurrence + duration > start:
+                yield occurrence, occurrence + duration
+            occurrence += period
+
+    def next_occurrence(self, now=None):
+        """The current or next occurrence as (start, end), or None if none is left."""
+        now = now or timezone.now()
+        horizon = now + self.PERIODS.get(self.recurrence, timedelta(0)) + (self.ends_at - self.starts_at)
+        return next(self.occurrences(now, max(horizon, self.ends_at)), None)
+
+
+@receiver(post_save, sender=SiteCheckResult)
+def announce_check_result(sender, instance, created, **kwargs):
+    # bulk_create skips post_save; ResultWriter sends results_recorded itself
+    if created:
+        results_recorded.send(sender=SiteCheckResult, results=[instance])
+
+
 @receiver(post_save, sender=User)
 def manage_user_profile(sender, instance, created, **kwargs):
     if created:
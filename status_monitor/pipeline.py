@@ -0,0 +1,151 @@
+"""
+The check pipeline shared by the scheduler, the checker workers and the
+check_sites command. A run goes through four stages:
+
+    select   -> which sites to check (all, a shard, or the due ones)
+    probe    -> fetch each site on a bounded thread pool (probes.probe_sites)
+    classify -> turn the status code into up/down (probes.classify)
+    persist  -> batch the results into the database (writers.ResultWriter)
+"""
+import math
+import time
+from contextlib import nullcontext
+
+from django.db.models.functions import Mod
+
+from . import metrics
+from .http_client import get_dns_cache
+from .models import MonitoredSite
+from .probes import probe_sites
+from .writers import ResultWriter
+
+
+def parse_shard(value):
+    """Parse an ``i/n`` shard spec into ``(i, n)`` with 0 <= i < n."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid shard {value!r}; expected i/n, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}; need 0 <= i < n.")
+    return index, count
+
+
+def in_shard(queryset, shard):
+    """Restrict a MonitoredSite queryset to shard ``(i, n)`` by id modulo n."""
+    if shard is None:
+        return queryset
+    index, count = shard
+    return queryset.annotate(shard=Mod('id', count)).filter(shard=index)
+
+
+def record_result(result):
+    """Export one probe's outcome and timings to /metrics."""
+    metrics.PROBES.inc(result='up' if result.is_up else 'down')
+    metrics.PROBE_SECONDS.observe(result.response_time)
+    for phase, seconds in (result.phases or {}).items():
+        if seconds is not None:
+            metrics.PROBE_PHASE_SECONDS.observe(seconds, phase=phase)
+
+
+def select_sites(shard=None):
+    return in_shard(MonitoredSite.objects.order_by('id'), shard)
+
+
+class PipelineStats:
+    """
+    Throughput and latency of one pipeline run, with the DNS cache hits
+    and per-host queue waits behind them. DNS counts are the process-wide
+    cache's, so they include any cycle overlapping this one.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.checked_ids = set()
+        # Site id -> is_up of its result, for the circuit breaker
+        self.outcomes = {}
+        self.up = 0
+        self.response_times = []
+        self.queue_waits = []
+        self._dns_counts = get_dns_cache().counts()
+        self.dns_hits = self.dns_misses = 0
+
+    def add(self, result):
+        self.checked_ids.add(result.site.pk)
+        self.outcomes[result.site.pk] = result.is_up
+        self.up += result.is_up
+        self.response_times.append(result.response_time)
+        self.queue_waits.append(result.queue_wait)
+
+    def finish(self):
+        self.finished = time.monotonic()
+        hits, misses = get_dns_cache().counts()
+        self.dns_hits, self.dns_misses = hits - self._dns_counts[0], misses - self._dns_counts[1]
+        return self
+
+    @property
+    def checked(self):
+        return len(self.response_times)
+
+    @property
+    def down(self):
+        return self.checked - self.up
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def sites_per_second(self):
+        return self.checked / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def dns_hit_ratio(self):
+        lookups = self.dns_hits + self.dns_misses
+        return self.dns_hits / lookups if lookups else None
+
+    def percentile(self, pct, values=None):
+        """Nearest-rank percentile of the probe times (or ``values``), or None if empty."""
+        values = self.response_times if values is None else values
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+
+    def summary(self):
+        p95 = self.percentile(95)
+        wait_p95 = self.percentile(95, self.queue_waits)
+        hit_ratio = self.dns_hit_ratio
+        return (
+            f"{self.checked} sites checked in {self.elapsed:.2f}s "
+            f"({self.sites_per_second:.1f} sites/s), {self.up} up, {self.down} down, "
+            f"p95 probe time {'-' if p95 is None else f'{p95:.3f}s'}, "
+            f"p95 host queue wait {'-' if wait_p95 is None else f'{wait_p95:.3f}s'}, "
+            f"DNS cache hits {'-' if hit_ratio is None else f'{hit_ratio:.0%}'}"
+        )
+
+
+def run_pipeline(sites, concurrency=None, timeout=None, deadline=None, dry_run=False, on_result=None,
+                 max_per_host=None):
+    """
+    Probe, classify and (unless ``dry_run``) persist ``sites``. Calls
+    ``on_result`` with each ProbeResult as it completes and returns the
+    run's PipelineStats.
+    """
+    stats = PipelineStats()
+    with (nullcontext() if dry_run else ResultWriter()) as writer:
+        probes = probe_sites(sites, concurrency=concurrency, deadline=deadline, timeout=timeout,
+                             max_per_host=max_per_host)
+        for result in probes:
+            if writer is not None:
+                writer.add(result)
+            stats.add(result)
+            record_result(result)
+            if on_result:
+                on_result(result)
+    stats.finish()
+    metrics.CYCLE_SECONDS.observe(stats.elapsed)
+    metrics.CYCLE_SITES.inc(stats.checked)
+    return stats
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, zip_longest
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .http_client import get_session, phase_timings, reused_connection
+
+logger = logging.getLogger(__name__)
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ProbeResult:
+    site: object
+    timestamp: datetime
+    status_code: int = None
+    response_time: float = 0.0
+    is_up: bool = False
+    connection_reused: bool = None
+    # Seconds per SiteCheckResult.PHASES name, when known
+    phases: dict = None
+    # Seconds spent waiting for a per-host slot before the probe started
+    queue_wait: float = 0.0
+    # Requests made; more than one when a failure was retried to confirm it
+    attempts: int = 1
+
+
+def classify(status_code):
+    """Whether a response with ``status_code`` means the site is up."""
+    return status_code is not None and 200 <= status_code < 400
+
+
+def host_of(site):
+    return (urlsplit(site.url).hostname or site.url).lower()
+
+
+class HostLimiter:
+    """
+    At most ``limit`` concurrent probes per hostname; further probes of a
+    host wait for a slot. Shared by every probe thread in the process, so
+    the cap holds across overlapping cycles too.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host, limit):
+        """Hold one of ``host``'s slots; yields the seconds waited for it."""
+        if not limit:
+            yield 0.0
+            return
+        key = (host, limit)
+        with self._lock:
+            # [semaphore, probes holding or waiting]; dropped once idle
+            entry = self._slots.setdefault(key, [threading.Semaphore(limit), 0])
+            entry[1] += 1
+        started = time.monotonic()
+        entry[0].acquire()
+        try:
+            waited = time.monotonic() - started
+            metrics.HOST_QUEUE_WAIT_SECONDS.observe(waited)
+            yield waited
+        finally:
+            entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._slots[key]
+
+
+host_limiter = HostLimiter()
+
+
+def interleave_by_host(sites):
+    """
+    Reorder ``sites`` round-robin across hostnames, so a host with many
+    sites doesn't take every pool thread while they queue for its slots.
+    """
+    by_host = OrderedDict()
+    for site in sites:
+        by_host.setdefault(host_of(site), []).append(site)
+    return [site for site in chain.from_iterable(zip_longest(*by_host.values())) if site is not None]
+
+
+def probe_site(site, timeout=None, max_per_host=None, retries=None):
+    """
+    Probe a single site and return the measurement (no database access).
+    Each attempt waits first for a slot under the per-host limit
+    (PROBE_MAX_PER_HOST unless ``max_per_host`` is given); the wait isn't
+    part of the response time. A failed attempt is retried up to
+    ``retries`` times (default: site.probe_retries) after a doubling
+    PROBE_RETRY_DELAY, and the last attempt is returned.
+    """
+    if timeout is None:
+        timeout = settings.PROBE_TIMEOUT
+    if max_per_host is None:
+        max_per_host = settings.PROBE_MAX_PER_HOST
+    if retries is None:
+        retries = site.probe_retries
+    queue_wait = 0.0
+    for attempt in range(retries + 1):
+        if attempt:
+            metrics.PROBE_RETRIES.inc()
+            time.sleep(settings.PROBE_RETRY_DELAY * 2 ** (attempt - 1))
+        with host_limiter.slot(host_of(site), max_per_host) as waited:
+            result = _fetch(site, timeout)
+        queue_wait += waited
+        if result.is_up:
+            break
+    result.queue_wait = queue_wait
+    result.attempts = attempt + 1
+    return result
+
+
+def _fetch(site, timeout):
+    session = get_session()
+    connection_reused = phases = None
+    start_time = time.monotonic()
+    try:
+        with session.get(site.url, timeout=timeout, stream=True) as response:
+            headers_at = time.monotonic()
+            connection_reused = reused_connection(response)
+            phases = phase_timings(response)
+            # Download the body, as requests.get would, without holding it
+            for _ in response.iter_content(BODY_CHUNK_SIZE):
+                pass
+            if phases is not None:
+                phases['body'] = time.monotonic() - headers_at
+        response_time = time.monotonic() - start_time
+        status_code = response.status_code
+    except requests.RequestException:
+        response_time = time.monotonic() - start_time
+        status_code = None
+        phases = None
+
+    return ProbeResult(
+        site=site,
+        timestamp=timezone.now(),
+        status_code=status_code,
+        response_time=response_time,
+        is_up=classify(status_code),
+        connection_reused=connection_reused,
+        phases=phases,
+    )
+
+
+def _pooled_probe(site, timeout, max_per_host):
+    metrics.PROBES_QUEUED.dec()
+    metrics.PROBES_IN_FLIGHT.inc()
+    try:
+        return probe_site(site, timeout, max_per_host)
+    finally:
+        metrics.PROBES_IN_FLIGHT.dec()
+
+
+def probe_sites(sites, concurrency=None, deadline=None, timeout=None, max_per_host=None):
+    """
+    Probe ``sites`` in parallel on a bounded thread pool, yielding a
+    ProbeResult for each one as it completes. Sites are submitted
+    round-robin by host and each probe honours the per-host limit.
+
+    Probes that haven't finished when ``deadline`` seconds have passed,
+    whether queued for a worker, waiting for a host slot or mid-request,
+    yield no result: the site stays due and the next cycle picks it up.
+    Reporting them down would turn our own per-host queueing into false
+    outages. Slow hosts are still caught by the per-request timeout.
+    """
+    sites = interleave_by_host(sites)
+    if not sites:
+        return
+    concurrency = concurrency or settings.PROBE_CONCURRENCY
+    if deadline is None:
+        deadline = settings.PROBE_CYCLE_DEADLINE
+
+    executor = ThreadPoolExecutor(max_workers=min(concurrency, len(sites)), thread_name_prefix='probe')
+    metrics.PROBES_QUEUED.inc(len(sites))
+    futures = {executor.submit(_pooled_probe, site, timeout, max_per_host): site for site in sites}
+    pending = set(futures)
+    try:
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                pending.discard(future)
+                yield future.result()
+        except FuturesTimeout:
+            skipped = 0
+            for future in pending:
+                if future.done() and not future.cancelled():
+                    yield future.result()
+                else:
+                    future.cancel()
+                    skipped += 1
+            if skipped:
+                logger.warning("Probe cycle deadline of %ss reached; %d site(s) left due for the next cycle.", deadline, skipped)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        metrics.PROBES_QUEUED.dec(sum(future.cancelled() for future in futures))
@@ -0,0 +1,125 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDay
+
+from .models import CheckRollup, SiteCheckResult
+from .rollups import BUCKET_SIZES, bucket_floor, fold_results
+
+
+def retention_cutoff(site, now):
+    """
+    Raw results for ``site`` older than this may have been pruned. Aligned to
+    a UTC day so a day's raw rows are always pruned together.
+    """
+    days = site.retention_days or settings.RESULT_RETENTION_DAYS
+    return bucket_floor(now - timedelta(days=days), CheckRollup.DAY)
+
+
+def _fold_range(site, start, end, batch_size):
+    """Replace ``site``'s rollups in [start, end) (end None for no bound) with
+    ones folded from its raw results there. Returns the results folded."""
+    rollups = site.rollups.filter(bucket_start__gte=start)
+    rows = site.check_results.filter(timestamp__gte=start)
+    if end is not None:
+        rollups = rollups.filter(bucket_start__lt=end)
+        rows = rows.filter(timestamp__lt=end)
+    rollups.delete()
+    folded = 0
+    batch = []
+    for result in rows.order_by('timestamp').iterator(chunk_size=batch_size):
+        batch.append(result)
+        if len(batch) >= batch_size:
+            fold_results(batch)
+            folded += len(batch)
+            batch = []
+    fold_results(batch)
+    return folded + len(batch)
+
+
+def rebuild_rollups(site, now, batch_size=None):
+    """
+    Rebuild ``site``'s rollups from the raw results it still keeps, those
+    from its retention cutoff on. Rollups before the cutoff are the only
+    record of pruned days, so they are left alone. Returns the results folded.
+    """
+    batch_size = batch_size or settings.PRUNE_BATCH_SIZE
+    with transaction.atomic():
+        return _fold_range(site, retention_cutoff(site, now), None, batch_size)
+
+
+def rollup_cutoff(granularity, now):
+    days = settings.ROLLUP_RETENTION_DAYS.get(granularity)
+    return None if days is None else now - timedelta(days=days)
+
+
+def _delete_in_batches(queryset, batch_size, dry_run):
+    """
+    Delete ``queryset`` a batch of primary keys at a time so each statement
+    touches a bounded number of rows and holds its locks only briefly.
+    """
+    if dry_run:
+        return queryset.count()
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def fold_expired_days(site, cutoff, batch_size):
+    """
+    Make sure every day of raw results about to be pruned is reflected in the
+    rollups. Days whose day rollup counts fewer checks than there are raw rows
+    (history from before rollups existed) have their rollups rebuilt from the
+    raw rows. Returns the number of days refolded.
+    """
+    expired = site.check_results.filter(timestamp__lt=cutoff)
+    raw_days = dict(
+        expired.annotate(day=TruncDay('timestamp', tzinfo=dt_timezone.utc))
+        .values('day')
+        .annotate(n=Count('id'))
+        .values_list('day', 'n')
+    )
+    if not raw_days:
+        return 0
+    rolled_days = dict(
+        site.rollups.filter(granularity=CheckRollup.DAY, bucket_start__in=raw_days)
+        .values_list('bucket_start', 'check_count')
+    )
+
+    refolded = 0
+    for day, count in sorted(raw_days.items()):
+        if rolled_days.get(day, 0) >= count:
+            continue
+        _fold_range(site, day, day + BUCKET_SIZES[CheckRollup.DAY], batch_size)
+        refolded += 1
+    return refolded
+
+
+def prune_site(site, now, batch_size=None, dry_run=False):
+    """Fold and then delete ``site``'s raw results past its retention."""
+    batch_size = batch_size or settings.PRUNE_BATCH_SIZE
+    cutoff = retention_cutoff(site, now)
+    refolded = 0 if dry_run else fold_expired_days(site, cutoff, batch_size)
+    deleted = _delete_in_batches(
+        SiteCheckResult.objects.filter(site=site, timestamp__lt=cutoff), batch_size, dry_run
+    )
+    return deleted, refolded
+
+
+def prune_rollups(now, batch_size=None, dry_run=False):
+    """Delete minute and hour rollups past ROLLUP_RETENTION_DAYS."""
+    batch_size = batch_size or settings.PRUNE_BATCH_SIZE
+    deleted = {}
+    for granularity in (CheckRollup.MINUTE, CheckRollup.HOUR):
+        cutoff = rollup_cutoff(granularity, now)
+        if cutoff is None:
+            continue
+        expired = CheckRollup.objects.filter(granularity=granularity, bucket_start__lt=cutoff)
+        deleted[granularity] = _delete_in_batches(expired, batch_size, dry_run)
+    return deleted
@@ -0,0 +1,170 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.db.models import Q
+from django.dispatch import receiver
+
+from . import histograms
+from .models import CheckRollup
+from .signals import results_recorded
+
+GRANULARITIES = [CheckRollup.MINUTE, CheckRollup.HOUR, CheckRollup.DAY]
+BUCKET_SIZES = {
+    CheckRollup.MINUTE: timedelta(minutes=1),
+    CheckRollup.HOUR: timedelta(hours=1),
+    CheckRollup.DAY: timedelta(days=1),
+}
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def bucket_floor(ts, granularity):
+    size = BUCKET_SIZES[granularity]
+    return EPOCH + (ts - EPOCH) // size * size
+
+
+def bucket_ceil(ts, granularity):
+    floor = bucket_floor(ts, granularity)
+    return floor if floor == ts else floor + BUCKET_SIZES[granularity]
+
+
+class RollupStats:
+    """Running aggregate over any number of rollup buckets or raw results."""
+
+    def __init__(self):
+        self.check_count = 0
+        self.up_count = 0
+        self.latency_min = None
+        self.latency_max = None
+        self.latency_sum = 0.0
+        self.histogram = {}
+
+    def add_result(self, result):
+        latency = result.response_time
+        self.check_count += 1
+        self.up_count += 1 if result.is_up else 0
+        self.latency_sum += latency
+        self.latency_min = latency if self.latency_min is None else min(self.latency_min, latency)
+        self.latency_max = latency if self.latency_max is None else max(self.latency_max, latency)
+        histograms.add(self.histogram, latency)
+
+    def add_rollup(self, rollup):
+        self.check_count += rollup.check_count
+        self.up_count += rollup.up_count
+        self.latency_sum += rollup.latency_sum
+        if rollup.latency_min is not None:
+            self.latency_min = rollup.latency_min if self.latency_min is None else min(self.latency_min, rollup.latency_min)
+        if rollup.latency_max is not None:
+            self.latency_max = rollup.latency_max if self.latency_max is None else max(self.latency_max, rollup.latency_max)
+        histograms.merge(self.histogram, rollup.latency_histogram)
+
+    @property
+    def uptime(self):
+        if not self.check_count:
+            return 0.0
+        return round(self.up_count / self.check_count * 100, 2)
+
+    @property
+    def latency_mean(self):
+        return self.latency_sum / self.check_count if self.check_count else None
+
+    def percentiles(self):
+        """p50/p95/p99 latency from the merged histogram."""
+        return histograms.percentiles(self.histogram, self.latency_min, self.latency_max)
+
+
+_UPSERT_SQL = """
+    INSERT INTO {table} AS r
+        (site_id, granularity, bucket_start, check_count, up_count,
+         latency_min, latency_max, latency_sum, latency_histogram)
+    VALUES {values}
+    ON CONFLICT (site_id, granularity, bucket_start) DO UPDATE SET
+        check_count = r.check_count + EXCLUDED.check_count,
+        up_count = r.up_count + EXCLUDED.up_count,
+        latency_min = LEAST(r.latency_min, EXCLUDED.latency_min),
+        latency_max = GREATEST(r.latency_max, EXCLUDED.latency_max),
+        latency_sum = r.latency_sum + EXCLUDED.latency_sum,
+        latency_histogram = (
+            SELECT jsonb_object_agg(
+                k,
+                COALESCE((r.latency_histogram ->> k)::int, 0)
+                + COALESCE((EXCLUDED.latency_histogram ->> k)::int, 0)
+            )
+            FROM jsonb_object_keys(r.latency_histogram || EXCLUDED.latency_histogram) AS k
+        )
+"""
+
+
+def fold_results(results):
+    """
+    Add ``results`` to the minute, hour and day rollups of their sites.
+
+    The batch is aggregated in memory first and then merged with a single
+    INSERT ... ON CONFLICT statement, so concurrent writers add to the same
+    bucket atomically instead of overwriting each other.
+    """
+    deltas = {}
+    for result in results:
+        for granularity in GRANULARITIES:
+            key = (result.site_id, granularity, bucket_floor(result.timestamp, granularity))
+            deltas.setdefault(key, RollupStats()).add_result(result)
+    if not deltas:
+        return
+
+    params = []
+    # Sorted so concurrent writers lock buckets in the same order
+    for (site_id, granularity, bucket_start), stats in sorted(deltas.items()):
+        params += [
+            site_id, granularity, bucket_start, stats.check_count, stats.up_count,
+            stats.latency_min, stats.latency_max, stats.latency_sum, json.dumps(stats.histogram),
+        ]
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)"] * len(deltas))
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL.format(table=CheckRollup._meta.db_table, values=values), params)
+
+
+@receiver(results_recorded)
+def update_rollups(sender, results, **kwargs):
+    fold_results(results)
+
+
+def _cover(start, end, levels):
+    """Split [start, end) into aligned buckets, coarsest in the middle."""
+    granularity, finer = levels[0], levels[1:]
+    if not finer:
+        return [(granularity, start, end)] if start is None or start < end else []
+    lo = None if start is None else bucket_ceil(start, granularity)
+    hi = bucket_floor(end, granularity)
+    if lo is not None and lo >= hi:
+        return _cover(start, end, finer)
+    head = [] if lo is None else _cover(start, lo, finer)
+    return head + [(granularity, lo, hi)] + _cover(hi, end, finer)
+
+
+def window_stats(site_ids, start, end):
+    """
+    Aggregate stats per site id for [start, end), or all history before
+    ``end`` when ``start`` is None.
+
+    Whole days come from day rollups and only the ragged edges from hour and
+    minute rollups, so a query reads at most days + 46 + 118 rows per site no
+    matter how many raw results the window holds. Edges are minute-aligned.
+    """
+    start = None if start is None else bucket_floor(start, CheckRollup.MINUTE)
+    end = bucket_ceil(end, CheckRollup.MINUTE)
+    pieces = _cover(start, end, list(reversed(GRANULARITIES)))
+
+    stats = {site_id: RollupStats() for site_id in site_ids}
+    if not pieces or not stats:
+        return stats
+
+    window = Q()
+    for granularity, lo, hi in pieces:
+        piece = Q(granularity=granularity, bucket_start__lt=hi)
+        if lo is not None:
+            piece &= Q(bucket_start__gte=lo)
+        window |= piece
+
+    for rollup in CheckRollup.objects.filter(window, site_id__in=stats.keys()):
+        stats[rollup.site_id].add_rollup(rollup)
+    return stats
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'status_monitor.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -138,3 +139,102 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
 #Refresh expiry time on each request
 SESSION_SAVE_EVERY_REQUEST = True
+
+#Site probing: parallel probes per cycle, seconds before a cycle gives up
+#on slow hosts, and per-request timeout in seconds
+PROBE_CONCURRENCY = 20
+PROBE_CYCLE_DEADLINE = 240
+PROBE_TIMEOUT = 10
+
+#Failure handling: extra attempts a failing probe of an up site gets before
+#it is recorded down (PROBE_RETRY_DELAY seconds apart, doubling); down
+#checks in a row that open a site's circuit; and the seconds an open
+#circuit waits before its half-open recovery probe, doubling per further
+#failure up to the cap
+PROBE_MAX_RETRIES = 2
+PROBE_RETRY_DELAY = 1
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_BACKOFF_BASE = 300
+CIRCUIT_BACKOFF_MAX = 3600
+
+#Rows accepted by one bulk site import (Import Sites page, import_sites)
+SITE_IMPORT_MAX_ROWS = 5000
+
+#Seconds between scheduler ticks; each tick probes only the sites whose
+#check_frequency says they are due
+SCHEDULER_TICK_SECONDS = 30
+
+#Maintenance windows are expanded into an in-memory index this many hours
+#ahead; checker workers rebuild it when it runs out or a window changes
+MAINTENANCE_INDEX_HOURS = 24
+
+#Incidents: down checks in a row that open one (probes already retry
+#before recording down), and incidents listed per page
+INCIDENT_CONFIRM_CHECKS = 1
+INCIDENTS_PER_PAGE = 50
+
+#Probe results are written with bulk_create once this many are buffered
+#or, when the next result arrives, this many seconds have passed since
+#the last write
+RESULT_BATCH_SIZE = 200
+RESULT_FLUSH_INTERVAL = 5
+
+#site_history limits: chart points after downsampling, uptime bars per
+#range, and raw results read before switching to rollups
+HISTORY_MAX_POINTS = 500
+HISTORY_UPTIME_BARS = 90
+HISTORY_RAW_LIMIT = 5000
+
+#Retention: days of raw check results to keep (per-site retention_days
+#overrides this), days of minute/hour rollups to keep (day rollups are kept
+#forever), and rows deleted per statement when pruning
+RESULT_RETENTION_DAYS = 90
+ROLLUP_RETENTION_DAYS = {'minute': 14, 'hour': 400}
+PRUNE_BATCH_SIZE = 10000
+
+#Pooled probe HTTP client: hosts with a kept-alive connection pool, and
+#connections kept open per host
+PROBE_POOL_HOSTS = 100
+PROBE_POOL_SIZE_PER_HOST = 10
+
+#Probe politeness: seconds a DNS answer is reused by later probes (0 turns
+#the cache off), and probes run at once against one hostname; further
+#probes of that host queue for a slot (None or 0 for no limit)
+PROBE_DNS_TTL = 60
+PROBE_MAX_PER_HOST = 4
+
+#Checker workers (manage.py run_checker): sites leased per claim, seconds a
+#lease lasts before another worker may take the site over, and seconds to
+#wait when nothing is due
+CHECKER_BATCH_SIZE = 100
+CHECKER_LEASE_SECONDS = 300
+CHECKER_POLL_INTERVAL = 5
+
+#Live dashboard updates: the broker that fans new check results out to
+#event streams (LocalBroker only reaches streams in the process that saved
+#the results; use PostgresBroker when run_checker workers do the checking),
+#events buffered per stream, seconds between keep-alive comments, and
+#seconds before a stream is closed for the browser to reconnect
+STATUS_BROKER = 'status_monitor.broker.LocalBroker'
+SSE_QUEUE_SIZE = 100
+SSE_HEARTBEAT_SECONDS = 25
+SSE_MAX_STREAM_SECONDS = 300
+
+#Dashboard status summaries are cached per site and per user in this cache;
+#LocMemCache evicts the least recently used entries past MAX_ENTRIES
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'status': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'status-summaries',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+STATUS_CACHE_ALIAS = 'status'
+
+#Prometheus metrics at /metrics (and run_checker --metrics-port): when set,
+#scrapers must send "Authorization: Bearer <token>"; None leaves it open
+METRICS_TOKEN = None
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with results=[SiteCheckResult, ...] once probe results are saved,
+# whether one at a time or in a bulk_create batch from ResultWriter
+results_recorded = Signal()
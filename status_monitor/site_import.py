@@ -0,0 +1,177 @@
+"""
+Bulk site import from CSV or JSON, for onboarding many endpoints at once.
+
+Every row is validated in memory with the same field rules as the Add Site
+form, duplicates are resolved against existing sites with one url__in
+query (and against earlier rows of the same file), and the valid rows go
+in with bulk_create. Rows that fail are reported individually instead of
+failing the whole import.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from . import summary_cache
+from .forms import SiteImportRowForm
+from .models import MonitoredSite
+
+FIELDS = ('name', 'url', 'check_frequency', 'retention_days')
+# Longest JSON row read while looking for its end
+MAX_ROW_CHARS = 1 << 16
+# The form requires a frequency; rows that leave it out get the model's
+DEFAULTS = {'check_frequency': MonitoredSite._meta.get_field('check_frequency').default}
+
+
+@dataclass
+class ImportReport:
+    created: list = field(default_factory=list)
+    # (row number, url, messages); rows are numbered from 1, header excluded
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows(self):
+        return len(self.created) + len(self.errors)
+
+
+def _json_items(stream, chunk_size=65536):
+    """
+    Yield the items of the top-level JSON array in the text ``stream`` one
+    at a time, reading ``chunk_size`` characters at a time, so a caller
+    that stops early never reads or parses the rest of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+    def next_char():
+        # The next non-space character, reading on as needed; '' at the end
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip()
+            if buffer or eof:
+                return buffer[:1]
+            fill()
+
+    if next_char() != '[':
+        raise ValueError("Expected a list of site objects.")
+    buffer = buffer[1:]
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer)
+                break
+            except json.JSONDecodeError as e:
+                # Usually an item cut off at the end of what was read so far;
+                # one longer than any real site row is just malformed
+                if eof or len(buffer) > MAX_ROW_CHARS:
+                    raise ValueError(f"Invalid JSON: {e}")
+                fill()
+        yield item
+        buffer = buffer[end:]
+        char = next_char()
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError("Invalid JSON: expected ',' or ']' after an item.")
+        buffer = buffer[1:]
+
+
+def parse_rows(stream, fmt):
+    """
+    Rows (dicts) from a text stream holding a CSV file with a header line or
+    a JSON list of objects. Raises ValueError if the file is malformed or
+    has more than SITE_IMPORT_MAX_ROWS rows; reading stops at the first row
+    past the limit.
+    """
+    limit = settings.SITE_IMPORT_MAX_ROWS
+    if fmt == 'csv':
+        rows = csv.DictReader(stream)
+    elif fmt == 'json':
+        rows = _json_items(stream)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; use csv or json.")
+    try:
+        rows = list(islice(rows, limit + 1))
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV: {e}")
+    if len(rows) > limit:
+        raise ValueError(f"Too many rows; the limit is {limit}.")
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Expected a list of site objects.")
+    return rows
+
+
+def format_of(filename, default='csv'):
+    """'json' or 'csv' from a file name's extension."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in ('csv', 'json') else default
+
+
+def import_sites(user, rows, dry_run=False):
+    """Validate ``rows`` and create the valid ones as ``user``'s sites. Returns an ImportReport."""
+    report = ImportReport()
+    candidates = []
+    for number, row in enumerate(rows, 1):
+        data = {**DEFAULTS, **{name: row.get(name) for name in FIELDS if row.get(name) not in (None, '')}}
+        form = SiteImportRowForm(data, user=user)
+        if form.is_valid():
+            site = form.save(commit=False)
+            site.user = user
+            candidates.append((number, site))
+        else:
+            messages = [f"{name}: {error}" if name != '__all__' else error
+                        for name, errors in form.errors.items() for error in errors]
+            report.errors.append((number, row.get('url', ''), messages))
+
+    # URLs are unique across all users, so one query settles every row
+    owners = _owners(site.url for _, site in candidates)
+    first_row = {}
+    rows = []
+    for number, site in candidates:
+        if site.url in first_row:
+            report.errors.append((number, site.url, [f"Duplicate of row {first_row[site.url]}."]))
+        elif site.url in owners:
+            message = "You are already monitoring this site." if owners[site.url] == user.pk else "This URL is already monitored by another account."
+            report.errors.append((number, site.url, [message]))
+        else:
+            first_row[site.url] = number
+            rows.append((number, site))
+
+    if rows and not dry_run:
+        while True:
+            try:
+                with transaction.atomic():
+                    report.created = MonitoredSite.objects.bulk_create([site for _, site in rows], batch_size=500)
+                break
+            except IntegrityError:
+                # Another request added one of the URLs since the check above
+                taken = _owners(site.url for _, site in rows)
+                if not taken:
+                    raise
+                for number, site in rows:
+                    if site.url in taken:
+                        report.errors.append((number, site.url, ["Skipped: this URL was added while the import ran."]))
+                rows = [(number, site) for number, site in rows if site.url not in taken]
+        # bulk_create skips post_save, which would have done this per site
+        summary_cache.invalidate([], [user.pk])
+    else:
+        report.created = [site for _, site in rows]
+    report.errors.sort(key=lambda error: error[0])
+    return report
+
+
+def _owners(urls):
+    """The owning user id of each of ``urls`` that is already monitored."""
+    return dict(MonitoredSite.objects.filter(url__in=list(urls)).values_list('url', 'user_id'))
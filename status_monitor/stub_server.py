@@ -0,0 +1,73 @@
+"""
+A local stand-in for the sites we monitor, so probe benchmarks and load
+tests run offline and reproducibly. Every request is answered after
+``latency`` (+/- ``jitter``) seconds; a fraction ``error_rate`` of them get
+a 500 and a fraction ``hang_rate`` stall for ``hang_seconds`` before
+answering, which a probe with a shorter timeout sees as a hung host.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class StubBehavior:
+    latency: float = 0.05
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_seconds: float = 60.0
+    body_size: int = 512
+    seed: int = None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        behavior, rng = self.server.behavior, self.server.rng
+        roll = rng.random()
+        delay = max(behavior.latency + rng.uniform(-behavior.jitter, behavior.jitter), 0)
+        if roll < behavior.hang_rate:
+            delay = behavior.hang_seconds
+        time.sleep(delay)
+
+        status = 500 if roll >= 1 - behavior.error_rate else 200
+        body = b"x" * behavior.body_size
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The probe gave up (timed out) while we were hanging
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, behavior=None):
+        super().__init__(address, StubHandler)
+        self.behavior = behavior or StubBehavior()
+        self.rng = random.Random(self.behavior.seed)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(host="127.0.0.1", port=0, **behavior):
+    """Serve a StubServer on a daemon thread; call ``shutdown()`` and
+    ``server_close()`` on the returned server when done."""
+    server = StubServer((host, port), StubBehavior(**behavior))
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
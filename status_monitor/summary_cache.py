@@ -0,0 +1,143 @@
+"""
+Cache of dashboard status summaries, per site and per user, in the
+STATUS_CACHE_ALIAS cache (a bounded LocMemCache by default).
+
+Every entry is stored with the status_token(s) it was built from and is only
+used while they still match the sites' current rows. The tokens come from
+the one with_newest_check query the dashboard needs anyway, so results
+saved by another process (a run_checker worker) are never served stale.
+Writes in this process also invalidate entries directly (receivers below),
+so dead entries don't linger until the LRU evicts them.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import metrics
+from .models import (
+    MonitoredSite, SiteCheckResult, UptimeCounter, get_status_summaries, status_fingerprint, status_token,
+    with_newest_check,
+)
+from .signals import results_recorded
+
+
+class CacheStats:
+    """Per-process hit and miss counts, by entry kind ('site' or 'user')."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, kind, hits=0, misses=0):
+        with self._lock:
+            self._counts[f'{kind}_hits'] += hits
+            self._counts[f'{kind}_misses'] += misses
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        for kind in ('site', 'user'):
+            hits, misses = counts.setdefault(f'{kind}_hits', 0), counts.setdefault(f'{kind}_misses', 0)
+            counts[f'{kind}_hit_ratio'] = round(hits / (hits + misses), 4) if hits + misses else None
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+@metrics.REGISTRY.collector
+def cache_metrics():
+    lookups = metrics.Counter(
+        'status_monitor_summary_cache_lookups_total', 'Status summary cache lookups, by entry kind and result.',
+        ['kind', 'result'],
+    )
+    counts = stats.snapshot()
+    for kind in ('site', 'user'):
+        lookups.inc(counts[f'{kind}_hits'], kind=kind, result='hit')
+        lookups.inc(counts[f'{kind}_misses'], kind=kind, result='miss')
+    return [lookups]
+
+
+def _cache():
+    return caches[settings.STATUS_CACHE_ALIAS]
+
+
+# The hour is part of every key: the 24h uptime window moves with it
+def site_key(site_id, limit, hour):
+    return f'status-summary:site:{site_id}:{limit}:{hour}'
+
+
+def user_key(user_id, limit, hour):
+    return f'status-summary:user:{user_id}:{limit}:{hour}'
+
+
+def load_status(sites, user_id, limit=20, now=None):
+    """
+    ``(summaries, fingerprint)`` for the dashboard of ``user_id`` showing
+    ``sites`` (a queryset), as get_status_summaries and status_fingerprint
+    would return them. One query when nothing changed since the last call;
+    otherwise only the changed sites are rebuilt.
+    """
+    now = now or timezone.now()
+    hour = UptimeCounter.hour_of(now)
+    sites = list(with_newest_check(sites))
+    tokens = [status_token(site) for site in sites]
+    fingerprint = status_fingerprint(sites, now)
+    cache = _cache()
+
+    cached = cache.get(user_key(user_id, limit, hour))
+    if cached and cached[0] == tokens:
+        stats.record('user', hits=1)
+        return cached[1], fingerprint
+    stats.record('user', misses=1)
+
+    keys = {site.pk: site_key(site.pk, limit, hour) for site in sites}
+    entries = cache.get_many(keys.values())
+    summaries, stale = {}, []
+    for site, token in zip(sites, tokens):
+        entry = entries.get(keys[site.pk])
+        if entry and entry[0] == token:
+            summaries[site.pk] = entry[1]
+        else:
+            stale.append(site)
+    stats.record('site', hits=len(summaries), misses=len(stale))
+
+    if stale:
+        fresh = get_status_summaries(stale, limit=limit)
+        cache.set_many({keys[s['site'].pk]: (status_token(s['site']), s) for s in fresh})
+        summaries.update((s['site'].pk, s) for s in fresh)
+
+    ordered = [summaries[site.pk] for site in sites]
+    cache.set(user_key(user_id, limit, hour), (tokens, ordered))
+    return ordered, fingerprint
+
+
+def invalidate(site_ids, user_ids, limit=20, now=None):
+    hour = UptimeCounter.hour_of(now or timezone.now())
+    _cache().delete_many(
+        [site_key(pk, limit, hour) for pk in site_ids] + [user_key(pk, limit, hour) for pk in user_ids]
+    )
+
+
+@receiver(results_recorded)
+def invalidate_on_results(sender, results, **kwargs):
+    # A result without its site loaded only drops the site's entry; its
+    # owner's entry still fails the token check on the next read
+    invalidate(
+        {result.site_id for result in results},
+        {result.site.user_id for result in results if SiteCheckResult.site.is_cached(result)},
+    )
+
+
+@receiver([post_save, post_delete], sender=MonitoredSite)
+def invalidate_on_site_change(sender, instance, **kwargs):
+    invalidate([instance.pk], [instance.user_id])
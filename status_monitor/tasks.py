@@ -1,46 +1,53 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from django_apscheduler.jobstores import DjangoJobStore
+from status_monitor.models import MonitoredSite
+from status_monitor.retention import prune_rollups, prune_site
+from status_monitor.worker import default_worker_id, run_once
+from django.conf import settings
 from django.utils import timezone
-from status_monitor.models import MonitoredSite, SiteCheckResult
-import requests, time
 from django.db.utils import OperationalError
 import sys
 
-MAX_RETRIES = 5
+def dispatch_due_sites():
+    # Claims due sites through the same leases as `manage.py run_checker`
+    # workers, so the two never probe a site twice in one period. Like
+    # run_worker, keeps claiming while batches come back full so every
+    # site due this tick is checked, not just the first batch
+    worker_id = default_worker_id()
+    while run_once(worker_id).checked >= settings.CHECKER_BATCH_SIZE:
+        pass
 
-def check_sites():
-    monitored_sites = MonitoredSite.objects.all()
-    for site in monitored_sites:
-        start_time = time.time()
-        try:
-            response = requests.get(site.url, timeout=10)
-            response_time = time.time() - start_time
-            is_up = 200 <= response.status_code < 400
-            status_code = response.status_code
-        except requests.RequestException:
-            response_time = time.time() - start_time
-            is_up = False
-            status_code = None
+def prune_expired_results():
+    now = timezone.now()
+    for site in MonitoredSite.objects.all():
+        prune_site(site, now)
+    prune_rollups(now)
 
-        SiteCheckResult.objects.create(
-            site=site,
-            timestamp=timezone.now(),
-            status_code=status_code,
-            response_time=response_time,
-            is_up=is_up
-        )
 def start_scheduler():
     try:
         scheduler = BackgroundScheduler()
-        scheduler.add_jobstore(DjangoJobStore(), 'default')
+        jobstore = DjangoJobStore()
+        scheduler.add_jobstore(jobstore, 'default')
         scheduler.add_job(
-            check_sites,
+            dispatch_due_sites,
             'interval',
-            minutes=5,
-            name='check_sites_job',
+            seconds=settings.SCHEDULER_TICK_SECONDS,
+            id='dispatch_due_sites',
+            name='dispatch_due_sites_job',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            prune_expired_results,
+            'cron',
+            hour=3,
+            id='prune_expired_results',
+            name='prune_expired_results_job',
             replace_existing=True
         )
         if "runserver" in sys.argv:
+            # Drop jobs persisted by earlier runs (e.g. the old every-5-minutes
+            # check_sites job) so no site is probed outside its own schedule
+            jobstore.remove_all_jobs()
             scheduler.start()
             print("✅ APScheduler started successfully!")
     except OperationalError:
@@ -0,0 +1,90 @@
+# status_monitor/tests/test_benchmarks.py
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from status_monitor.benchmarks import BENCH_USERNAME, compare, generate_fixtures, run_benchmarks
+from status_monitor.models import CheckRollup, MonitoredSite, SiteCheckResult, UptimeCounter
+from status_monitor.probes import probe_site
+from status_monitor.stub_server import start_stub_server
+
+
+# ---------------------------------------------------------------------
+# STUB SERVER TESTS
+# ---------------------------------------------------------------------
+class StubServerTest(TestCase):
+    """The stub server simulates slow, failing and hanging sites."""
+
+    def probe(self, timeout=2, **behavior):
+        server = start_stub_server(**behavior)
+        try:
+            site = MonitoredSite(pk=1, name="Stub", url=f"{server.url}/site/1")
+            return probe_site(site, timeout=timeout)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_latency(self):
+        result = self.probe(latency=0.2)
+        self.assertTrue(result.is_up)
+        self.assertGreaterEqual(result.response_time, 0.2)
+
+    def test_errors(self):
+        result = self.probe(latency=0, error_rate=1)
+        self.assertEqual(result.status_code, 500)
+        self.assertFalse(result.is_up)
+
+    def test_hang_times_out(self):
+        result = self.probe(timeout=0.2, latency=0, hang_rate=1, hang_seconds=1)
+        self.assertIsNone(result.status_code)
+
+
+# ---------------------------------------------------------------------
+# BENCHMARK SUITE TESTS
+# ---------------------------------------------------------------------
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class BenchmarkSuiteTest(TestCase):
+    """Fixtures feed the real ingest path and reports can be compared."""
+
+    def test_fixtures_build_history_rollups_and_counters(self):
+        sites = generate_fixtures(sites=3, results_per_site=50, batch_size=40)
+        self.assertEqual(SiteCheckResult.objects.filter(site__in=sites).count(), 150)
+        self.assertEqual(UptimeCounter.objects.get(site=sites[0]).total_all, 50)
+        self.assertTrue(CheckRollup.objects.filter(site=sites[0], granularity=CheckRollup.HOUR).exists())
+
+    def test_run_benchmarks_writes_report(self):
+        generate_fixtures(sites=4, results_per_site=20)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.json")
+            call_command("run_benchmarks", "--output", output, "--repeat", "2", "--latency", "0", stdout=StringIO())
+            with open(output) as f:
+                report = json.load(f)
+        results = report["results"]
+        self.assertEqual(results["probe_cycle"]["sites"], 4)
+        self.assertEqual(results["probe_cycle"]["down"], 0)
+        self.assertIn("status_page", results)
+        self.assertIn("site_history_all", results)
+        self.assertGreater(results["status_page"]["queries"], 0)
+        self.assertEqual(report["meta"]["results"], 80)
+        self.assertFalse(SiteCheckResult.objects.filter(timestamp__gte=report["meta"]["timestamp"]).exists())
+
+    def test_requires_fixtures(self):
+        with self.assertRaises(ValueError):
+            run_benchmarks()
+        with self.assertRaises(CommandError):
+            call_command("run_benchmarks", "--output", os.devnull, stdout=StringIO())
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"status_page": {"median_ms": 10.0, "queries": 3}, "probe_cycle": {"sites_per_second": 100.0}}}
+        current = {"results": {"status_page": {"median_ms": 11.0, "queries": 5}, "probe_cycle": {"sites_per_second": 50.0}}}
+        regressions = compare(current, baseline, threshold=0.2)
+        self.assertEqual(
+            [(bench, metric) for bench, metric, _, _ in regressions],
+            [("status_page", "queries"), ("probe_cycle", "sites_per_second")],
+        )
+        self.assertEqual(BENCH_USERNAME, "benchmark")
@@ -0,0 +1,79 @@
+# status_monitor/tests/test_counters.py
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from status_monitor.models import MonitoredSite, UptimeCounter
+from status_monitor.probes import ProbeResult
+from status_monitor.writers import ResultWriter
+
+
+# ---------------------------------------------------------------------
+# UPTIME COUNTER TESTS
+# ---------------------------------------------------------------------
+class UptimeCounterTest(TestCase):
+    """Sliding-window uptime counters are kept current on ingest."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="counteruser", password="CounterPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Counter", url="https://counter.example.com")
+        self.now = timezone.now()
+
+    def write(self, hours_ago, is_up):
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            for hours in hours_ago:
+                writer.add(ProbeResult(
+                    site=self.site,
+                    timestamp=self.now - timedelta(hours=hours),
+                    status_code=200 if is_up else 500,
+                    response_time=0.1,
+                    is_up=is_up,
+                ))
+
+    def counter(self):
+        return UptimeCounter.objects.get(site=self.site)
+
+    def test_windows_count_their_own_span(self):
+        self.write([1, 2], is_up=True)          # inside 24h
+        self.write([48, 100], is_up=False)      # inside 7d
+        self.write([200], is_up=True)           # inside 30d
+        self.write([1000], is_up=False)         # all time only
+        counter = self.counter()
+        self.assertEqual(counter.counts("24h", self.now), (2, 2))
+        self.assertEqual(counter.counts("7d", self.now), (4, 2))
+        self.assertEqual(counter.counts("30d", self.now), (5, 3))
+        self.assertEqual(counter.counts("all", self.now), (6, 3))
+        self.assertEqual(counter.uptime("7d", self.now), 50.0)
+
+    def test_reads_expire_old_hours_without_a_write(self):
+        self.write([0], is_up=True)
+        counter = self.counter()
+        self.assertEqual(counter.counts("24h", self.now + timedelta(hours=25)), (0, 0))
+        self.assertEqual(counter.counts("7d", self.now + timedelta(hours=25)), (1, 1))
+
+    def test_new_results_advance_the_ring(self):
+        self.write([30], is_up=False)
+        self.write([0], is_up=True)
+        counter = self.counter()
+        self.assertEqual((counter.total_24h, counter.up_24h), (1, 1))
+        self.assertEqual((counter.total_7d, counter.up_7d), (2, 1))
+
+    def test_uptime_read_does_not_scan_results(self):
+        self.write(range(50), is_up=True)
+        counter = self.counter()
+        with self.assertNumQueries(0):
+            counter.uptime("30d", self.now)
+
+    def test_rebuild_command_matches_incremental_counter(self):
+        self.write(range(0, 1000, 7), is_up=True)
+        self.write(range(3, 1000, 11), is_up=False)
+        expected = {w: self.counter().counts(w, self.now) for w in UptimeCounter.WINDOWS}
+        UptimeCounter.objects.update(total_all=0, total_24h=0, hourly=[])
+        call_command("rebuild_uptime_counters", stdout=StringIO())
+        rebuilt = {w: self.counter().counts(w, self.now) for w in UptimeCounter.WINDOWS}
+        self.assertEqual(rebuilt, expected)
@@ -1,12 +1,16 @@
 # status_monitor/tests/test_dashboard.py
 
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 
-from status_monitor.models import MonitoredSite, SiteCheckResult
+from status_monitor.models import MonitoredSite, SiteCheckResult, get_status_summaries
+from status_monitor.summary_cache import load_status, stats
 
 
 # ---------------------------------------------------------------------
@@ -133,6 +137,171 @@ class StatusPageTest(TestCase):
         html = response.content.decode()
         self.assertIn("Never", html)
 
+    def test_query_count_does_not_grow_with_sites(self):
+        """Rendering costs the same number of queries for 2 or 12 sites."""
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.status_url)
+        for i in range(10):
+            site = MonitoredSite.objects.create(user=self.user, name=f"Extra {i}", url=f"https://extra{i}.com")
+            SiteCheckResult.objects.create(site=site, is_up=True, response_time=0.2, status_code=200)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.status_url)
+        self.assertEqual(len(few), len(many))
+
+    def test_bulk_summaries_match_per_site_summary(self):
+        """The single-query loader returns the same summaries as get_status_summary."""
+        now = timezone.now()
+        for n in range(30):
+            SiteCheckResult.objects.create(
+                site=self.site1,
+                timestamp=now - timedelta(minutes=60 - n),
+                is_up=n % 3 != 0,
+                response_time=n / 10,
+                status_code=200,
+            )
+        sites = MonitoredSite.objects.filter(user=self.user).order_by("url")
+        with self.assertNumQueries(3):
+            bulk = get_status_summaries(sites, limit=20)
+        for summary in bulk:
+            expected = summary["site"].get_status_summary(limit=20)
+            self.assertEqual(summary["history"], expected["history"])
+            self.assertEqual(summary["timestamps"], expected["timestamps"])
+            self.assertEqual(summary["response_times"], expected["response_times"])
+            self.assertEqual(summary["uptime"], expected["uptime"])
+        self.assertEqual(len(bulk[0]["history"]), 20)
+
+
+# ---------------------------------------------------------------------
+# STATUS API TESTS
+# ---------------------------------------------------------------------
+class StatusApiTest(TestCase):
+    """The JSON status endpoint answers unchanged polls with a 304."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="apiuser", password="ApiPass123!")
+        self.client.login(username="apiuser", password="ApiPass123!")
+        self.api_url = reverse("status_api")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Api Site", url="https://api.example.com")
+        SiteCheckResult.objects.create(site=self.site, is_up=True, response_time=0.4, status_code=200)
+
+    def test_returns_summaries(self):
+        response = self.client.get(self.api_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header("ETag"))
+        site = response.json()["sites"][0]
+        self.assertEqual(site["url"], "https://api.example.com")
+        self.assertEqual(site["latest_check"]["status_code"], 200)
+        self.assertEqual(site["uptime"], 100.0)
+        self.assertEqual(site["status_points"], ["Up"])
+
+    def test_unchanged_poll_is_not_modified(self):
+        etag = self.client.get(self.api_url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Only the fingerprint; neither the recent-checks nor the counter query
+        sql = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("LATERAL", sql)
+        self.assertNotIn("uptimecounter", sql)
+
+    def test_new_check_changes_etag(self):
+        etag = self.client.get(self.api_url)["ETag"]
+        SiteCheckResult.objects.create(site=self.site, is_up=False, response_time=1.0, status_code=500)
+        response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertFalse(response.json()["sites"][0]["latest_check"]["is_up"])
+
+    def test_site_edit_changes_etag(self):
+        etag = self.client.get(self.api_url)["ETag"]
+        MonitoredSite.objects.filter(pk=self.site.pk).update(name="Renamed")
+        response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_embeds_current_etag(self):
+        page = self.client.get(reverse("status_page"))
+        etag = self.client.get(self.api_url)["ETag"]
+        self.assertContains(page, etag.replace('"', "&quot;"))
+
+    def test_other_users_checks_do_not_change_etag(self):
+        etag = self.client.get(self.api_url)["ETag"]
+        other = User.objects.create_user(username="apiother", password="ApiPass123!")
+        site = MonitoredSite.objects.create(user=other, name="Other", url="https://other.example.com")
+        SiteCheckResult.objects.create(site=site, is_up=True, response_time=0.1, status_code=200)
+        self.assertEqual(self.client.get(self.api_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+# ---------------------------------------------------------------------
+# SUMMARY CACHE TESTS
+# ---------------------------------------------------------------------
+class SummaryCacheTest(TestCase):
+    """Dashboard summaries are served from cache until something changes."""
+
+    def setUp(self):
+        caches["status"].clear()
+        stats.reset()
+        self.client = Client()
+        self.user = User.objects.create_user(username="cacheuser", password="CachePass123!")
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login(username="cacheuser", password="CachePass123!")
+        self.sites = [
+            MonitoredSite.objects.create(user=self.user, name=f"Cached {i}", url=f"https://cached{i}.example.com")
+            for i in range(3)
+        ]
+        for site in self.sites:
+            SiteCheckResult.objects.create(site=site, is_up=True, response_time=0.3, status_code=200)
+
+    def load(self):
+        return load_status(MonitoredSite.objects.filter(user=self.user).order_by("url"), self.user.pk)
+
+    def test_unchanged_dashboard_is_one_query(self):
+        cold, etag = self.load()
+        with self.assertNumQueries(1):
+            warm, warm_etag = self.load()
+        self.assertEqual(etag, warm_etag)
+        self.assertEqual([s["history"] for s in warm], [s["history"] for s in cold])
+        self.assertEqual(stats.snapshot()["user_hits"], 1)
+
+    def test_new_result_rebuilds_only_its_site(self):
+        self.load()
+        SiteCheckResult.objects.create(site=self.sites[1], is_up=False, response_time=2.0, status_code=503)
+        summaries, _ = self.load()
+        self.assertFalse(summaries[1]["latest_check"].is_up)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["site_hits"], 2)
+        self.assertEqual(snapshot["site_misses"], 4)
+
+    def test_writes_from_other_processes_are_not_served_stale(self):
+        """Results saved without this process's signals fail the token check."""
+        self.load()
+        SiteCheckResult.objects.bulk_create([
+            SiteCheckResult(site=self.sites[0], is_up=False, response_time=5.0, status_code=500)
+        ])
+        summaries, _ = self.load()
+        self.assertEqual(summaries[0]["latest_check"].status_code, 500)
+
+    def test_site_edit_and_delete_invalidate(self):
+        self.client.get(reverse("status_page"))
+        self.client.post(
+            reverse("site_edit", args=[self.sites[0].pk]),
+            {"name": "Renamed", "url": self.sites[0].url, "check_frequency": 5},
+        )
+        self.client.post(reverse("site_delete", args=[self.sites[2].pk]))
+        site_data = self.client.get(reverse("status_page")).context["site_data"]
+        self.assertEqual([d["site"].name for d in site_data], ["Renamed", "Cached 1"])
+
+    def test_stats_view(self):
+        self.client.get(reverse("status_page"))
+        self.client.get(reverse("status_page"))
+        data = self.client.get(reverse("summary_cache")).json()
+        self.assertEqual(data["user_hits"], 1)
+        self.assertEqual(data["user_hit_ratio"], 0.5)
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("summary_cache")).status_code, 403)
+
 
 # ---------------------------------------------------------------------
 # MAINTENANCE PAGE TESTS
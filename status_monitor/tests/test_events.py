@@ -0,0 +1,178 @@
+# status_monitor/tests/test_events.py
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor.broker import LocalBroker, PostgresBroker, async_event_stream
+from status_monitor.models import MonitoredSite, SiteCheckResult
+from status_monitor.probes import ProbeResult
+from status_monitor.writers import ResultWriter
+
+
+class RecordingBroker(LocalBroker):
+    published = []
+
+    def publish(self, user_id, event):
+        self.published.append((user_id, event))
+
+
+async def sync_login(client, user):
+    await sync_to_async(client.force_login)(user)
+    return client.cookies
+
+
+@contextmanager
+def mock_broker(broker=None):
+    broker = broker or RecordingBroker()
+    with mock.patch("status_monitor.broker._broker", broker):
+        yield broker
+
+
+# ---------------------------------------------------------------------
+# BROKER TESTS
+# ---------------------------------------------------------------------
+class BrokerTest(SimpleTestCase):
+    """Events reach only the subscribed user's streams."""
+
+    async def test_async_fan_out_is_per_user(self):
+        broker = LocalBroker()
+        mine = [broker.subscribe(1, asynchronous=True) for _ in range(2)]
+        other = broker.subscribe(2, asynchronous=True)
+        # Published from a checker thread, not the event loop
+        thread = threading.Thread(target=broker.publish, args=(1, {"type": "checks"}))
+        thread.start()
+        thread.join()
+        for subscription in mine:
+            self.assertEqual(await subscription.get(1), {"type": "checks"})
+        self.assertIsNone(await other.get(0.05))
+
+    def test_unsubscribe_drops_empty_users(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe(1)
+        broker.unsubscribe(subscription)
+        broker.publish(1, {"type": "checks"})
+        self.assertEqual(broker._subscriptions, {})
+        self.assertIsNone(subscription.get(0))
+
+    @override_settings(SSE_QUEUE_SIZE=3)
+    def test_slow_stream_keeps_newest_events(self):
+        subscription = LocalBroker().subscribe(1)
+        for n in range(5):
+            subscription.put({"n": n})
+        self.assertEqual([subscription.get(0)["n"] for _ in range(3)], [2, 3, 4])
+
+
+# ---------------------------------------------------------------------
+# PUBLISH TESTS
+# ---------------------------------------------------------------------
+class PublishTest(TestCase):
+    """Saved results are published to their site owner after commit."""
+
+    def setUp(self):
+        RecordingBroker.published = []
+        self.alice = User.objects.create_user(username="alice", password="AlicePass123!")
+        self.bob = User.objects.create_user(username="bob", password="BobPass123!")
+        self.site_a = MonitoredSite.objects.create(user=self.alice, name="A", url="https://a.example.com")
+        self.site_b = MonitoredSite.objects.create(user=self.bob, name="B", url="https://b.example.com")
+
+    def test_batch_is_grouped_by_owner(self):
+        with mock_broker():
+            with self.captureOnCommitCallbacks(execute=True):
+                with ResultWriter() as writer:
+                    for site in (self.site_a, self.site_b, self.site_a):
+                        writer.add(ProbeResult(site=site, timestamp=timezone.now(), status_code=200, response_time=0.1, is_up=True))
+        published = dict(RecordingBroker.published)
+        self.assertEqual(len(published[self.alice.pk]["results"]), 2)
+        self.assertEqual(published[self.bob.pk]["results"][0]["site"], self.site_b.pk)
+
+    def test_nothing_is_published_before_commit(self):
+        with mock_broker():
+            with self.captureOnCommitCallbacks() as callbacks:
+                SiteCheckResult.objects.create(site=self.site_a, is_up=False, response_time=1.0)
+                self.assertEqual(RecordingBroker.published, [])
+            for callback in callbacks:
+                callback()
+        self.assertEqual(RecordingBroker.published[0][0], self.alice.pk)
+
+
+# ---------------------------------------------------------------------
+# EVENT STREAM TESTS
+# ---------------------------------------------------------------------
+@override_settings(SSE_HEARTBEAT_SECONDS=0.05, SSE_MAX_STREAM_SECONDS=0.2)
+class EventStreamTest(TestCase):
+    """Dashboards receive server-sent events for their own sites."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="streamer", password="StreamPass123!")
+
+    def test_requires_login(self):
+        response = self.client.get(reverse("status_events"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_wsgi_requests_are_not_streamed(self):
+        """A sync server would hold a thread per tab; the dashboard polls instead."""
+        self.client.login(username="streamer", password="StreamPass123!")
+        response = self.client.get(reverse("status_events"))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    async def test_asgi_stream_sends_heartbeats_and_ends(self):
+        self.async_client.cookies = await sync_login(self.client, self.user)
+        response = await self.async_client.get(reverse("status_events"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertTrue(chunks[0].startswith(b"retry:"))
+        self.assertIn(b": keep-alive\n\n", chunks)
+
+    async def test_stream_delivers_published_events(self):
+        with mock_broker(LocalBroker()) as broker:
+            stream = async_event_stream(self.user.pk)
+            self.assertTrue((await anext(stream)).startswith("retry:"))
+            threading.Timer(0.01, broker.publish, args=(self.user.pk, {"type": "checks", "results": []})).start()
+            chunk = await anext(stream)
+            while chunk.startswith(":"):
+                chunk = await anext(stream)
+            await stream.aclose()
+        self.assertTrue(chunk.startswith("event: checks\n"))
+        self.assertEqual(json.loads(chunk.split("data: ", 1)[1]), {"type": "checks", "results": []})
+        self.assertEqual(broker._subscriptions, {})
+
+
+# ---------------------------------------------------------------------
+# POSTGRES BROKER TESTS
+# ---------------------------------------------------------------------
+class PostgresBrokerTest(TransactionTestCase):
+    """NOTIFY carries events between processes sharing the database."""
+
+    def test_notify_reaches_listener(self):
+        broker = PostgresBroker()
+        broker.poll_interval = 0.1
+
+        def publish():
+            try:
+                broker.publish(7, {"type": "checks"})
+            finally:
+                connection.close()
+
+        async def receive():
+            subscription = broker.subscribe(7, asynchronous=True)
+            await asyncio.sleep(0.5)  # let the listener LISTEN
+            await asyncio.get_running_loop().run_in_executor(None, publish)
+            return await subscription.get(5)
+
+        try:
+            self.assertEqual(asyncio.run(receive()), {"type": "checks"})
+        finally:
+            broker.close()
+
@@ -0,0 +1,117 @@
+# status_monitor/tests/test_export.py
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from status_monitor import export
+from status_monitor.models import MonitoredSite, SiteCheckResult
+
+T0 = datetime(2026, 5, 4, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="exportuser", password="ExportPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Exported", url="https://exported.example.com")
+        self.other = MonitoredSite.objects.create(user=self.user, name="Second", url="https://second.example.com")
+        SiteCheckResult.objects.bulk_create(
+            SiteCheckResult(site=site, timestamp=T0 + timedelta(minutes=i), status_code=200 if i % 3 else 503,
+                            response_time=0.1 * i, is_up=bool(i % 3), ttfb_time=0.05)
+            for site in (self.site, self.other)
+            for i in range(10)
+        )
+
+    def body(self, chunks):
+        return b"".join(chunks).decode()
+
+
+# ---------------------------------------------------------------------
+# RENDERING TESTS
+# ---------------------------------------------------------------------
+class ExportRenderTest(ExportTestCase):
+    """Results render as CSV or NDJSON, chunk by chunk."""
+
+    def test_csv(self):
+        results = export.export_queryset(MonitoredSite.objects.filter(pk=self.site.pk))
+        chunks = list(export.stream_export(results, "csv", chunk_size=4))
+        # Header, then one chunk per 4 rows
+        self.assertEqual(len(chunks), 4)
+        rows = list(csv.DictReader(io.StringIO(self.body(chunks))))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]["site_name"], "Exported")
+        self.assertEqual(rows[0]["timestamp"], T0.isoformat())
+        self.assertEqual((rows[0]["status_code"], rows[0]["is_up"], rows[0]["tls_time"]), ("503", "False", ""))
+
+    def test_ndjson_with_time_range(self):
+        results = export.export_queryset(MonitoredSite.objects.all(), T0 + timedelta(minutes=2), T0 + timedelta(minutes=5))
+        records = [json.loads(line) for line in self.body(export.stream_export(results, "ndjson")).splitlines()]
+        self.assertEqual([(r["site_id"], r["timestamp"][11:16]) for r in records], [
+            (self.site.pk, "12:02"), (self.site.pk, "12:03"), (self.site.pk, "12:04"),
+            (self.other.pk, "12:02"), (self.other.pk, "12:03"), (self.other.pk, "12:04"),
+        ])
+        self.assertEqual(records[0]["ttfb_time"], 0.05)
+        self.assertIsNone(records[0]["dns_time"])
+
+    def test_gzip(self):
+        results = export.export_queryset(MonitoredSite.objects.all())
+        plain = self.body(export.stream_export(results, "csv"))
+        self.assertEqual(gzip.decompress(b"".join(export.stream_export(results, "csv", compress=True))).decode(), plain)
+
+    def test_parse_bound(self):
+        self.assertEqual(export.parse_bound("2026-05-04"), datetime(2026, 5, 4, tzinfo=dt_timezone.utc))
+        self.assertEqual(export.parse_bound("2026-05-04T12:00:00+00:00"), T0)
+        with self.assertRaises(ValueError):
+            export.parse_bound("last week")
+
+
+# ---------------------------------------------------------------------
+# VIEW AND COMMAND TESTS
+# ---------------------------------------------------------------------
+class ExportEndpointTest(ExportTestCase):
+    """The view streams the user's own results; the command writes files."""
+
+    def test_view_streams_own_sites(self):
+        stranger = User.objects.create_user(username="stranger", password="Stranger123!")
+        theirs = MonitoredSite.objects.create(user=stranger, name="Theirs", url="https://theirs.example.com")
+        SiteCheckResult.objects.create(site=theirs, timestamp=T0, response_time=0.1, is_up=True)
+        self.client.login(username="exportuser", password="ExportPass123!")
+
+        response = self.client.get(reverse("export_results"), {"site": [self.site.pk, theirs.pk], "format": "ndjson"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual({json.loads(line)["site_id"] for line in lines}, {self.site.pk})
+        self.assertEqual(len(lines), 10)
+
+    def test_view_gzip_and_bad_parameters(self):
+        self.client.login(username="exportuser", password="ExportPass123!")
+        response = self.client.get(reverse("export_results"), {"gzip": "1", "end": "2026-05-04T12:05"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="check-results.csv.gz"', response["Content-Disposition"])
+        rows = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(rows), 1 + 2 * 5)
+
+        self.assertEqual(self.client.get(reverse("export_results"), {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_results"), {"start": "soon"}).status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("export_results", "--site", str(self.other.pk), "--start", "2026-05-04T12:08", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.ndjson.gz")
+            call_command("export_results", "--user", "exportuser", "--format", "ndjson", "--gzip", "--output", path)
+            with gzip.open(path, "rt") as f:
+                self.assertEqual(len(f.read().splitlines()), 20)
@@ -0,0 +1,119 @@
+# status_monitor/tests/test_history.py
+
+import math
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor.downsample import lttb
+from status_monitor.history import load_history
+from status_monitor.models import MonitoredSite
+from status_monitor.probes import ProbeResult
+from status_monitor.writers import ResultWriter
+
+
+# ---------------------------------------------------------------------
+# DOWNSAMPLING TESTS
+# ---------------------------------------------------------------------
+class LttbTest(TestCase):
+    """LTTB keeps the shape of a series in a bounded number of points."""
+
+    def test_short_series_is_returned_unchanged(self):
+        points = [(x, x * 2) for x in range(10)]
+        self.assertEqual(lttb(points, 20), points)
+
+    def test_keeps_endpoints_and_spikes(self):
+        points = [(x, math.sin(x / 50)) for x in range(5000)]
+        points[2500] = (2500, 50.0)
+        sampled = lttb(points, 100)
+        self.assertEqual(len(sampled), 100)
+        self.assertEqual(sampled[0], points[0])
+        self.assertEqual(sampled[-1], points[-1])
+        self.assertIn((2500, 50.0), sampled)
+
+    def test_drops_missing_values(self):
+        self.assertEqual(lttb([(0, 1), (1, None), (2, 3)], 10), [(0, 1), (2, 3)])
+
+    def test_extra_items_ride_along(self):
+        points = [(x, x % 7, f"p{x}") for x in range(100)]
+        self.assertTrue(all(label == f"p{x}" for x, _, label in lttb(points, 10)))
+
+
+# ---------------------------------------------------------------------
+# SITE HISTORY VIEW TESTS
+# ---------------------------------------------------------------------
+@override_settings(HISTORY_MAX_POINTS=50, HISTORY_UPTIME_BARS=30, HISTORY_RAW_LIMIT=500)
+class SiteHistoryViewTest(TestCase):
+    """History pages stay bounded however much history a site has."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="historyuser", password="HistoryPass123!")
+        self.client.login(username="historyuser", password="HistoryPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="History", url="https://history.example.com")
+        self.url = reverse("site_history", args=[self.site.pk])
+
+        now = timezone.now()
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            # Three days at one check per minute, down for the last hour
+            for minutes in range(3 * 24 * 60):
+                writer.add(ProbeResult(
+                    site=self.site,
+                    timestamp=now - timedelta(minutes=minutes),
+                    status_code=200 if minutes >= 60 else 503,
+                    response_time=0.1 + (minutes % 10) / 100,
+                    is_up=minutes >= 60,
+                ))
+
+    def test_points_and_bars_are_bounded(self):
+        response = self.client.get(self.url, {"range": "7d"})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.context["timestamps"]), 50)
+        self.assertEqual(len(response.context["timestamps"]), len(response.context["response_times"]))
+        self.assertEqual(len(response.context["uptime_bars"]), 30)
+        self.assertEqual(response.content.decode().count('class="uptime-dot'), 30)
+
+    def test_range_selects_window(self):
+        response = self.client.get(self.url, {"range": "24h"})
+        self.assertEqual(response.context["selected_range"], "24h")
+        # Counter windows move in whole hours
+        self.assertAlmostEqual(response.context["check_count"], 24 * 60, delta=60)
+        self.assertEqual(response.context["uptime_bars"][-1]["state"], "down")
+        self.assertEqual(response.context["uptime_bars"][0]["state"], "up")
+
+    def test_bars_cover_the_current_hour_bucket(self):
+        """Late in an hour the hour rollup still filling up is drawn in the last bar."""
+        end = timezone.now().replace(minute=55, second=0, microsecond=0)
+        if end > timezone.now():
+            end -= timedelta(hours=1)
+        bars = load_history(self.site, timedelta(hours=24), end)["uptime_bars"]
+        self.assertNotEqual(bars[0]["state"], "empty")
+        self.assertNotEqual(bars[-1]["state"], "empty")
+
+    def test_all_history_counts_every_check(self):
+        response = self.client.get(self.url, {"range": "all"})
+        self.assertEqual(response.context["check_count"], 3 * 24 * 60)
+
+    def test_unknown_range_falls_back_to_default(self):
+        response = self.client.get(self.url, {"range": "forever"})
+        self.assertEqual(response.context["selected_range"], "24h")
+
+    def test_phase_breakdown_from_raw_results(self):
+        site = MonitoredSite.objects.create(user=self.user, name="Phases", url="https://phases.example.com")
+        now = timezone.now()
+        phases = {"dns": 0.01, "connect": 0.02, "tls": 0.03, "ttfb": 0.2, "body": 0.05}
+        with ResultWriter() as writer:
+            for minutes in range(1, 11):
+                writer.add(ProbeResult(
+                    site=site, timestamp=now - timedelta(minutes=minutes), status_code=200,
+                    response_time=0.31, is_up=True, phases=phases,
+                ))
+        history = load_history(site, timedelta(hours=1), now)
+        self.assertEqual(history["phase_times"]["ttfb"], [0.2] * 10)
+        self.assertEqual(len(history["phase_times"]["dns"]), len(history["timestamps"]))
+
+        # Rollup-backed ranges only keep totals
+        rolled = self.client.get(self.url, {"range": "7d"}).context["phase_times"]
+        self.assertTrue(all(v is None for values in rolled.values() for v in values))
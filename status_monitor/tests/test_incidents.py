@@ -0,0 +1,124 @@
+# status_monitor/tests/test_incidents.py
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from status_monitor import incidents
+from status_monitor.models import Incident, MonitoredSite, SiteCheckResult
+from status_monitor.probes import ProbeResult
+from status_monitor.writers import ResultWriter
+
+T0 = datetime(2026, 5, 4, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class IncidentTestCase(TestCase):
+    def setUp(self):
+        incidents._states.clear()
+        self.user = User.objects.create_user(username="incidentsuser", password="IncidentsPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Flaky", url="https://flaky.example.com")
+
+    def write(self, pattern, start=0, site=None):
+        """Write one result per minute from ``start``; 'u' is up, 'd' is down."""
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            for minute, state in enumerate(pattern, start):
+                writer.add(ProbeResult(
+                    site=site or self.site,
+                    timestamp=T0 + timedelta(minutes=minute),
+                    status_code=200 if state == "u" else 503,
+                    response_time=0.1,
+                    is_up=state == "u",
+                ))
+
+    def spans(self):
+        return [
+            (i.started_at, i.ended_at, i.failed_checks)
+            for i in Incident.objects.filter(site=self.site).order_by("started_at")
+        ]
+
+
+# ---------------------------------------------------------------------
+# DETECTION TESTS
+# ---------------------------------------------------------------------
+class IncidentDetectionTest(IncidentTestCase):
+    """Incidents open on a confirmed transition to down and close on recovery."""
+
+    def at(self, minutes):
+        return T0 + timedelta(minutes=minutes)
+
+    def test_down_run_becomes_one_incident(self):
+        self.write("uuddduu")
+        self.assertEqual(self.spans(), [(self.at(2), self.at(5), 3)])
+        self.assertEqual(Incident.objects.get().status_code, 503)
+
+    def test_incident_spans_batches(self):
+        self.write("udd")
+        self.assertTrue(Incident.objects.get().is_open)
+        self.write("dd", start=3)
+        self.write("u", start=5)
+        self.assertEqual(self.spans(), [(self.at(1), self.at(5), 4)])
+
+    def test_state_is_reloaded_in_a_fresh_process(self):
+        self.write("ud")
+        incidents._states.clear()
+        self.write("du", start=2)
+        self.assertEqual(self.spans(), [(self.at(1), self.at(3), 2)])
+
+    @override_settings(INCIDENT_CONFIRM_CHECKS=3)
+    def test_blips_below_the_confirmation_count_are_ignored(self):
+        self.write("udduddduu")
+        self.assertEqual(self.spans(), [(self.at(4), self.at(7), 3)])
+
+    def test_cost_does_not_grow_with_history(self):
+        self.write("u" * 500)
+        result = SiteCheckResult(site=self.site, timestamp=self.at(600), response_time=0.1, is_up=False)
+        with CaptureQueriesContext(connection) as queries:
+            incidents.detect_incidents(SiteCheckResult, [result])
+        sql = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("status_monitor_sitecheckresult", sql)
+        self.assertEqual(Incident.objects.count(), 1)
+
+
+# ---------------------------------------------------------------------
+# BACKFILL AND PAGE TESTS
+# ---------------------------------------------------------------------
+@override_settings(RESULT_RETENTION_DAYS=3650)
+class IncidentBackfillTest(IncidentTestCase):
+    """History is replayed into incidents; the page lists them."""
+
+    def test_backfill_matches_live_detection(self):
+        self.write("uddudddduuduu")
+        live = self.spans()
+        Incident.objects.all().delete()
+        out = StringIO()
+        call_command("backfill_incidents", "--chunk-size", "3", stdout=out)
+        self.assertEqual(self.spans(), live)
+        self.assertIn("Flaky: 3", out.getvalue())
+
+    def test_backfill_leaves_ongoing_incident_open(self):
+        self.write("uudd")
+        call_command("backfill_incidents", "--site", str(self.site.pk), stdout=StringIO())
+        self.assertTrue(Incident.objects.get().is_open)
+
+    @override_settings(INCIDENTS_PER_PAGE=2)
+    def test_page_lists_own_incidents(self):
+        other_user = User.objects.create_user(username="otherinc", password="OtherInc123!")
+        other = MonitoredSite.objects.create(user=other_user, name="Elsewhere", url="https://elsewhere.example.com")
+        self.write("dudud")
+        self.write("d", site=other)
+        self.client.login(username="incidentsuser", password="IncidentsPass123!")
+
+        response = self.client.get(reverse("incidents_page"))
+        self.assertContains(response, "Ongoing")
+        self.assertEqual([i.started_at for i in response.context["ongoing"]], [T0 + timedelta(minutes=4)])
+        self.assertEqual(len(response.context["page"].object_list), 2)
+        self.assertNotContains(response, "Elsewhere")
+
+        response = self.client.get(reverse("incidents_page"), {"page": 2})
+        self.assertEqual([i.started_at for i in response.context["page"]], [T0])
@@ -0,0 +1,123 @@
+# status_monitor/tests/test_maintenance.py
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor import maintenance
+from status_monitor.models import MaintenanceWindow, MonitoredSite, UserProfile
+from status_monitor.worker import claim_due_sites
+
+T0 = datetime(2026, 5, 4, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+class MaintenanceTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="maintwin", password="MaintWin123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Planned", url="https://planned.example.com")
+
+    def window(self, start, end, **kwargs):
+        return MaintenanceWindow.objects.create(site=self.site, starts_at=at(start), ends_at=at(end), **kwargs)
+
+
+# ---------------------------------------------------------------------
+# INDEX TESTS
+# ---------------------------------------------------------------------
+class MaintenanceIndexTest(MaintenanceTestCase):
+    """Windows expand into per-site intervals looked up without queries."""
+
+    def test_one_off_window(self):
+        self.window(10, 20)
+        index = maintenance.get_index(at(0))
+        self.assertIsNone(index.window_end(self.site.pk, at(9)))
+        self.assertEqual(index.window_end(self.site.pk, at(10)), at(20))
+        self.assertIsNone(index.window_end(self.site.pk, at(20)))
+
+    def test_recurring_windows_repeat_until_the_end_date(self):
+        window = self.window(-60 * 24 * 7, -60 * 24 * 7 + 30, recurrence=MaintenanceWindow.DAILY, repeat_until=at(60 * 24))
+        self.assertEqual(list(window.occurrences(at(0), at(60 * 24 * 3))), [(at(0), at(30)), (at(60 * 24), at(60 * 24 + 30))])
+        index = maintenance.get_index(at(-5))
+        self.assertEqual(index.window_end(self.site.pk, at(15)), at(30))
+        self.assertEqual(window.next_occurrence(at(45)), (at(60 * 24), at(60 * 24 + 30)))
+        self.assertIsNone(window.next_occurrence(at(60 * 24 + 30)))
+
+    def test_overlapping_windows_merge(self):
+        self.window(0, 30)
+        self.window(20, 50)
+        index = maintenance.get_index(at(-1))
+        self.assertEqual(index.window_end(self.site.pk, at(10)), at(50))
+
+    def test_index_is_reused_until_windows_change(self):
+        self.window(10, 20)
+        first = maintenance.get_index(at(0))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(maintenance.get_index(at(1)), first)
+        self.assertEqual(len(queries), 1)
+        self.window(40, 50)
+        self.assertEqual(maintenance.get_index(at(1)).window_end(self.site.pk, at(45)), at(50))
+
+    def test_windows_must_end_after_they_start(self):
+        with self.assertRaises(ValidationError):
+            MaintenanceWindow(site=self.site, starts_at=at(10), ends_at=at(10)).full_clean()
+        with self.assertRaises(ValidationError):
+            MaintenanceWindow(site=self.site, starts_at=at(0), ends_at=at(60 * 25), recurrence=MaintenanceWindow.DAILY).full_clean()
+
+
+# ---------------------------------------------------------------------
+# SCHEDULING AND PAGE TESTS
+# ---------------------------------------------------------------------
+class MaintenanceSchedulingTest(MaintenanceTestCase):
+    """Sites in a window aren't claimed; the page manages windows."""
+
+    def test_site_in_window_is_put_off_until_it_ends(self):
+        other = MonitoredSite.objects.create(user=self.user, name="Other", url="https://other.example.com")
+        self.window(-10, 20)
+        MonitoredSite.objects.update(next_check_at=at(-1))
+        self.assertEqual(claim_due_sites("w1", 10, now=at(0)), [other])
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.next_check_at, at(20))
+        self.assertFalse(self.site.lease_owner)
+        self.assertIn(self.site, claim_due_sites("w2", 10, now=at(20)))
+
+    def test_removing_a_window_makes_the_site_due(self):
+        now = timezone.now()
+        window = MaintenanceWindow.objects.create(site=self.site, starts_at=now - timedelta(minutes=10), ends_at=now + timedelta(hours=10))
+        MonitoredSite.objects.update(next_check_at=now - timedelta(minutes=1))
+        self.assertEqual(claim_due_sites("w1", 10, now=now), [])
+        window.delete()
+        self.assertEqual(claim_due_sites("w1", 10), [self.site])
+
+    def test_page_schedules_and_removes_windows(self):
+        UserProfile.objects.update_or_create(user=self.user, defaults={"can_configure_sites": True})
+        self.client.login(username="maintwin", password="MaintWin123!")
+        response = self.client.post(reverse("maintenance_create"), {
+            "site": self.site.pk, "reason": "Upgrade", "recurrence": "weekly",
+            "starts_at": "2026-05-04T12:00", "ends_at": "2026-05-04T13:00",
+        })
+        self.assertRedirects(response, reverse("maintenance_page"))
+        window = MaintenanceWindow.objects.get()
+        self.assertContains(self.client.get(reverse("maintenance_page")), "Upgrade")
+
+        self.client.post(reverse("maintenance_delete", args=[window.pk]))
+        self.assertFalse(MaintenanceWindow.objects.exists())
+
+    def test_page_only_offers_own_sites(self):
+        other_user = User.objects.create_user(username="othermaint", password="OtherMaint123!")
+        other = MonitoredSite.objects.create(user=other_user, name="Theirs", url="https://theirs.example.com")
+        UserProfile.objects.update_or_create(user=self.user, defaults={"can_configure_sites": True})
+        self.client.login(username="maintwin", password="MaintWin123!")
+        response = self.client.post(reverse("maintenance_create"), {
+            "site": other.pk, "recurrence": "once", "starts_at": "2026-05-04T12:00", "ends_at": "2026-05-04T13:00",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(MaintenanceWindow.objects.exists())
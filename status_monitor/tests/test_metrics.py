@@ -0,0 +1,144 @@
+# status_monitor/tests/test_metrics.py
+
+import urllib.request
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor import metrics
+from status_monitor.models import MonitoredSite
+from status_monitor.pipeline import run_pipeline
+from status_monitor.tests.test_probes import fake_session
+from status_monitor.worker import claim_due_sites
+
+
+# ---------------------------------------------------------------------
+# REGISTRY TESTS
+# ---------------------------------------------------------------------
+class RegistryTest(SimpleTestCase):
+    """Metrics render in the Prometheus text exposition format."""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_and_gauge(self):
+        requests = self.registry.register(metrics.Counter("app_requests_total", "Requests.", ["path"]))
+        depth = self.registry.register(metrics.Gauge("app_depth", "Depth."))
+        requests.inc(path="/a")
+        requests.inc(2, path='/"b"')
+        depth.inc(3)
+        depth.dec()
+        self.assertEqual(self.registry.render().splitlines(), [
+            "# HELP app_requests_total Requests.",
+            "# TYPE app_requests_total counter",
+            'app_requests_total{path="/\\"b\\""} 2',
+            'app_requests_total{path="/a"} 1',
+            "# HELP app_depth Depth.",
+            "# TYPE app_depth gauge",
+            "app_depth 2",
+        ])
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.register(metrics.Histogram("app_seconds", "Latency.", buckets=(0.1, 1)))
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value)
+        self.assertEqual(latency.snapshot(), ([2, 3, 4], 3.65, 4))
+        lines = self.registry.render().splitlines()
+        self.assertIn('app_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('app_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("app_seconds_count 4", lines)
+
+    def test_labels_must_match(self):
+        requests = metrics.Counter("app_requests_total", "Requests.", ["path"])
+        with self.assertRaises(ValueError):
+            requests.inc(view="home")
+        self.registry.register(requests)
+        with self.assertRaises(ValueError):
+            self.registry.register(requests)
+
+    def test_collectors_run_at_scrape_time(self):
+        calls = []
+
+        @self.registry.collector
+        def collect():
+            calls.append(1)
+            gauge = metrics.Gauge("app_collected", "Collected.")
+            gauge.set(len(calls))
+            return [gauge]
+
+        self.assertIn("app_collected 1", self.registry.render())
+        self.assertIn("app_collected 2", self.registry.render())
+
+
+# ---------------------------------------------------------------------
+# INSTRUMENTATION TESTS
+# ---------------------------------------------------------------------
+class InstrumentationTest(TestCase):
+    """The probe loop, result writes and views report to the registry."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="metricsuser", password="MetricsPass123!")
+        self.sites = [
+            MonitoredSite.objects.create(user=self.user, name=f"M{i}", url=f"https://m{i}.example.com")
+            for i in range(4)
+        ]
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200))
+    def test_pipeline_run(self, _get):
+        gauges = (metrics.PROBES_QUEUED, metrics.PROBES_IN_FLIGHT, metrics.RESULTS_BUFFERED)
+        levels = [gauge.value() for gauge in gauges]
+        probes, cycles = metrics.PROBES.value(result="up"), metrics.CYCLE_SECONDS.snapshot()[2]
+        written = metrics.RESULTS_WRITTEN.value()
+        run_pipeline(self.sites, concurrency=2)
+        self.assertEqual(metrics.PROBES.value(result="up") - probes, 4)
+        self.assertEqual(metrics.CYCLE_SECONDS.snapshot()[2] - cycles, 1)
+        self.assertEqual(metrics.RESULTS_WRITTEN.value() - written, 4)
+        # Queued, in-flight and buffered counts drain back to where they were
+        self.assertEqual([gauge.value() for gauge in gauges], levels)
+
+    def test_schedule_lag(self):
+        now = timezone.now()
+        MonitoredSite.objects.update(next_check_at=now - timedelta(seconds=90))
+        before = metrics.SCHEDULE_LAG_SECONDS.snapshot()
+        claim_due_sites("w1", 10, now=now)
+        after = metrics.SCHEDULE_LAG_SECONDS.snapshot()
+        self.assertEqual(after[2] - before[2], 4)
+        self.assertAlmostEqual(after[1] - before[1], 360)
+
+    def test_views_are_timed_with_their_queries(self):
+        self.client.login(username="metricsuser", password="MetricsPass123!")
+        before = metrics.DB_QUERIES.snapshot(view="status_page")
+        self.client.get(reverse("status_page"))
+        after = metrics.DB_QUERIES.snapshot(view="status_page")
+        self.assertEqual(after[2] - before[2], 1)
+        self.assertGreater(after[1] - before[1], 0)
+        self.assertGreaterEqual(metrics.HTTP_REQUESTS.value(view="status_page", method="GET", status=200), 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get("/no-such-page/")
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn("# TYPE status_monitor_http_request_seconds histogram", body)
+        self.assertIn('view="unmatched"', body)
+        self.assertIn("status_monitor_summary_cache_lookups_total", body)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+    def test_worker_endpoint(self):
+        server = metrics.serve_metrics(0, "127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn("status_monitor_probes_in_flight", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,407 @@
+# status_monitor/tests/test_probes.py
+
+import socket
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from status_monitor.http_client import DNSCache, build_session, get_dns_cache
+from status_monitor.models import MaintenanceWindow, MonitoredSite, SiteCheckResult
+from status_monitor.pipeline import PipelineStats, parse_shard, run_pipeline, select_sites
+from status_monitor.probes import ProbeResult, interleave_by_host, probe_site, probe_sites
+from status_monitor.writers import ResultWriter
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.raw = mock.Mock(connection=None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        return iter([b"ok"])
+
+
+def fake_session(status_code=200, delay=0, error=None):
+    def _get(url, timeout=None, stream=False):
+        time.sleep(delay)
+        if error:
+            raise error
+        return FakeResponse(status_code)
+    return mock.Mock(get=mock.Mock(side_effect=_get))
+
+
+def inserts_into(model, queries):
+    prefix = f'INSERT INTO "{model._meta.db_table}"'
+    return [q for q in queries.captured_queries if q["sql"].startswith(prefix)]
+
+
+# ---------------------------------------------------------------------
+# PROBE ENGINE TESTS
+# ---------------------------------------------------------------------
+@override_settings(PROBE_RETRY_DELAY=0)
+class ProbeEngineTest(TestCase):
+    """Probe sites concurrently and classify the responses."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="probeuser", password="ProbePass123!")
+        self.sites = [
+            MonitoredSite.objects.create(user=self.user, name=f"Site {i}", url=f"https://probe{i}.example.com")
+            for i in range(8)
+        ]
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(301))
+    def test_redirect_counts_as_up(self, _get):
+        result = probe_site(self.sites[0])
+        self.assertTrue(result.is_up)
+        self.assertEqual(result.status_code, 301)
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(error=requests.ConnectionError()))
+    def test_connection_error_counts_as_down(self, _get):
+        result = probe_site(self.sites[0])
+        self.assertFalse(result.is_up)
+        self.assertIsNone(result.status_code)
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200, delay=0.3))
+    def test_sites_are_probed_in_parallel(self, _get):
+        """Cycle time tracks the slowest host, not the sum of latencies."""
+        start = time.time()
+        results = list(probe_sites(self.sites, concurrency=8, deadline=10))
+        elapsed = time.time() - start
+        self.assertEqual(len(results), len(self.sites))
+        self.assertLess(elapsed, 0.3 * len(self.sites) / 2)
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200, delay=1))
+    def test_deadline_skips_unfinished_probes(self, _get):
+        """Probes unfinished at the deadline, running or not, yield no result."""
+        results = list(probe_sites(self.sites, concurrency=2, deadline=0.2))
+        self.assertEqual(results, [])
+
+    @override_settings(PROBE_MAX_RETRIES=2)
+    def test_failure_is_confirmed_before_down(self):
+        """A blip on an up site is retried away; a site already down gets one try."""
+        session = fake_session(200)
+        session.get.side_effect = [requests.ConnectionError(), FakeResponse(200)]
+        with mock.patch("status_monitor.probes.get_session", return_value=session):
+            result = probe_site(self.sites[0])
+        self.assertTrue(result.is_up)
+        self.assertEqual(result.attempts, 2)
+
+        with mock.patch("status_monitor.probes.get_session", return_value=fake_session(503)) as get:
+            self.assertEqual(probe_site(self.sites[0]).attempts, 3)
+            self.sites[0].consecutive_failures = 1
+            self.assertEqual(probe_site(self.sites[0]).attempts, 1)
+        self.assertEqual(get.return_value.get.call_count, 4)
+
+    @override_settings(PROBE_CONCURRENCY=4)
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(503))
+    def test_pipeline_records_results(self, _get):
+        run_pipeline(select_sites())
+        self.assertEqual(SiteCheckResult.objects.count(), len(self.sites))
+        self.assertFalse(SiteCheckResult.objects.filter(is_up=True).exists())
+
+
+# ---------------------------------------------------------------------
+# PIPELINE TESTS
+# ---------------------------------------------------------------------
+class PipelineTest(TestCase):
+    """The check_sites command runs the same pipeline as the scheduler."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pipeuser", password="PipePass123!")
+        self.sites = [
+            MonitoredSite.objects.create(user=self.user, name=f"Pipe {i}", url=f"https://pipe{i}.example.com")
+            for i in range(6)
+        ]
+
+    def check_sites(self, *args):
+        out = StringIO()
+        call_command("check_sites", *args, stdout=out)
+        return out.getvalue()
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(302))
+    def test_command_classifies_like_the_scheduler(self, _get):
+        self.check_sites("--once")
+        self.assertEqual(SiteCheckResult.objects.filter(is_up=True).count(), len(self.sites))
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200))
+    def test_dry_run_saves_nothing(self, _get):
+        output = self.check_sites("--dry-run", "--concurrency", "3", "--timeout", "2")
+        self.assertFalse(SiteCheckResult.objects.exists())
+        self.assertIn("6 sites checked", output)
+        self.assertIn("sites/s", output)
+        self.assertIn("p95 probe time", output)
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200))
+    def test_once_skips_sites_in_maintenance_or_leased(self, _get):
+        now = timezone.now()
+        MaintenanceWindow.objects.create(
+            site=self.sites[0], starts_at=now - timedelta(hours=1), ends_at=now + timedelta(hours=1)
+        )
+        MonitoredSite.objects.filter(pk=self.sites[1].pk).update(
+            lease_owner="w1", lease_expires_at=now + timedelta(minutes=5)
+        )
+        self.check_sites("--once")
+        checked = SiteCheckResult.objects.values_list("site_id", flat=True)
+        self.assertCountEqual(checked, [site.pk for site in self.sites[2:]])
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200))
+    def test_shards_partition_the_sites(self, _get):
+        for index in range(3):
+            self.check_sites("--shard", f"{index}/3")
+        checked = SiteCheckResult.objects.values_list("site_id", flat=True)
+        self.assertCountEqual(checked, [site.pk for site in self.sites])
+
+    def test_shard_selection(self):
+        shard = [site.pk for site in select_sites((1, 2))]
+        self.assertEqual(shard, [site.pk for site in self.sites if site.pk % 2 == 1])
+
+    def test_invalid_shard_is_rejected(self):
+        for value in ("2/2", "a/b", "1"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+        with self.assertRaises(CommandError):
+            self.check_sites("--shard", "3/2")
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200))
+    def test_summary_reports_dns_and_queue_waits(self, _get):
+        output = self.check_sites("--dry-run", "--max-per-host", "1")
+        self.assertIn("p95 host queue wait", output)
+        self.assertIn("DNS cache hits", output)
+
+    def test_p95(self):
+        stats = PipelineStats()
+        for i in range(1, 101):
+            stats.add(ProbeResult(site=self.sites[i % 6], timestamp=timezone.now(), response_time=i / 100))
+        self.assertEqual(stats.percentile(95), 0.95)
+        self.assertEqual(stats.checked, 100)
+        self.assertEqual(stats.down, 100)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# ---------------------------------------------------------------------
+# POOLED CLIENT TESTS
+# ---------------------------------------------------------------------
+class PooledClientTest(TestCase):
+    """Probes reuse kept-alive connections and report when they do."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        user = User.objects.create_user(username="pooluser", password="PoolPass123!")
+        port = self.server.server_address[1]
+        self.site = MonitoredSite.objects.create(user=user, name="Local", url=f"http://127.0.0.1:{port}/")
+        get_dns_cache().clear()
+
+    def test_second_probe_reuses_connection(self):
+        with mock.patch("status_monitor.probes.get_session", return_value=build_session()):
+            first = probe_site(self.site)
+            second = probe_site(self.site)
+        self.assertTrue(first.is_up)
+        self.assertFalse(first.connection_reused)
+        self.assertTrue(second.connection_reused)
+
+    def test_reuse_flag_is_stored(self):
+        with mock.patch("status_monitor.probes.get_session", return_value=build_session()):
+            with ResultWriter() as writer:
+                writer.add(probe_site(self.site))
+                writer.add(probe_site(self.site))
+        flags = list(SiteCheckResult.objects.order_by("id").values_list("connection_reused", flat=True))
+        self.assertEqual(flags, [False, True])
+
+    def test_phase_timings(self):
+        """A fresh connection pays DNS and connect; a reused one only TTFB and body."""
+        with mock.patch("status_monitor.probes.get_session", return_value=build_session()):
+            with mock.patch.object(KeepAliveHandler, "delay", 0.1):
+                first = probe_site(self.site)
+                second = probe_site(self.site)
+        self.assertEqual(set(first.phases), {"dns", "connect", "tls", "ttfb", "body"})
+        self.assertGreater(first.phases["dns"], 0)
+        self.assertGreater(first.phases["connect"], 0)
+        self.assertIsNone(first.phases["tls"])
+        self.assertGreaterEqual(first.phases["ttfb"], 0.1)
+        self.assertEqual((second.phases["dns"], second.phases["connect"]), (0.0, 0.0))
+        self.assertGreaterEqual(second.phases["ttfb"], 0.1)
+        self.assertLessEqual(sum(v for v in first.phases.values() if v), first.response_time)
+
+        with ResultWriter() as writer:
+            writer.add(first)
+        stored = SiteCheckResult.objects.get()
+        self.assertEqual(stored.ttfb_time, first.phases["ttfb"])
+        self.assertIsNone(stored.tls_time)
+
+    @override_settings(PROBE_RETRY_DELAY=0)
+    def test_failed_probe_has_no_phases(self):
+        self.site.url = "http://127.0.0.1:1/"
+        with mock.patch("status_monitor.probes.get_session", return_value=build_session()):
+            result = probe_site(self.site, timeout=1)
+        self.assertIsNone(result.status_code)
+        self.assertIsNone(result.phases)
+
+
+# ---------------------------------------------------------------------
+# POLITENESS TESTS
+# ---------------------------------------------------------------------
+class DNSCacheTest(SimpleTestCase):
+    """Resolve each name once per TTL."""
+
+    ADDRESSES = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 80))]
+
+    @mock.patch("status_monitor.http_client.socket.getaddrinfo", return_value=ADDRESSES)
+    def test_answers_are_reused_until_they_expire(self, getaddrinfo):
+        cache = DNSCache(ttl=60)
+        with mock.patch("status_monitor.http_client.time.monotonic", return_value=1000):
+            self.assertEqual(cache.resolve("lb.example.com", 80), self.ADDRESSES)
+            cache.resolve("lb.example.com", 80)
+            cache.resolve("lb.example.com", 443)
+        with mock.patch("status_monitor.http_client.time.monotonic", return_value=1061):
+            cache.resolve("lb.example.com", 80)
+        self.assertEqual(getaddrinfo.call_count, 3)
+        self.assertEqual(cache.counts(), (1, 3))
+
+    @mock.patch("status_monitor.http_client.socket.getaddrinfo", return_value=ADDRESSES)
+    def test_zero_ttl_disables_caching(self, getaddrinfo):
+        cache = DNSCache(ttl=0)
+        cache.resolve("lb.example.com", 80)
+        cache.resolve("lb.example.com", 80)
+        self.assertEqual(getaddrinfo.call_count, 2)
+
+    def test_failures_are_not_cached(self):
+        cache = DNSCache(ttl=60)
+        with mock.patch("status_monitor.http_client.socket.getaddrinfo", side_effect=socket.gaierror):
+            with self.assertRaises(socket.gaierror):
+                cache.resolve("missing.example.com", 80)
+        with mock.patch("status_monitor.http_client.socket.getaddrinfo", return_value=self.ADDRESSES):
+            self.assertEqual(cache.resolve("missing.example.com", 80), self.ADDRESSES)
+
+    def test_oldest_entry_is_evicted(self):
+        cache = DNSCache(ttl=60, max_entries=2)
+        with mock.patch("status_monitor.http_client.socket.getaddrinfo", return_value=self.ADDRESSES) as getaddrinfo:
+            for host in ("a.example.com", "b.example.com", "c.example.com", "a.example.com"):
+                cache.resolve(host, 80)
+        self.assertEqual(getaddrinfo.call_count, 4)
+
+
+class HostLimitTest(TestCase):
+    """Probes of one hostname queue for a limited number of slots."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="limituser", password="LimitPass123!")
+        self.shared = [
+            MonitoredSite.objects.create(user=user, name=f"Shared {i}", url=f"https://shared.example.com/{i}")
+            for i in range(6)
+        ]
+        self.other = MonitoredSite.objects.create(user=user, name="Other", url="https://other.example.com/")
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200, delay=0.2))
+    def test_probes_queue_per_host(self, _get):
+        start = time.monotonic()
+        results = list(probe_sites(self.shared, concurrency=6, deadline=10, max_per_host=2))
+        self.assertGreaterEqual(time.monotonic() - start, 0.6)
+        waits = sorted(result.queue_wait for result in results)
+        self.assertLess(waits[1], 0.1)
+        self.assertGreaterEqual(waits[-1], 0.35)
+        # The wait is not counted as response time
+        self.assertTrue(all(result.response_time < 0.35 for result in results))
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200, delay=0.2))
+    def test_probes_queued_for_a_host_at_the_deadline_are_not_down(self, _get):
+        results = list(probe_sites(self.shared, concurrency=6, deadline=0.5, max_per_host=1))
+        self.assertLess(len(results), len(self.shared))
+        self.assertTrue(all(result.is_up for result in results))
+
+    @mock.patch("status_monitor.probes.get_session", return_value=fake_session(200, delay=0.2))
+    def test_zero_means_no_limit(self, _get):
+        results = list(probe_sites(self.shared, concurrency=6, deadline=10, max_per_host=0))
+        self.assertTrue(all(result.queue_wait == 0 for result in results))
+
+    def test_sites_are_interleaved_by_host(self):
+        ordered = interleave_by_host(self.shared[:3] + [self.other])
+        self.assertEqual(ordered, [self.shared[0], self.other, self.shared[1], self.shared[2]])
+
+
+# ---------------------------------------------------------------------
+# RESULT WRITER TESTS
+# ---------------------------------------------------------------------
+class ResultWriterTest(TestCase):
+    """Buffer results and write them in batches."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="writeruser", password="WriterPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Writer", url="https://writer.example.com")
+
+    def result(self):
+        return ProbeResult(site=self.site, timestamp=timezone.now(), status_code=200, response_time=0.1, is_up=True)
+
+    def test_flushes_by_size(self):
+        writer = ResultWriter(batch_size=10, flush_interval=3600)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(25):
+                writer.add(self.result())
+        self.assertEqual(len(inserts_into(SiteCheckResult, queries)), 2)
+        self.assertEqual(SiteCheckResult.objects.count(), 20)
+        with CaptureQueriesContext(connection) as queries:
+            writer.flush()
+        self.assertEqual(len(inserts_into(SiteCheckResult, queries)), 1)
+        self.assertEqual(SiteCheckResult.objects.count(), 25)
+
+    def test_flushes_by_age(self):
+        writer = ResultWriter(batch_size=100, flush_interval=0)
+        writer.add(self.result())
+        self.assertEqual(SiteCheckResult.objects.count(), 1)
+
+    def test_context_manager_flushes_tail(self):
+        with ResultWriter(batch_size=100, flush_interval=3600) as writer:
+            writer.add(self.result())
+            self.assertEqual(SiteCheckResult.objects.count(), 0)
+        self.assertEqual(SiteCheckResult.objects.count(), 1)
+
+    def test_failed_flush_keeps_the_batch(self):
+        writer = ResultWriter(batch_size=100, flush_interval=3600)
+        writer.add(self.result())
+        with mock.patch.object(SiteCheckResult.objects, "bulk_create", side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                writer.flush()
+        writer.flush()
+        self.assertEqual((SiteCheckResult.objects.count(), writer.written), (1, 1))
@@ -0,0 +1,64 @@
+# status_monitor/tests/test_query_plans.py
+
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from status_monitor.models import MonitoredSite, SiteCheckResult
+
+
+# ---------------------------------------------------------------------
+# QUERY PLAN REGRESSION TESTS
+# ---------------------------------------------------------------------
+@skipUnless(connection.vendor == "postgresql", "Query plans are checked against PostgreSQL")
+class CheckResultQueryPlanTest(TestCase):
+    """Per-site history lookups must be served by the (site, timestamp) index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="planuser", password="PlanPass123!")
+        cls.sites = [
+            MonitoredSite.objects.create(user=user, name=f"Plan {i}", url=f"https://plan{i}.example.com")
+            for i in range(5)
+        ]
+        start = timezone.now() - timedelta(days=7)
+        SiteCheckResult.objects.bulk_create(
+            SiteCheckResult(
+                site=site,
+                timestamp=start + timedelta(minutes=n),
+                status_code=200,
+                response_time=0.1,
+                is_up=True,
+            )
+            for site in cls.sites
+            for n in range(2000)
+        )
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE status_monitor_sitecheckresult")
+            # Tables this small would otherwise be read sequentially; what we
+            # care about is that an ordered index path exists at all.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+    def assertIndexOrdered(self, queryset):
+        plan = queryset.explain()
+        self.assertIn("checkresult_site_ts_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_recent_checks_use_index_without_sort(self):
+        site = self.sites[2]
+        self.assertIndexOrdered(site.check_results.order_by("-timestamp")[:20])
+
+    def test_history_range_uses_index_without_sort(self):
+        site = self.sites[2]
+        end = timezone.now()
+        start = end - timedelta(days=1)
+        self.assertIndexOrdered(
+            site.check_results.filter(timestamp__gte=start, timestamp__lt=end).order_by("timestamp")[:5000]
+        )
@@ -0,0 +1,94 @@
+# status_monitor/tests/test_retention.py
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from status_monitor.models import CheckRollup, Incident, MonitoredSite, SiteCheckResult, UptimeCounter
+from status_monitor.probes import ProbeResult
+from status_monitor.rollups import window_stats
+from status_monitor.writers import ResultWriter
+
+
+# ---------------------------------------------------------------------
+# RETENTION TESTS
+# ---------------------------------------------------------------------
+@override_settings(RESULT_RETENTION_DAYS=10, ROLLUP_RETENTION_DAYS={"minute": 5, "hour": 20}, PRUNE_BATCH_SIZE=7)
+class RetentionTest(TestCase):
+    """Expired raw results are folded into rollups and deleted in batches."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="retainuser", password="RetainPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Retain", url="https://retain.example.com")
+        self.now = timezone.now()
+
+    def write(self, days_ago, down=()):
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            for days in days_ago:
+                writer.add(ProbeResult(
+                    site=self.site,
+                    timestamp=self.now - timedelta(days=days),
+                    status_code=503 if days in down else 200,
+                    response_time=0.2,
+                    is_up=days not in down,
+                ))
+
+    def prune(self, *args):
+        call_command("prune_results", *args, stdout=StringIO())
+
+    def test_prunes_only_expired_results(self):
+        self.write(range(30))
+        self.prune()
+        oldest = SiteCheckResult.objects.order_by("timestamp").first().timestamp
+        self.assertGreater(oldest, self.now - timedelta(days=12))
+        self.assertLess(SiteCheckResult.objects.count(), 30)
+
+    def test_per_site_retention_overrides_global(self):
+        self.site.retention_days = 3
+        self.site.save()
+        self.write(range(30))
+        self.prune()
+        self.assertEqual(SiteCheckResult.objects.filter(timestamp__lt=self.now - timedelta(days=5)).count(), 0)
+
+    def test_dry_run_deletes_nothing(self):
+        self.write(range(30))
+        self.prune("--dry-run")
+        self.assertEqual(SiteCheckResult.objects.count(), 30)
+
+    def test_history_without_rollups_is_folded_before_delete(self):
+        self.write(range(30))
+        CheckRollup.objects.all().delete()
+        self.prune()
+        stats = window_stats([self.site.pk], None, self.now + timedelta(minutes=1))[self.site.pk]
+        remaining = SiteCheckResult.objects.count()
+        # Every pruned day now lives in the rollups
+        self.assertEqual(stats.check_count, 30 - remaining)
+
+    def test_expired_fine_rollups_are_pruned(self):
+        self.write(range(30))
+        self.prune()
+        self.assertFalse(CheckRollup.objects.filter(granularity="minute", bucket_start__lt=self.now - timedelta(days=6)).exists())
+        self.assertFalse(CheckRollup.objects.filter(granularity="hour", bucket_start__lt=self.now - timedelta(days=21)).exists())
+        self.assertEqual(CheckRollup.objects.filter(granularity="day").count(), 30)
+
+    def test_rebuilds_after_pruning_keep_older_history(self):
+        # An incident entirely before the cutoff and one running across it
+        self.write(range(30), down={27, 26, 25, 12, 11, 10, 9, 8})
+        incidents = list(Incident.objects.values_list("started_at", "ended_at", "failed_checks").order_by("started_at"))
+        counter = UptimeCounter.objects.get(site=self.site)
+        counts = {window: counter.counts(window, self.now) for window in ("24h", "7d", "all")}
+        days = list(CheckRollup.objects.filter(granularity="day").values_list("bucket_start", "check_count", "up_count").order_by("bucket_start"))
+        self.prune()
+
+        for command in ("rebuild_rollups", "rebuild_uptime_counters", "backfill_incidents"):
+            call_command(command, stdout=StringIO())
+        counter = UptimeCounter.objects.get(site=self.site)
+        self.assertEqual({window: counter.counts(window, self.now) for window in counts}, counts)
+        self.assertEqual(counts["all"], (30, 22))
+        self.assertEqual(list(CheckRollup.objects.filter(granularity="day").values_list("bucket_start", "check_count", "up_count").order_by("bucket_start")), days)
+        self.assertEqual(list(Incident.objects.values_list("started_at", "ended_at", "failed_checks").order_by("started_at")), incidents)
+        self.assertEqual(len(incidents), 2)
@@ -0,0 +1,152 @@
+# status_monitor/tests/test_rollups.py
+
+from io import StringIO
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor import histograms
+from status_monitor.models import CheckRollup, MonitoredSite, SiteCheckResult, get_status_summaries
+from status_monitor.probes import ProbeResult
+from status_monitor.rollups import window_stats
+from status_monitor.writers import ResultWriter
+
+T0 = datetime(2026, 3, 2, 22, 30, 15, tzinfo=dt_timezone.utc)
+
+
+# ---------------------------------------------------------------------
+# ROLLUP INGEST TESTS
+# ---------------------------------------------------------------------
+class RollupIngestTest(TestCase):
+    """Rollups are updated as results are written."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="rollupuser", password="RollupPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Rollup", url="https://rollup.example.com")
+
+    def write(self, offsets, is_up=True, response_time=0.2):
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            for minutes in offsets:
+                writer.add(ProbeResult(
+                    site=self.site,
+                    timestamp=T0 + timedelta(minutes=minutes),
+                    status_code=200 if is_up else 500,
+                    response_time=response_time,
+                    is_up=is_up,
+                ))
+
+    def test_batch_is_rolled_up_at_every_granularity(self):
+        self.write(range(120))
+        counts = {g: CheckRollup.objects.filter(granularity=g).count() for g in ("minute", "hour", "day")}
+        self.assertEqual(counts, {"minute": 120, "hour": 3, "day": 2})
+        day = CheckRollup.objects.get(granularity="day", bucket_start=datetime(2026, 3, 2, tzinfo=dt_timezone.utc))
+        self.assertEqual(day.check_count, 90)
+
+    def test_later_batches_are_added_to_existing_buckets(self):
+        self.write([0], is_up=True, response_time=0.1)
+        self.write([0], is_up=False, response_time=0.9)
+        hour = CheckRollup.objects.get(granularity="hour")
+        self.assertEqual((hour.check_count, hour.up_count), (2, 1))
+        self.assertEqual((hour.latency_min, hour.latency_max), (0.1, 0.9))
+        self.assertAlmostEqual(hour.latency_sum, 1.0)
+        self.assertEqual(sum(hour.latency_histogram.values()), 2)
+
+    def test_single_saves_are_rolled_up(self):
+        SiteCheckResult.objects.create(site=self.site, timestamp=T0, response_time=0.3, is_up=True)
+        self.assertEqual(CheckRollup.objects.filter(site=self.site).count(), 3)
+
+    def test_window_matches_raw_results(self):
+        self.write(range(0, 3 * 24 * 60, 7), is_up=True)
+        self.write(range(3, 3 * 24 * 60, 11), is_up=False, response_time=1.5)
+        start, end = T0 + timedelta(hours=5, minutes=13), T0 + timedelta(days=2, minutes=41)
+        raw = SiteCheckResult.objects.filter(site=self.site, timestamp__gte=start, timestamp__lt=end)
+
+        with self.assertNumQueries(1):
+            stats = window_stats([self.site.pk], start, end)[self.site.pk]
+        self.assertEqual(stats.check_count, raw.count())
+        self.assertEqual(stats.up_count, raw.filter(is_up=True).count())
+
+    def test_all_time_window(self):
+        self.write(range(0, 3000, 5))
+        stats = window_stats([self.site.pk], None, T0 + timedelta(days=30))[self.site.pk]
+        self.assertEqual(stats.check_count, 600)
+        self.assertEqual(stats.uptime, 100.0)
+
+    @override_settings(RESULT_RETENTION_DAYS=3650)
+    def test_rebuild_command_restores_rollups(self):
+        self.write(range(60), is_up=False)
+        CheckRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=StringIO())
+        hour_total = sum(r.check_count for r in CheckRollup.objects.filter(granularity="hour"))
+        self.assertEqual(hour_total, 60)
+
+    def test_history_page_all_time_uptime(self):
+        self.write(range(10), is_up=True)
+        self.write(range(10, 20), is_up=False)
+        self.client.login(username="rollupuser", password="RollupPass123!")
+        response = self.client.get(reverse("site_history", args=[self.site.pk]), {"range": "all"})
+        self.assertEqual(response.context["uptime"], 50.0)
+        self.assertEqual(response.context["check_count"], 20)
+
+
+# ---------------------------------------------------------------------
+# LATENCY PERCENTILE TESTS
+# ---------------------------------------------------------------------
+class LatencyPercentileTest(TestCase):
+    """Percentiles come from merged histograms, within a bucket of the exact value."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="pctuser", password="PctPass123!")
+        self.site = MonitoredSite.objects.create(user=self.user, name="Pct", url="https://pct.example.com")
+
+    def write(self, timestamps, latencies):
+        with ResultWriter(batch_size=1000, flush_interval=3600) as writer:
+            for timestamp, latency in zip(timestamps, latencies):
+                writer.add(ProbeResult(
+                    site=self.site, timestamp=timestamp, status_code=200, response_time=latency, is_up=True,
+                ))
+
+    def assertClose(self, estimate, exact):
+        self.assertGreaterEqual(estimate, exact)
+        self.assertLessEqual(estimate, exact * histograms.GAMMA)
+
+    def test_quantile_of_a_histogram(self):
+        values = [i / 100 for i in range(1, 1001)]
+        histogram = {}
+        for value in values:
+            histograms.add(histogram, value)
+        for q in (0.5, 0.95, 0.99):
+            self.assertClose(histograms.quantile(histogram, q), values[int(q * len(values)) - 1])
+        self.assertIsNone(histograms.quantile({}, 0.5))
+        self.assertEqual(histograms.percentiles({}), {"p50": None, "p95": None, "p99": None})
+
+    def test_window_percentiles_merge_across_buckets(self):
+        latencies = [0.05 + (i * 37 % 400) / 100 for i in range(2 * 24 * 60 // 5)]
+        self.write([T0 + timedelta(minutes=5 * i) for i in range(len(latencies))], latencies)
+        stats = window_stats([self.site.pk], T0, T0 + timedelta(days=2))[self.site.pk]
+        ordered = sorted(latencies)
+        percentiles = stats.percentiles()
+        for pct in (50, 95, 99):
+            self.assertClose(percentiles[f"p{pct}"], ordered[int(pct / 100 * len(ordered)) - 1])
+        self.assertLessEqual(percentiles["p99"], max(latencies))
+
+    def test_dashboard_summary_has_24h_percentiles(self):
+        now = timezone.now()
+        self.write([now - timedelta(hours=h) for h in range(30)], [0.1] * 20 + [5.0] * 10)
+        with self.assertNumQueries(2):
+            summary = get_status_summaries([self.site])[0]
+        # 24 of the checks fall in the hour-aligned 24h window: 20 fast, 4 slow
+        latency = summary["latency_24h"]
+        self.assertClose(latency["p50"], 0.1)
+        self.assertClose(latency["p95"], 5.0)
+
+        self.client.login(username="pctuser", password="PctPass123!")
+        response = self.client.get(reverse("site_history", args=[self.site.pk]), {"range": "7d"})
+        # Clamped to the exact min and max the rollups keep
+        self.assertClose(response.context["latency"]["p50"], 0.1)
+        self.assertEqual(response.context["latency"]["p99"], 5.0)
+        self.assertContains(response, "p99")
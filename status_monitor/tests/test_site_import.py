@@ -0,0 +1,132 @@
+# status_monitor/tests/test_site_import.py
+
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from status_monitor.models import MonitoredSite
+from status_monitor.site_import import import_sites, parse_rows
+
+CSV = """name,url,check_frequency
+alpha,https://alpha.example.com,1
+beta,not a url,5
+gamma,https://gamma.example.com,
+mine,https://mine.example.com,5
+theirs,https://theirs.example.com,5
+again,https://alpha.example.com,10
+"""
+
+
+class SiteImportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="importer", password="ImportPass123!")
+        other = User.objects.create_user(username="otherimporter", password="OtherImport123!")
+        MonitoredSite.objects.create(user=self.user, name="Mine", url="https://mine.example.com")
+        MonitoredSite.objects.create(user=other, name="Theirs", url="https://theirs.example.com")
+
+
+# ---------------------------------------------------------------------
+# VALIDATION TESTS
+# ---------------------------------------------------------------------
+class SiteImportTest(SiteImportTestCase):
+    """Rows are validated together; valid ones are created in bulk."""
+
+    def test_report(self):
+        report = import_sites(self.user, parse_rows(StringIO(CSV), "csv"))
+        self.assertEqual([site.url for site in report.created], ["https://alpha.example.com", "https://gamma.example.com"])
+        self.assertEqual([(number, url) for number, url, _ in report.errors], [
+            (2, "not a url"), (4, "https://mine.example.com"), (5, "https://theirs.example.com"), (6, "https://alpha.example.com"),
+        ])
+        self.assertIn("url: Enter a valid URL.", report.errors[0][2])
+        self.assertEqual(report.errors[1][2], ["You are already monitoring this site."])
+        self.assertEqual(report.errors[2][2], ["This URL is already monitored by another account."])
+        self.assertEqual(report.errors[3][2], ["Duplicate of row 1."])
+
+        gamma = MonitoredSite.objects.get(url="https://gamma.example.com")
+        self.assertEqual((gamma.name, gamma.check_frequency, gamma.user), ("Gamma", 5, self.user))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        rows = [{"name": f"s{i}", "url": f"https://s{i}.example.com"} for i in range(300)]
+        with CaptureQueriesContext(connection) as queries:
+            report = import_sites(self.user, rows)
+        self.assertEqual(len(report.created), 300)
+        # Duplicate lookup, then the insert inside a savepoint
+        self.assertLessEqual(len(queries), 4)
+
+    def test_dry_run_creates_nothing(self):
+        report = import_sites(self.user, parse_rows(StringIO(CSV), "csv"), dry_run=True)
+        self.assertEqual(len(report.created), 2)
+        self.assertEqual(MonitoredSite.objects.count(), 2)
+
+    @override_settings(SITE_IMPORT_MAX_ROWS=2)
+    def test_parse_errors(self):
+        with self.assertRaises(ValueError):
+            parse_rows(StringIO(CSV), "csv")
+        with self.assertRaises(ValueError):
+            parse_rows(StringIO('{"sites": []}'), "json")
+        with self.assertRaises(ValueError):
+            parse_rows(StringIO('[{"url": "https://a.example.com"}, 3]'), "json")
+        self.assertEqual(parse_rows(StringIO('[{"url": "https://a.example.com"}]'), "json"), [{"url": "https://a.example.com"}])
+
+    @override_settings(SITE_IMPORT_MAX_ROWS=10)
+    def test_reading_stops_past_the_limit(self):
+        for fmt, data in (
+            ("csv", "name,url\n" + "a,https://a.example.com\n" * 100000),
+            ("json", json.dumps([{"name": "a", "url": "https://a.example.com"}] * 100000)),
+        ):
+            stream = StringIO(data)
+            with self.assertRaises(ValueError):
+                parse_rows(stream, fmt)
+            self.assertLess(stream.tell(), len(data) / 10)
+
+    def test_url_taken_during_the_import_is_skipped(self):
+        rows = [{"name": "one", "url": "https://one.example.com"}, {"name": "late", "url": "https://late.example.com"}]
+        MonitoredSite.objects.create(user=self.user, name="Late", url="https://late.example.com")
+        # The duplicate check misses the URL, as if it was added just after
+        with mock.patch("status_monitor.site_import._owners", side_effect=[{}, {"https://late.example.com": self.user.pk}]):
+            report = import_sites(self.user, rows)
+        self.assertEqual([site.url for site in report.created], ["https://one.example.com"])
+        self.assertEqual(report.errors, [(2, "https://late.example.com", ["Skipped: this URL was added while the import ran."])])
+
+
+# ---------------------------------------------------------------------
+# PAGE AND COMMAND TESTS
+# ---------------------------------------------------------------------
+class SiteImportEntryPointTest(SiteImportTestCase):
+    """The upload page and import_sites command share the import."""
+
+    def test_upload(self):
+        self.client.login(username="importer", password="ImportPass123!")
+        upload = SimpleUploadedFile("sites.json", json.dumps([
+            {"name": "one", "url": "https://one.example.com", "check_frequency": 2},
+            {"name": "two", "url": "ftp://two"},
+        ]).encode())
+        response = self.client.post(reverse("site_import"), {"file": upload})
+        self.assertContains(response, "Imported 1 of 2 sites.")
+        self.assertContains(response, "ftp://two")
+        self.assertTrue(MonitoredSite.objects.filter(url="https://one.example.com", check_frequency=2).exists())
+
+    def test_upload_rejects_malformed_files(self):
+        self.client.login(username="importer", password="ImportPass123!")
+        response = self.client.post(reverse("site_import"), {"file": SimpleUploadedFile("sites.json", b"[1, 2")})
+        self.assertContains(response, "Invalid JSON")
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sites.csv")
+            with open(path, "w") as f:
+                f.write(CSV)
+            out = StringIO()
+            call_command("import_sites", path, "--user", "importer", stdout=out)
+        self.assertIn("Row 6 (https://alpha.example.com): Duplicate of row 1.", out.getvalue())
+        self.assertIn("Created 2 of 6 sites; 4 rows failed.", out.getvalue())
@@ -0,0 +1,254 @@
+# status_monitor/tests/test_workers.py
+
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.db.models.signals import pre_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from status_monitor.models import MonitoredSite, SiteCheckResult
+from status_monitor.pipeline import PipelineStats
+from status_monitor.probes import ProbeResult
+from status_monitor.tasks import dispatch_due_sites
+from status_monitor.worker import claim_due_sites, release_sites, run_once, run_worker
+
+
+def probe_all_up(sites, concurrency=None, **kwargs):
+    for site in sites:
+        yield ProbeResult(site=site, timestamp=timezone.now(), status_code=200, response_time=0.1, is_up=True)
+
+
+def probe_all_down(sites, concurrency=None, **kwargs):
+    for site in sites:
+        yield ProbeResult(site=site, timestamp=timezone.now(), response_time=10.0)
+
+
+# ---------------------------------------------------------------------
+# SITE LEASE TESTS
+# ---------------------------------------------------------------------
+class SiteLeaseTest(TestCase):
+    """Workers claim due sites through leases and honor check_frequency."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="workeruser", password="WorkerPass123!")
+        self.fast = MonitoredSite.objects.create(
+            user=self.user, name="Fast", url="https://fast.example.com", check_frequency=1
+        )
+        self.slow = MonitoredSite.objects.create(
+            user=self.user, name="Slow", url="https://slow.example.com", check_frequency=60
+        )
+        self.now = timezone.now()
+
+    def at(self, minutes):
+        return self.now + timedelta(minutes=minutes)
+
+    def cycle(self, minutes, worker="w1"):
+        """Claim and complete everything due at ``minutes`` from now."""
+        sites = claim_due_sites(worker, 100, now=self.at(minutes))
+        release_sites(sites, {site.pk: True for site in sites}, now=self.at(minutes))
+        return [site.pk for site in sites]
+
+    def test_new_sites_are_due_immediately(self):
+        self.assertCountEqual(self.cycle(0), [self.fast.pk, self.slow.pk])
+
+    def test_sites_are_dispatched_at_their_own_frequency(self):
+        self.cycle(0)
+        dispatched = []
+        for minute in range(1, 61):
+            dispatched += self.cycle(minute)
+        self.assertEqual(dispatched.count(self.fast.pk), 60)
+        self.assertEqual(dispatched.count(self.slow.pk), 1)
+
+    def test_leased_sites_are_not_claimed_twice(self):
+        first = claim_due_sites("w1", 100, now=self.now)
+        second = claim_due_sites("w2", 100, now=self.now)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, [])
+
+    def test_expired_lease_is_taken_over(self):
+        """A dead worker's sites are picked up once its lease runs out."""
+        claim_due_sites("dead-worker", 100, now=self.now)
+        later = self.now + timedelta(hours=1)
+        taken = claim_due_sites("w2", 100, now=later)
+        self.assertEqual(len(taken), 2)
+        self.assertEqual(MonitoredSite.objects.get(pk=self.fast.pk).lease_owner, "w2")
+
+    def test_unchecked_sites_stay_due(self):
+        sites = claim_due_sites("w1", 100, now=self.now)
+        release_sites(sites, {self.fast.pk: True}, now=self.now)
+        self.assertEqual(self.cycle(0), [self.slow.pk])
+
+    def test_schedule_changes_during_a_lease_survive_release(self):
+        sites = claim_due_sites("w1", 100, now=self.now)
+        MonitoredSite.objects.filter(pk=self.slow.pk).update(next_check_at=self.at(30))
+        release_sites(sites, {self.fast.pk: True}, now=self.now)
+        slow = MonitoredSite.objects.get(pk=self.slow.pk)
+        self.assertEqual((slow.next_check_at, slow.lease_owner), (self.at(30), ""))
+
+    def test_frequency_edit_is_picked_up(self):
+        self.cycle(0)
+        self.client.login(username="workeruser", password="WorkerPass123!")
+        self.client.post(
+            reverse("site_edit", args=[self.slow.pk]),
+            {"name": "Slow", "url": "https://slow.example.com", "check_frequency": 1},
+        )
+        due = claim_due_sites("w1", 100, now=timezone.now() + timedelta(minutes=2))
+        self.assertIn(self.slow.pk, [site.pk for site in due])
+
+    @mock.patch("status_monitor.pipeline.probe_sites", side_effect=probe_all_up)
+    def test_run_once_records_and_reschedules(self, _probe):
+        self.assertEqual(run_once("w1").checked, 2)
+        self.assertEqual(SiteCheckResult.objects.count(), 2)
+        self.assertEqual(run_once("w1").checked, 0)
+        fast = MonitoredSite.objects.get(pk=self.fast.pk)
+        self.assertEqual(fast.lease_owner, "")
+        self.assertGreater(fast.next_check_at, timezone.now())
+
+    @override_settings(CHECKER_BATCH_SIZE=1)
+    @mock.patch("status_monitor.pipeline.probe_sites", side_effect=probe_all_up)
+    def test_scheduler_tick_checks_every_due_site(self, _probe):
+        dispatch_due_sites()
+        self.assertEqual(SiteCheckResult.objects.count(), 2)
+
+    def test_worker_survives_a_failed_batch(self):
+        stop = threading.Event()
+
+        def run_once(*args, **kwargs):
+            if _run_once.call_count == 1:
+                raise OperationalError("connection lost")
+            stop.set()
+            return PipelineStats().finish()
+
+        with mock.patch("status_monitor.worker.run_once", side_effect=run_once) as _run_once, \
+                self.assertLogs("status_monitor.worker", "ERROR"):
+            run_worker("w1", poll_interval=0, stop=stop)
+        self.assertEqual(_run_once.call_count, 2)
+
+    def test_site_edit_keeps_a_lease_taken_meanwhile(self):
+        def claim(sender, instance, **kwargs):
+            claim_due_sites("w1", 100, now=self.now)
+
+        self.client.login(username="workeruser", password="WorkerPass123!")
+        pre_save.connect(claim, sender=MonitoredSite)
+        try:
+            self.client.post(
+                reverse("site_edit", args=[self.slow.pk]),
+                {"name": "Renamed", "url": "https://slow.example.com", "check_frequency": 60},
+            )
+        finally:
+            pre_save.disconnect(claim, sender=MonitoredSite)
+        slow = MonitoredSite.objects.get(pk=self.slow.pk)
+        self.assertEqual((slow.name, slow.lease_owner), ("Renamed", "w1"))
+
+
+# ---------------------------------------------------------------------
+# CIRCUIT BREAKER TESTS
+# ---------------------------------------------------------------------
+@override_settings(CIRCUIT_FAILURE_THRESHOLD=3, CIRCUIT_BACKOFF_BASE=600, CIRCUIT_BACKOFF_MAX=2400)
+class CircuitBreakerTest(TestCase):
+    """Sites that stay down are backed off and recover through half-open probes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="circuituser", password="CircuitPass123!")
+        self.site = MonitoredSite.objects.create(
+            user=self.user, name="Dead", url="https://dead.example.com", check_frequency=1
+        )
+        self.now = timezone.now()
+
+    def check(self, is_up, seconds=0):
+        now = self.now + timedelta(seconds=seconds)
+        sites = claim_due_sites("w1", 10, now=now)
+        release_sites(sites, {site.pk: is_up for site in sites}, now=now)
+        self.site.refresh_from_db()
+        return sites
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        for _ in range(2):
+            self.site.record_check(False, self.now)
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_CLOSED)
+        self.assertEqual(self.site.next_check_at, self.now + timedelta(minutes=2))
+        waits = []
+        for _ in range(4):
+            self.site.record_check(False, self.now)
+            waits.append((self.site.next_check_at - self.now).total_seconds())
+        self.assertEqual(waits, [600, 1200, 2400, 2400])
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_OPEN)
+
+    def test_open_circuit_recovers_through_a_half_open_probe(self):
+        for minute in range(3):
+            self.check(False, minute * 60)
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_OPEN)
+        self.assertEqual(self.site.consecutive_failures, 3)
+
+        # Not due during the backoff, then claimed as a single-attempt probe
+        self.assertEqual(claim_due_sites("w1", 10, now=self.now + timedelta(seconds=300)), [])
+        probe = claim_due_sites("w1", 10, now=self.now + timedelta(seconds=900))
+        self.assertEqual(probe[0].circuit_state, MonitoredSite.CIRCUIT_HALF_OPEN)
+        self.assertEqual(probe[0].probe_retries, 0)
+        release_sites(probe, {self.site.pk: True}, now=self.now + timedelta(seconds=900))
+
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_CLOSED)
+        self.assertEqual(self.site.consecutive_failures, 0)
+        self.assertEqual(self.site.next_check_at, self.now + timedelta(seconds=960))
+
+    def test_failed_recovery_probe_reopens(self):
+        for minute in range(3):
+            self.check(False, minute * 60)
+        self.check(False, 900)
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_OPEN)
+        self.assertEqual(self.site.next_check_at, self.now + timedelta(seconds=2100))
+
+    @override_settings(CIRCUIT_FAILURE_THRESHOLD=1)
+    @mock.patch("status_monitor.pipeline.probe_sites", side_effect=probe_all_down)
+    def test_run_once_opens_the_circuit(self, _probe):
+        run_once("w1")
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_OPEN)
+
+    def test_url_change_resets_the_circuit(self):
+        for minute in range(3):
+            self.check(False, minute * 60)
+        self.client.login(username="circuituser", password="CircuitPass123!")
+        self.client.post(
+            reverse("site_edit", args=[self.site.pk]),
+            {"name": "Dead", "url": "https://alive.example.com", "check_frequency": 1},
+        )
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.circuit_state, MonitoredSite.CIRCUIT_CLOSED)
+        self.assertIsNone(self.site.next_check_at)
+
+
+# ---------------------------------------------------------------------
+# CONCURRENT WORKER TESTS
+# ---------------------------------------------------------------------
+class ConcurrentClaimTest(TransactionTestCase):
+    """Claims from separate connections never overlap."""
+
+    def test_parallel_claims_split_the_sites(self):
+        user = User.objects.create_user(username="parallel", password="ParallelPass123!")
+        for i in range(40):
+            MonitoredSite.objects.create(user=user, name=f"P{i}", url=f"https://p{i}.example.com")
+
+        claimed = {}
+
+        def claim(worker):
+            try:
+                claimed[worker] = [site.pk for site in claim_due_sites(worker, 15)]
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_ids = [pk for ids in claimed.values() for pk in ids]
+        self.assertEqual(len(all_ids), 40)
+        self.assertEqual(len(set(all_ids)), 40)
@@ -25,12 +25,20 @@ urlpatterns = [
     path('sites/',views.site_list, name='site_list'),
     path('sites/<int:pk>/history/', views.site_history, name='site_history'),
     path('sites/add/', views.site_create, name= 'site_create'),
+    path('sites/import/', views.site_import, name='site_import'),
     path('sites/<int:pk>/edit/', views.site_edit, name='site_edit'),
     path('sites/<int:pk>/delete/', views.site_delete, name='site_delete'),
+    path('export/results/', views.export_results, name='export_results'),
     path('register/', views.register, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('status/', views.status_page,name='status_page' ),
+    path('api/status/', views.status_api, name='status_api'),
+    path('api/status/events/', views.status_events, name='status_events'),
+    path('api/status/cache/', views.summary_cache_view, name='summary_cache'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('maintenance/', views.maintenance_page,name='maintenance_page'),
+    path('maintenance/add/', views.maintenance_create, name='maintenance_create'),
+    path('maintenance/<int:pk>/delete/', views.maintenance_delete, name='maintenance_delete'),
     path('incidents/', views.incidents_page,name='incidents_page' ),
 ]
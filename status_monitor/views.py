@@ -1,17 +1,28 @@
+import io
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm,AuthenticationForm
 from django.urls import reverse
 from django.utils import timezone
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 
 #from datetime import timedelta
-from .models import  MonitoredSite
-from .models import UserProfile
-from .forms import MonitoredSiteForm
+from . import export, metrics
+from .broker import async_event_stream
+from .models import  MonitoredSite, status_fingerprint
+from .summary_cache import load_status, stats as summary_cache_stats
+from .models import Incident, MaintenanceWindow, UptimeCounter, UserProfile
+from .forms import MaintenanceWindowForm, MonitoredSiteForm, SiteImportForm
+from .site_import import format_of, import_sites, parse_rows
+from .history import DEFAULT_HISTORY_RANGE, HISTORY_RANGES, load_history
 
 # --- New Decorator to Enforce Configuration Permission ---
 def configuration_required(view_func):
@@ -112,12 +123,38 @@ def site_edit(request, pk):
         if form.is_valid():
             site=form.save(commit=False)
             site.user = request.user
-            site.save()
+            # Only write what the edit changed; a worker may hold this site's lease
+            fields = list(form.fields)
+            if 'check_frequency' in form.changed_data:
+                site.reschedule()
+                fields.append('next_check_at')
+            if 'url' in form.changed_data:
+                site.reset_circuit()
+                fields += ['next_check_at', 'consecutive_failures', 'circuit_state']
+            site.save(update_fields=set(fields))
             return redirect(reverse('status_page'))
     else:
         form = MonitoredSiteForm(instance=site,user=request.user)
     return render(request, 'status_monitor/site_form.html', {'form': form, 'title': 'Edit Site'})
 
+@configuration_required
+def site_import(request):
+    report = None
+    if request.method == 'POST':
+        form = SiteImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                # Read as a stream so parsing stops at SITE_IMPORT_MAX_ROWS
+                rows = parse_rows(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), format_of(upload.name))
+            except (UnicodeDecodeError, ValueError) as e:
+                form.add_error('file', str(e))
+            else:
+                report = import_sites(request.user, rows, dry_run=form.cleaned_data['dry_run'])
+    else:
+        form = SiteImportForm()
+    return render(request, 'status_monitor/site_import.html', {'form': form, 'report': report})
+
 @configuration_required # NEW DECORATOR APPLIED
 def site_delete(request, pk):
     site = get_object_or_404(MonitoredSite, pk=pk, user=request.user)
@@ -126,34 +163,178 @@ def site_delete(request, pk):
         return redirect(reverse('status_page'))
     return render(request, 'status_monitor/site_confirm_delete.html', {'site': site})
 
+def _status_sites(request):
+    return MonitoredSite.objects.filter(user=request.user).order_by('url').distinct()
+
+def status_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    return status_fingerprint(_status_sites(request))
+
+def _summary_json(summary):
+    site, latest = summary["site"], summary["latest_check"]
+    return {
+        "id": site.id,
+        "name": site.name,
+        "url": site.url,
+        "latest_check": latest and {
+            "timestamp": latest.timestamp.isoformat(),
+            "status_code": latest.status_code,
+            "response_time": latest.response_time,
+            "is_up": latest.is_up,
+        },
+        "uptime": summary["uptime"],
+        "uptime_24h": summary["uptime_24h"],
+        "checks_24h": summary["checks_24h"],
+        "latency_24h": summary["latency_24h"],
+        "timestamps": summary["timestamps"],
+        "response_times": summary["response_times"],
+        "status_points": summary["status_points"],
+        "phase_times": summary["phase_times"],
+    }
+
 @login_required(login_url='login')
 def status_page(request):
-    sites = MonitoredSite.objects.filter(user=request.user).order_by('url').distinct()
-    site_data = [site.get_status_summary(limit=20) for site in sites]
-    return render(request, "status_monitor/status_page.html", {"site_data": site_data})
+    site_data, fingerprint = load_status(_status_sites(request), request.user.pk, limit=20)
+    # Lets the auto-refresh poll start with a conditional request
+    etag = quote_etag(fingerprint)
+    return render(request, "status_monitor/status_page.html", {"site_data": site_data, "status_etag": etag})
+
+@login_required(login_url='login')
+@condition(etag_func=status_etag)
+def status_api(request):
+    # Polls carrying the current ETag get a 304 from @condition after a
+    # single fingerprint query; the summaries are only built on change
+    site_data, _ = load_status(_status_sites(request), request.user.pk, limit=20)
+    return JsonResponse({"sites": [_summary_json(summary) for summary in site_data]})
+
+@login_required(login_url='login')
+def summary_cache_view(request):
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+    return JsonResponse(summary_cache_stats.snapshot())
+
+def metrics_view(request):
+    # Open to scrapers (no login); METRICS_TOKEN adds a bearer token check
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@login_required(login_url='login')
+def status_events(request):
+    # Only streamed under ASGI, where an idle dashboard is a parked coroutine.
+    # Under WSGI each stream would hold a worker thread for minutes, so a few
+    # open tabs could starve a sync server; 204 tells EventSource not to
+    # reconnect and the dashboard falls back to polling.
+    # Streams end after SSE_MAX_STREAM_SECONDS and the browser reconnects.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(async_event_stream(request.user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _render_maintenance(request, form=None):
+    now = timezone.now()
+    windows = []
+    for window in MaintenanceWindow.objects.filter(site__user=request.user).select_related('site').order_by('starts_at'):
+        occurrence = window.next_occurrence(now)
+        windows.append({'window': window, 'next': occurrence, 'active': bool(occurrence) and occurrence[0] <= now})
+    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    if form is None and profile.can_configure_sites:
+        form = MaintenanceWindowForm(user=request.user)
+    return render(request, "status_monitor/maintenance_page.html", {"windows": windows, "form": form})
 
 @login_required
 def maintenance_page(request):
-    return render(request, "status_monitor/maintenance_page.html")
+    return _render_maintenance(request)
+
+@configuration_required
+def maintenance_create(request):
+    if request.method != 'POST':
+        return redirect(reverse('maintenance_page'))
+    form = MaintenanceWindowForm(request.POST, user=request.user)
+    if not form.is_valid():
+        return _render_maintenance(request, form)
+    form.save()
+    messages.success(request, "Maintenance window scheduled.")
+    return redirect(reverse('maintenance_page'))
+
+@configuration_required
+def maintenance_delete(request, pk):
+    window = get_object_or_404(MaintenanceWindow, pk=pk, site__user=request.user)
+    if request.method == 'POST':
+        window.delete()
+        messages.success(request, "Maintenance window removed.")
+    return redirect(reverse('maintenance_page'))
 
 @login_required
 def incidents_page(request):
-    return render(request, "status_monitor/incidents_page.html")
+    # Ongoing incidents come off the one-open-per-site index, the history
+    # off (site, started_at); neither touches check results
+    incidents = Incident.objects.filter(site__user=request.user).select_related('site')
+    ongoing = incidents.filter(ended_at__isnull=True).order_by('-started_at')
+    page = Paginator(incidents.order_by('-started_at'), settings.INCIDENTS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, "status_monitor/incidents_page.html", {"ongoing": ongoing, "page": page})
+
+@login_required(login_url='login')
+def export_results(request):
+    # ?site=<id> (repeatable), start/end as ISO dates or datetimes,
+    # format=csv|ndjson and gzip=1; streamed off a server-side cursor
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return HttpResponse(f"Unknown format {fmt!r}", status=400)
+    sites = MonitoredSite.objects.filter(user=request.user)
+    if request.GET.getlist('site'):
+        try:
+            sites = sites.filter(pk__in=[int(pk) for pk in request.GET.getlist('site')])
+        except ValueError:
+            return HttpResponse("site must be a site id", status=400)
+    try:
+        start, end = (export.parse_bound(request.GET[key]) if request.GET.get(key) else None for key in ('start', 'end'))
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+
+    compress = request.GET.get('gzip') in ('1', 'true')
+    results = export.export_queryset(sites, start, end)
+    response = StreamingHttpResponse(
+        export.stream_export(results, fmt, compress),
+        content_type='application/gzip' if compress else export.FORMATS[fmt],
+    )
+    filename = f"check-results.{fmt}" + ('.gz' if compress else '')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @login_required(login_url='login')
 def site_history(request, pk):
     site = get_object_or_404(MonitoredSite, pk=pk, user=request.user)
-    checks = site.check_results.order_by('timestamp')
+    selected_range = request.GET.get('range', DEFAULT_HISTORY_RANGE)
+    if selected_range not in HISTORY_RANGES:
+        selected_range = DEFAULT_HISTORY_RANGE
+
+    # Bounded, downsampled series; uptime comes from rollups over the range
+    now = timezone.now()
+    history = load_history(site, HISTORY_RANGES[selected_range], now)
+    uptime, check_count = history['stats'].uptime, history['stats'].check_count
 
-    # Use the updated uptime method which requires checks
-    uptime = site.calculate_uptime(checks)
+    # Ranges with a running counter are a constant-time read
+    if selected_range in UptimeCounter.WINDOWS:
+        counter = UptimeCounter.objects.filter(site=site).first()
+        if counter:
+            check_count = counter.counts(selected_range, now)[0]
+            uptime = counter.uptime(selected_range, now)
 
     context = {
         'site': site,
         'uptime': uptime,
-        'timestamps': [c.timestamp.isoformat() for c in checks],  # ISO timestamps
-        'response_times': [float(c.response_time or 0) for c in checks],
-        'status_points': ['Up' if c.is_up else 'Down' for c in checks],
+        'check_count': check_count,
+        'latency': history['stats'].percentiles(),
+        'timestamps': history['timestamps'],  # ISO timestamps
+        'response_times': history['response_times'],
+        'phase_times': history['phase_times'],
+        'uptime_bars': history['uptime_bars'],
+        'ranges': list(HISTORY_RANGES),
+        'selected_range': selected_range,
     }
     return render(request, 'status_monitor/site_history.html', context)
 
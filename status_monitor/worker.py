@@ -0,0 +1,149 @@
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import maintenance, metrics
+from .models import MonitoredSite
+from .pipeline import PipelineStats, in_shard, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_due_sites(worker_id, limit, now=None, shard=None):
+    """
+    Lease up to ``limit`` due sites to ``worker_id``.
+
+    FOR UPDATE SKIP LOCKED lets any number of workers claim at once without
+    blocking on, or double-claiming, each other's rows. The lease is held in
+    the row after the transaction commits; if the worker dies, the lease
+    expires and the site becomes claimable again. ``shard`` restricts the
+    claim to one ``(i, n)`` slice of the sites. Sites whose circuit is open
+    are only due once their backoff ends, and go half-open when claimed.
+    Due sites in a maintenance window aren't claimed; they are put off
+    until the window ends.
+    """
+    now = now or timezone.now()
+    index = maintenance.get_index(now)
+    with transaction.atomic():
+        sites = list(
+            in_shard(MonitoredSite.objects.all(), shard)
+            .select_for_update(skip_locked=True)
+            .filter(Q(next_check_at__isnull=True) | Q(next_check_at__lte=now))
+            .filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+            .order_by(F('next_check_at').asc(nulls_first=True))[:limit]
+        )
+        deferred = []
+        for site in sites:
+            window_end = index.window_end(site.pk, now)
+            if window_end is not None:
+                site.next_check_at = window_end
+                deferred.append(site)
+        if deferred:
+            MonitoredSite.objects.bulk_update(deferred, ['next_check_at'])
+            metrics.MAINTENANCE_DEFERRALS.inc(len(deferred))
+            sites = [site for site in sites if site.next_check_at is None or site.next_check_at <= now]
+        if sites:
+            MonitoredSite.objects.filter(pk__in=[site.pk for site in sites]).update(
+                lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.CHECKER_LEASE_SECONDS),
+                circuit_state=Case(
+                    When(circuit_state=MonitoredSite.CIRCUIT_OPEN, then=Value(MonitoredSite.CIRCUIT_HALF_OPEN)),
+                    default=F('circuit_state'),
+                ),
+            )
+    for site in sites:
+        if site.next_check_at is not None:
+            metrics.SCHEDULE_LAG_SECONDS.observe((now - site.next_check_at).total_seconds())
+        if site.circuit_state == MonitoredSite.CIRCUIT_OPEN:
+            site.circuit_state = MonitoredSite.CIRCUIT_HALF_OPEN
+    return sites
+
+
+def release_sites(sites, outcomes, now=None):
+    """
+    Drop the leases on ``sites``. Sites that were checked (keys of
+    ``outcomes``, a site id to is_up mapping) move their circuit on and are
+    rescheduled by MonitoredSite.record_check; the rest only lose the
+    lease, so they stay due for the next claim (keeping a half-open circuit
+    for its recovery probe) and any schedule change made while they were
+    leased, such as a maintenance deferral, is kept.
+    """
+    now = now or timezone.now()
+    checked = []
+    for site in sites:
+        site.lease_owner = ''
+        site.lease_expires_at = None
+        if site.pk in outcomes:
+            state = site.circuit_state
+            site.record_check(outcomes[site.pk], now)
+            if site.circuit_state != state:
+                metrics.CIRCUIT_TRANSITIONS.inc(state=site.circuit_state)
+            checked.append(site)
+    MonitoredSite.objects.bulk_update(
+        checked, ['lease_owner', 'lease_expires_at', 'next_check_at', 'consecutive_failures', 'circuit_state'],
+    )
+    unchecked = [site.pk for site in sites if site.pk not in outcomes]
+    if unchecked:
+        MonitoredSite.objects.filter(pk__in=unchecked).update(lease_owner='', lease_expires_at=None)
+
+
+def run_once(worker_id, batch_size=None, concurrency=None, timeout=None, shard=None, on_result=None,
+             max_per_host=None):
+    """
+    Claim one batch of due sites and run it through the check pipeline.
+    Returns the batch's PipelineStats.
+    """
+    sites = claim_due_sites(worker_id, batch_size or settings.CHECKER_BATCH_SIZE, shard=shard)
+    if not sites:
+        return PipelineStats().finish()
+    stats = None
+    try:
+        stats = run_pipeline(sites, concurrency=concurrency, timeout=timeout, on_result=on_result,
+                             max_per_host=max_per_host)
+    finally:
+        release_sites(sites, stats.outcomes if stats else {})
+    return stats
+
+
+def run_worker(worker_id=None, batch_size=None, concurrency=None, poll_interval=None, stop=None,
+               timeout=None, shard=None, on_batch=None, on_result=None, max_per_host=None):
+    """
+    Keep claiming and checking due sites until ``stop`` is set. Run as many
+    of these as needed, on as many hosts as needed; they share the work
+    through the site leases. ``on_batch`` is called with the PipelineStats
+    of every batch that checked at least one site.
+    """
+    worker_id = worker_id or default_worker_id()
+    batch_size = batch_size or settings.CHECKER_BATCH_SIZE
+    poll_interval = settings.CHECKER_POLL_INTERVAL if poll_interval is None else poll_interval
+    stop = stop or threading.Event()
+
+    logger.info("Checker worker %s started", worker_id)
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            stats = run_once(worker_id, batch_size, concurrency, timeout=timeout, shard=shard, on_result=on_result,
+                             max_per_host=max_per_host)
+        except Exception:
+            # A transient DB error shouldn't end the worker; sites it still
+            # leases become claimable again when the lease expires
+            logger.exception("Checker worker %s failed a batch, retrying", worker_id)
+            stop.wait(poll_interval)
+            continue
+        if stats.checked and on_batch:
+            on_batch(stats)
+        # A full batch means more sites are probably due; otherwise wait
+        if stats.checked < batch_size:
+            stop.wait(poll_interval)
+    logger.info("Checker worker %s stopped", worker_id)
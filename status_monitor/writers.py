@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+
+from . import metrics
+from .models import SiteCheckResult
+from .signals import results_recorded
+
+
+class ResultWriter:
+    """
+    Buffer probe results and persist them with ``bulk_create``, flushing once
+    ``batch_size`` results are waiting or ``flush_interval`` seconds have passed
+    since the last flush. The interval is only checked when a result is
+    added, so a quiet buffer waits for the next result or the final flush;
+    use as a context manager so the tail is flushed. A failed write keeps
+    its batch buffered for the next flush.
+
+    Probes run on the pool threads in probes.probe_sites, so a slow flush here
+    only delays persistence; probes already in flight keep running.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or settings.RESULT_BATCH_SIZE
+        self.flush_interval = settings.RESULT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def add(self, result):
+        phases = result.phases or {}
+        self._buffer.append(SiteCheckResult(
+            site=result.site,
+            timestamp=result.timestamp,
+            status_code=result.status_code,
+            response_time=result.response_time,
+            is_up=result.is_up,
+            connection_reused=result.connection_reused,
+            **{f'{phase}_time': phases.get(phase) for phase in SiteCheckResult.PHASES},
+        ))
+        metrics.RESULTS_BUFFERED.inc()
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return []
+        batch = self._buffer
+        started = time.monotonic()
+        SiteCheckResult.objects.bulk_create(batch, batch_size=self.batch_size)
+        self._buffer = []
+        metrics.RESULTS_BUFFERED.dec(len(batch))
+        self.written += len(batch)
+        results_recorded.send(sender=SiteCheckResult, results=batch)
+        metrics.RESULT_WRITE_SECONDS.observe(time.monotonic() - started)
+        metrics.RESULTS_WRITTEN.inc(len(batch))
+        return batch